@@ -13,12 +13,16 @@ Anaconda includes NumPy and MatPlotLib
 Tested on DPO5204B, MSO72004, DPO7104C, and MSO58
 """
 
+import os
+import sys
 import visa
 import numpy as np
-import matplotlib.pyplot as plt
+# sampled_axis.py is in the parent directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sampled_axis import SampledAxis
 
 
-def get_waveform_info():
+def get_waveform_info(dpo):
     """Gather waveform transfer information from scope."""
     dpo.write('acquire:stopafter sequence')
     dpo.write('acquire:state on')
@@ -56,79 +60,85 @@ def get_waveform_info():
     return dType, bigEndian
 
 
-"""#################SEARCH/CONNECT#################"""
-# establish communication with dpo
-rm = visa.ResourceManager()
-dpo = rm.open_resource('TCPIP::192.168.1.84::INSTR')
-dpo.timeout = 10000
-dpo.encoding = 'latin_1'
-print(dpo.query('*idn?'))
-dpo.write('*rst')
-
-
-"""#################CONFIGURE INSTRUMENT#################"""
-# variables for individual settings
-hScale = 1e-6
-numFrames = 10
-vScale = 0.5
-vPos = -2.5
-trigLevel = 0.15
-
-# dpo setup
-dpo.write('acquire:state off')
-dpo.write('horizontal:mode:scale {}'.format(hScale))
-dpo.write('horizontal:fastframe:state on')
-dpo.write('horizontal:fastframe:count {}'.format(numFrames))
-dpo.write('ch1:scale {}'.format(vScale))
-dpo.write('ch1:position {}'.format(vPos))
-dpo.write('trigger:a:level:ch1 {}'.format(trigLevel))
-print('Horizontal, vertical, and trigger settings configured.')
-
-# configure data transfer settings
-dpo.write('header off')
-dpo.write('horizontal:fastframe:sumframe average')
-dpo.write('data:encdg fastest')
-dpo.write('data:source ch1')
-recordLength = int(dpo.query('horizontal:mode:recordlength?').strip())
-dpo.write('data:stop {}'.format(recordLength))
-dpo.write('wfmoutpre:byt_n 1')
-dpo.write('data:framestart 10')
-dpo.write('data:framestop 10')
-print('Data transfer settings configured.')
-
-
-"""#################ACQUIRE DATA#################"""
-print('Acquiring waveform.')
-dpo.write('acquire:stopafter sequence')
-dpo.write('acquire:state on')
-dpo.query('*opc?')
-print('Waveform acquired.\n')
-
-# Retrieve vertical and horizontal scaling information
-yOffset = float(dpo.query('wfmoutpre:yoff?'))
-yMult = float(dpo.query('wfmoutpre:ymult?'))
-yZero = float(dpo.query('wfmoutpre:yzero?'))
-
-numPoints = int(dpo.query('wfmoutpre:nr_pt?'))
-xIncr = float(dpo.query('wfmoutpre:xincr?'))
-xZero = float(dpo.query('wfmoutpre:xzero?'))
-
-dType, bigEndian = get_waveform_info()
-data = dpo.query_binary_values(
-    'curve?', datatype=dType, is_big_endian=bigEndian, container=np.array)
-
-"""#################PLOT DATA#################"""
-# Using the scaling information, rescale the binary data
-scaleddata = (data - yOffset) * yMult + yZero
-scaledtime = np.arange(xZero, xZero + (xIncr * numPoints), xIncr)
-
-print('Plot generated.')
-# plot the figure with correct scaling
-plt.subplot(111, facecolor='k')
-plt.plot(scaledtime * 1e3, scaleddata, color='y')
-plt.ylabel('Voltage (V)')
-plt.xlabel('Time (msec)')
-plt.tight_layout()
-plt.show()
-
-dpo.close()
+def main():
+    """#################SEARCH/CONNECT#################"""
+    # establish communication with dpo
+    rm = visa.ResourceManager()
+    dpo = rm.open_resource('TCPIP::192.168.1.84::INSTR')
+    dpo.timeout = 10000
+    dpo.encoding = 'latin_1'
+    print(dpo.query('*idn?'))
+    dpo.write('*rst')
+
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    # variables for individual settings
+    hScale = 1e-6
+    numFrames = 10
+    vScale = 0.5
+    vPos = -2.5
+    trigLevel = 0.15
+
+    # dpo setup
+    dpo.write('acquire:state off')
+    dpo.write('horizontal:mode:scale {}'.format(hScale))
+    dpo.write('horizontal:fastframe:state on')
+    dpo.write('horizontal:fastframe:count {}'.format(numFrames))
+    dpo.write('ch1:scale {}'.format(vScale))
+    dpo.write('ch1:position {}'.format(vPos))
+    dpo.write('trigger:a:level:ch1 {}'.format(trigLevel))
+    print('Horizontal, vertical, and trigger settings configured.')
+
+    # configure data transfer settings
+    dpo.write('header off')
+    dpo.write('horizontal:fastframe:sumframe average')
+    dpo.write('data:encdg fastest')
+    dpo.write('data:source ch1')
+    recordLength = int(dpo.query('horizontal:mode:recordlength?').strip())
+    dpo.write('data:stop {}'.format(recordLength))
+    dpo.write('wfmoutpre:byt_n 1')
+    dpo.write('data:framestart 10')
+    dpo.write('data:framestop 10')
+    print('Data transfer settings configured.')
+
+
+    """#################ACQUIRE DATA#################"""
+    print('Acquiring waveform.')
+    dpo.write('acquire:stopafter sequence')
+    dpo.write('acquire:state on')
+    dpo.query('*opc?')
+    print('Waveform acquired.\n')
+
+    # Retrieve vertical and horizontal scaling information
+    yOffset = float(dpo.query('wfmoutpre:yoff?'))
+    yMult = float(dpo.query('wfmoutpre:ymult?'))
+    yZero = float(dpo.query('wfmoutpre:yzero?'))
+
+    xIncr = float(dpo.query('wfmoutpre:xincr?'))
+    xZero = float(dpo.query('wfmoutpre:xzero?'))
+
+    dType, bigEndian = get_waveform_info(dpo)
+    data = dpo.query_binary_values(
+        'curve?', datatype=dType, is_big_endian=bigEndian, container=np.array)
+
+    """#################PLOT DATA#################"""
+    import matplotlib.pyplot as plt
+    # Using the scaling information, rescale the binary data
+    scaleddata = (data - yOffset) * yMult + yZero
+    # Point n is at xZero + xIncr * n; the axis always has one point per sample.
+    scaledtime = SampledAxis.from_preamble(xZero, xIncr, len(scaleddata))
+
+    print('Plot generated.')
+    # plot the figure with correct scaling
+    plt.subplot(111, facecolor='k')
+    plt.plot(np.asarray(scaledtime * 1e3), scaleddata, color='y')
+    plt.ylabel('Voltage (V)')
+    plt.xlabel('Time (msec)')
+    plt.tight_layout()
+    plt.show()
+
+    dpo.close()
+
+
+if __name__ == '__main__':
+    main()
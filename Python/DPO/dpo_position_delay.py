@@ -14,12 +14,16 @@ Anaconda includes NumPy and MatPlotLib
 Tested on DPO77002SX, MSO58
 """
 
+import os
+import sys
 import visa
 import numpy as np
-import matplotlib.pyplot as plt
+# sampled_axis.py is in the parent directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sampled_axis import SampledAxis
 
 
-def get_waveform_info():
+def get_waveform_info(dpo):
     dpo.write('acquire:stopafter sequence')
     dpo.write('acquire:state on')
     dpo.query('*OPC?')
@@ -56,71 +60,76 @@ def get_waveform_info():
     return dType, bigEndian
 
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-dpo = rm.open_resource('TCPIP::192.168.1.8::INSTR')
-dpo.encoding = 'latin_1'
-dpo.write_termination = None
-dpo.read_termination = '\n'
-dpo.write('*rst')
-print('Connected to: ', dpo.query('*IDN?'))
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    dpo = rm.open_resource('TCPIP::192.168.1.8::INSTR')
+    dpo.encoding = 'latin_1'
+    dpo.write_termination = None
+    dpo.read_termination = '\n'
+    dpo.write('*rst')
+    print('Connected to: ', dpo.query('*IDN?'))
 
-"""#################CONFIGURE INSTRUMENT#################"""
-hScale = 20e-9
-dPos = 30
-dTime = 250e-9
+    """#################CONFIGURE INSTRUMENT#################"""
+    hScale = 20e-9
+    dPos = 30
+    dTime = 250e-9
 
-dpo.write('horizontal:mode:scale {}'.format(hScale))
+    dpo.write('horizontal:mode:scale {}'.format(hScale))
 
-dpo.write('horizontal:delay:mode on')
-dMode = dpo.query('horizontal:delay:mode?').strip()
-print('Delay mode: ', dMode)
+    dpo.write('horizontal:delay:mode on')
+    dMode = dpo.query('horizontal:delay:mode?').strip()
+    print('Delay mode: ', dMode)
 
-dpo.write('horizontal:delay:position {}'.format(dPos))
-dPos = dpo.query('horizontal:delay:position?').strip()
-print('Delay position: ', dPos)
+    dpo.write('horizontal:delay:position {}'.format(dPos))
+    dPos = dpo.query('horizontal:delay:position?').strip()
+    print('Delay position: ', dPos)
 
-dpo.write('horizontal:delay:time {}'.format(dTime))
-dTime = float(dpo.query('horizontal:delay:time?').strip())
-print('Delay time: ', dTime)
+    dpo.write('horizontal:delay:time {}'.format(dTime))
+    dTime = float(dpo.query('horizontal:delay:time?').strip())
+    print('Delay time: ', dTime)
 
-ptOffset = int(dpo.query('wfmoutpre:pt_off?').strip())
-print('Point offset: ', ptOffset)
+    ptOffset = int(dpo.query('wfmoutpre:pt_off?').strip())
+    print('Point offset: ', ptOffset)
 
-recordLength = int(dpo.query('horizontal:mode:recordlength?').strip())
-print('Record Length: ', recordLength)
+    recordLength = int(dpo.query('horizontal:mode:recordlength?').strip())
+    print('Record Length: ', recordLength)
 
-dpo.write('data:source ch1')
-dpo.write('data:stop {}'.format(recordLength))
-numPoints = int(dpo.query('wfmoutpre:nr_pt?'))
+    dpo.write('data:source ch1')
+    dpo.write('data:stop {}'.format(recordLength))
+    numPoints = int(dpo.query('wfmoutpre:nr_pt?'))
 
-"""#################ACQUIRE DATA#################"""
-dpo.write('acquire:stopafter sequence')
-dpo.write('acquire:state on')
+    """#################ACQUIRE DATA#################"""
+    dpo.write('acquire:stopafter sequence')
+    dpo.write('acquire:state on')
+
+    dType, bigEndian = get_waveform_info(dpo)
+    dpo.write('header on')
+    print(dpo.query('wfmoutpre?'))
+    dpo.write('header off')
+
+    data = dpo.query_binary_values('curve?', datatype=dType, is_big_endian=bigEndian, container=np.array)
 
-dType, bigEndian = get_waveform_info()
-dpo.write('header on')
-print(dpo.query('wfmoutpre?'))
-dpo.write('header off')
+    """#################PLOT DATA#################"""
+    import matplotlib.pyplot as plt
+    # amount of time between data points
+    xIncr = float(dpo.query('wfmoutpre:xincr?'))
+    # absolute time value of the beginning of the waveform record
+    xZero = float(dpo.query('wfmoutpre:xZero?'))
+    print('xZero: {}, xIncr: {}'.format(xZero, xIncr))
 
-data = dpo.query_binary_values('curve?', datatype=dType, is_big_endian=bigEndian, container=np.array)
+    # create correctly scaled time axis for plotting
+    # Point n is at -dTime + xIncr * (n - ptOffset).
+    scaledTime = SampledAxis.from_preamble(-dTime, xIncr, numPoints, ptOffset)
 
-"""#################PLOT DATA#################"""
-# amount of time between data points
-xIncr = float(dpo.query('wfmoutpre:xincr?'))
-# absolute time value of the beginning of the waveform record
-xZero = float(dpo.query('wfmoutpre:xZero?'))
-print('xZero: {}, xIncr: {}'.format(xZero, xIncr))
+    plt.plot(np.asarray(scaledTime), data)
+    plt.xlabel('Time (s)')
+    plt.ylabel('Voltage (V)')
+    plt.axvline(0, color='y')
+    plt.show()
 
-# create correctly scaled time vector for plotting
-start = -dTime + (xIncr * -ptOffset)
-stop = -dTime + xIncr * (numPoints - ptOffset)
-scaledTime = np.linspace(start, stop, numPoints)
+    dpo.close()
 
-plt.plot(scaledTime, data)
-plt.xlabel('Time (s)')
-plt.ylabel('Voltage (V)')
-plt.axvline(0, color='y')
-plt.show()
 
-dpo.close()
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,6 @@ Tested on MDO4104B-6
 
 import visa
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class MDO:
@@ -151,6 +150,7 @@ class MDO:
 
     def plot_masks(self):
         """Overlays upper and lower masks on RF vs time waveform"""
+        import matplotlib.pyplot as plt
         time = np.linspace(0, self.numPoints * self.xIncr, self.numPoints)
         plt.figure(1, figsize=(10, 5))
         ax1 = plt.subplot(211, facecolor='k')
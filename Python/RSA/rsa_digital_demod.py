@@ -5,7 +5,7 @@ Updated: 11/17
 This program sets up RSA5k/SignalVu-PC/SignalVu remotely to acquire and
 demodulate a 3.84 MHz QPSK signal with RRC filter and alpha of 0.22.
 Windows 7 64-bit, TekVISA 4.0.4, Python 3.6.3 64-bit
-MatPlotLib 2.1.0, PyVISA 1.8
+NumPy 1.13.3, MatPlotLib 2.1.0, PyVISA 1.8
 To get PyVISA: pip install pyvisa
 Download Anaconda: http://continuum.io/downloads
 Anaconda includes MatPlotLib
@@ -18,10 +18,10 @@ Tested on RSA306B, RSA5126B and DPO77002SX with SignalVu
 """
 
 import visa
-import matplotlib.pyplot as plt
+import numpy as np
 
 
-def dpo_signalvu_check(instId):
+def dpo_signalvu_check(inst, instId):
     """Check if instrument is an oscilloscope and activate SignalVu if it is"""
     """IMPORTANT: make sure SignalVu is already running if you're using a scope.
        The application:activate command gives focus to SignalVu.
@@ -38,82 +38,90 @@ def dpo_signalvu_check(instId):
             sampleRate))
 
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-# inst = rm.open_resource('TCPIP::192.168.1.11::INSTR')
-inst = rm.open_resource('GPIB8::1::INSTR')
-inst.timeout = 25000
-inst.encoding = 'latin_1'
-inst.write_termination = None
-inst.read_termination = '\n'
-instId = inst.query('*idn?')
-print('Connected to', instId)
-dpo_signalvu_check(instId)
-
-# preset, clear buffer, and stop acquisition
-inst.write('system:preset')
-inst.write('*cls')
-inst.write('abort')
-
-"""#################CONFIGURE INSTRUMENT#################"""
-freq = 2.4453e9
-span = 40e6
-refLevel = 0
-
-# Set up spectrum acquisition parameters.
-inst.write('spectrum:frequency:center {}'.format(freq))
-inst.write('spectrum:frequency:span {}'.format(span))
-inst.write('input:rlevel {}'.format(refLevel))
-
-# Open new displays.
-inst.write('display:ddemod:measview:new conste')    # Constellation
-inst.write('display:ddemod:measview:new stable')    # symbol table
-inst.write('display:ddemod:measview:new evm')       # EVM vs Time
-
-# Turn off trigger and disable continuous capture (enable single shot mode)
-inst.write('initiate:continuous off')
-inst.write('trigger:status off')
-
-# Configure digital demod (QPSK, 3.84 MSym/s, RRC/RC filters, alpha 0.22).
-symRate = 3.84e6
-alpha = 0.22
-
-inst.write('sense:ddemod:modulation:type qpsk')
-inst.write('sense:ddemod:srate {}'.format(symRate))
-inst.write('sense:ddemod:filter:measurement rrcosine')
-inst.write('sense:ddemod:filter:reference rcosine')
-inst.write('sense:ddemod:filter:alpha {}'.format(alpha))
-inst.write('sense:ddemod:symbol:points one')
-# inst.write('sense:ddemod:analysis:length 20000')
-# print(inst.query('sense:acquisition:samples?'))
-
-"""#################ACQUIRE DATA#################"""
-# Start acquisition.
-inst.write('initiate:immediate')
-inst.query('*opc?')
-
-# Get constellation display results (details in programmer manual).
-results = inst.query('fetch:conste:results?')
-
-# Get EVM vs time data.
-evmVsTime = inst.query_binary_values('fetch:evm:trace?')
-
-# Remove terminating whitespace (.rstrip()), split the string result (.split())
-# into an array of 3 values, and convert those values to floats.
-results = results.rstrip().split(',')
-evm = [float(value) for value in results]
-
-"""#################PLOT DATA#################"""
-# Print out the results.
-# See Python's format spec docs for more details: https://goo.gl/YmjGzV.
-print('EVM (RMS): {0[0]:2.3f}%, EVM (peak): {0[1]:2.3f}%, Symbol: {0[2]:<4.0f}'
-      .format(evm))
-
-plt.plot(evmVsTime)
-plt.title('EVM vs Symbol #')
-plt.xlabel('Symbol')
-plt.ylabel('EVM (%)')
-plt.tight_layout()
-plt.show()
-
-inst.close()
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    # inst = rm.open_resource('TCPIP::192.168.1.11::INSTR')
+    inst = rm.open_resource('GPIB8::1::INSTR')
+    inst.timeout = 25000
+    inst.encoding = 'latin_1'
+    inst.write_termination = None
+    inst.read_termination = '\n'
+    instId = inst.query('*idn?')
+    print('Connected to', instId)
+    dpo_signalvu_check(inst, instId)
+
+    # preset, clear buffer, and stop acquisition
+    inst.write('system:preset')
+    inst.write('*cls')
+    inst.write('abort')
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    freq = 2.4453e9
+    span = 40e6
+    refLevel = 0
+
+    # Set up spectrum acquisition parameters.
+    inst.write('spectrum:frequency:center {}'.format(freq))
+    inst.write('spectrum:frequency:span {}'.format(span))
+    inst.write('input:rlevel {}'.format(refLevel))
+
+    # Open new displays.
+    inst.write('display:ddemod:measview:new conste')    # Constellation
+    inst.write('display:ddemod:measview:new stable')    # symbol table
+    inst.write('display:ddemod:measview:new evm')       # EVM vs Time
+
+    # Turn off trigger and disable continuous capture (enable single shot mode)
+    inst.write('initiate:continuous off')
+    inst.write('trigger:status off')
+
+    # Configure digital demod (QPSK, 3.84 MSym/s, RRC/RC filters, alpha 0.22).
+    symRate = 3.84e6
+    alpha = 0.22
+
+    inst.write('sense:ddemod:modulation:type qpsk')
+    inst.write('sense:ddemod:srate {}'.format(symRate))
+    inst.write('sense:ddemod:filter:measurement rrcosine')
+    inst.write('sense:ddemod:filter:reference rcosine')
+    inst.write('sense:ddemod:filter:alpha {}'.format(alpha))
+    inst.write('sense:ddemod:symbol:points one')
+    # inst.write('sense:ddemod:analysis:length 20000')
+    # print(inst.query('sense:acquisition:samples?'))
+
+    """#################ACQUIRE DATA#################"""
+    # Start acquisition.
+    inst.write('initiate:immediate')
+    inst.query('*opc?')
+
+    # Get constellation display results (details in programmer manual).
+    results = inst.query('fetch:conste:results?')
+
+    # Get EVM vs time data as float32, the format evm_stats.EVMStatistics
+    # consumes when aggregating over many acquisitions.
+    evmVsTime = inst.query_binary_values('fetch:evm:trace?', datatype='f',
+                                         container=np.array).astype(np.float32)
+
+    # Remove terminating whitespace (.rstrip()), split the string result (.split())
+    # into an array of 3 values, and convert those values to floats.
+    results = results.rstrip().split(',')
+    evm = [float(value) for value in results]
+
+    """#################PLOT DATA#################"""
+    import matplotlib.pyplot as plt
+    # Print out the results.
+    # See Python's format spec docs for more details: https://goo.gl/YmjGzV.
+    print('EVM (RMS): {0[0]:2.3f}%, EVM (peak): {0[1]:2.3f}%, Symbol: {0[2]:<4.0f}'
+          .format(evm))
+
+    plt.plot(evmVsTime)
+    plt.title('EVM vs Symbol #')
+    plt.xlabel('Symbol')
+    plt.ylabel('EVM (%)')
+    plt.tight_layout()
+    plt.show()
+
+    inst.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,42 +18,48 @@ Tested on RSA306B, RSA507A, RSA5126B
 
 import visa
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-# rsa = rm.open_resource('TCPIP::192.168.1.9::INSTR')
-rsa = rm.open_resource('GPIB8::1::INSTR')
-rsa.timeout = 10000
-rsa.encoding = 'latin_1'
-rsa.write_termination = None
-rsa.read_termination = '\n'
-print('Connected to', rsa.query('*idn?'))
-
-rsa.write('*rst')
-rsa.write('*cls')
-rsa.write('abort')
-
-
-"""#################CONFIGURE INSTRUMENT#################"""
-# Configure acquisition parameters
-cf = 2.4453e9
-span = 40e6
-
-# Configure DPX measurement
-rsa.write('display:general:measview:new DPX')
-rsa.write('sense:dpx:plot split')
-rsa.write('spectrum:frequency:center {}'.format(cf))
-rsa.write('spectrum:frequency:span {}'.format(span))
-
-"""#################ACQUIRE DATA#################"""
-rsa.write('initiate:immediate')
-rsa.query('*opc?')
-
-rsa.write('trace1:dpx 1')  # Trace 1
-rsa.write('trace2:dpx 1')  # Trace 2
-rsa.write('trace3:dpx 1')  # Trace 3
-rsa.write('trace4:dpx 0')  # Math
-rsa.write('trace5:dpx 1')  # Bitmap
-rsa.write('trace6:dpx 1')  # DPXogram
-rsa.write('trace7:dpx 1')  # DPXogram Line
-
-rsa.close()
+
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    # rsa = rm.open_resource('TCPIP::192.168.1.9::INSTR')
+    rsa = rm.open_resource('GPIB8::1::INSTR')
+    rsa.timeout = 10000
+    rsa.encoding = 'latin_1'
+    rsa.write_termination = None
+    rsa.read_termination = '\n'
+    print('Connected to', rsa.query('*idn?'))
+
+    rsa.write('*rst')
+    rsa.write('*cls')
+    rsa.write('abort')
+
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    # Configure acquisition parameters
+    cf = 2.4453e9
+    span = 40e6
+
+    # Configure DPX measurement
+    rsa.write('display:general:measview:new DPX')
+    rsa.write('sense:dpx:plot split')
+    rsa.write('spectrum:frequency:center {}'.format(cf))
+    rsa.write('spectrum:frequency:span {}'.format(span))
+
+    """#################ACQUIRE DATA#################"""
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
+
+    rsa.write('trace1:dpx 1')  # Trace 1
+    rsa.write('trace2:dpx 1')  # Trace 2
+    rsa.write('trace3:dpx 1')  # Trace 3
+    rsa.write('trace4:dpx 0')  # Math
+    rsa.write('trace5:dpx 1')  # Bitmap
+    rsa.write('trace6:dpx 1')  # DPXogram
+    rsa.write('trace7:dpx 1')  # DPXogram Line
+
+    rsa.close()
+
+
+if __name__ == '__main__':
+    main()
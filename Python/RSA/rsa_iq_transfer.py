@@ -18,76 +18,86 @@ Tested on RSA306B, RSA507A, and RSA5126B
 
 import visa
 import numpy as np
-import matplotlib.pyplot as plt
-
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-rsa = rm.open_resource('GPIB8::1::INSTR')
-rsa.timeout = 10000
-rsa.encoding = 'latin_1'
-rsa.write_termination = None
-rsa.read_termination = '\n'
-print(rsa.query('*idn?'))
-rsa.write('*rst')
-rsa.write('*cls')
-
-"""#################CONFIGURE INSTRUMENT#################"""
-# Configuration parameters.
-cf = 1e9
-span = 40e6
-refLevel = 0
-timeScale = 100e-6
-timeOffset = -10e-6
-trigLevel = -10
-
-# Stop acquisitions while setting up instrument.
-rsa.write('abort')
-
-# Open spectrum, time overview, and amplitude vs time displays.
-rsa.write('display:general:measview:new spectrum')
-rsa.write('display:general:measview:new toverview')
-rsa.write('display:general:measview:new iqvtime')
-
-# Configure amplitude vs time measurement.
-rsa.write('spectrum:frequency:center {}'.format(cf))
-rsa.write('spectrum:frequency:span {}'.format(span))
-rsa.write('input:rlevel {}'.format(refLevel))
-rsa.write('sense:iqvtime:span {}'.format(span))
-rsa.write('sense:analysis:length {}'.format(timeScale))
-rsa.write('sense:analysis:start {}'.format(timeOffset))
-
-# Configure power level trigger.
-rsa.write('trigger:event:input:type power')
-rsa.write('trigger:event:input:level {}'.format(trigLevel))
-
-# Configure acquisition mode
-rsa.write('initiate:continuous off')
-rsa.write('trigger:status on')
-
-"""#################ACQUIRE DATA#################"""
-# Start acquisition.
-rsa.write('initiate:immediate')
-rsa.query('*opc?')
-
-# Get raw amplitude vs time data from RSA.
-iq = rsa.query_binary_values('fetch:rfin:iq? 1', datatype='f', container=np.array)
-i = iq[0:-2:2]
-q = iq[1:-1:2]
-
-"""#################PLOT DATA#################"""
-# Create time vector for plotting.
-acqStart = float(rsa.query('display:iqvtime:x:scale:offset?'))
-acqEnd = acqStart + float(rsa.query('display:iqvtime:x:scale?'))
-time = np.linspace(acqStart, acqEnd, len(i))
-
-# plot the data
-fig = plt.figure(1, figsize=(10, 7))
-ax = fig.add_subplot(111, facecolor='k')
-ax.plot(time, i, 'y')
-ax.plot(time, q, 'c')
-ax.set_title('IQ vs Time')
-ax.set_ylabel('Voltage (V)')
-ax.set_xlabel('Time (s)')
-plt.show()
-
-rsa.close()
+
+
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    rsa = rm.open_resource('GPIB8::1::INSTR')
+    rsa.timeout = 10000
+    rsa.encoding = 'latin_1'
+    rsa.write_termination = None
+    rsa.read_termination = '\n'
+    print(rsa.query('*idn?'))
+    rsa.write('*rst')
+    rsa.write('*cls')
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    # Configuration parameters.
+    cf = 1e9
+    span = 40e6
+    refLevel = 0
+    timeScale = 100e-6
+    timeOffset = -10e-6
+    trigLevel = -10
+
+    # Stop acquisitions while setting up instrument.
+    rsa.write('abort')
+
+    # Open spectrum, time overview, and amplitude vs time displays.
+    rsa.write('display:general:measview:new spectrum')
+    rsa.write('display:general:measview:new toverview')
+    rsa.write('display:general:measview:new iqvtime')
+
+    # Configure amplitude vs time measurement.
+    rsa.write('spectrum:frequency:center {}'.format(cf))
+    rsa.write('spectrum:frequency:span {}'.format(span))
+    rsa.write('input:rlevel {}'.format(refLevel))
+    rsa.write('sense:iqvtime:span {}'.format(span))
+    rsa.write('sense:analysis:length {}'.format(timeScale))
+    rsa.write('sense:analysis:start {}'.format(timeOffset))
+
+    # Configure power level trigger.
+    rsa.write('trigger:event:input:type power')
+    rsa.write('trigger:event:input:level {}'.format(trigLevel))
+
+    # Configure acquisition mode
+    rsa.write('initiate:continuous off')
+    rsa.write('trigger:status on')
+
+    """#################ACQUIRE DATA#################"""
+    # Start acquisition.
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
+
+    # Get raw IQ data from RSA. Interleaved float32 I/Q pairs have the same
+    # memory layout as complex64, so view the data rather than de-interleaving.
+    # (socket_instrument.SocketInstrument.iq_fetch() receives straight into
+    # a complex64 buffer without the intermediate list.)
+    iq = rsa.query_binary_values('fetch:rfin:iq? 1', datatype='f', container=np.array)
+    iq = iq.astype(np.float32, copy=False).view(np.complex64)
+    i = iq.real
+    q = iq.imag
+
+    """#################PLOT DATA#################"""
+    import matplotlib.pyplot as plt
+    # Create time vector for plotting.
+    acqStart = float(rsa.query('display:iqvtime:x:scale:offset?'))
+    acqEnd = acqStart + float(rsa.query('display:iqvtime:x:scale?'))
+    time = np.linspace(acqStart, acqEnd, len(i))
+
+    # plot the data
+    fig = plt.figure(1, figsize=(10, 7))
+    ax = fig.add_subplot(111, facecolor='k')
+    ax.plot(time, i, 'y')
+    ax.plot(time, q, 'c')
+    ax.set_title('IQ vs Time')
+    ax.set_ylabel('Voltage (V)')
+    ax.set_xlabel('Time (s)')
+    plt.show()
+
+    rsa.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -17,54 +17,60 @@ Tested on RSA306B, RSA507A, RSA5126B
 
 import visa
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-# rsa = rm.open_resource('TCPIP::192.168.1.9::INSTR')
-rsa = rm.open_resource('GPIB8::1::INSTR')
-rsa.timeout = 10000
-rsa.encoding = 'latin_1'
-rsa.write_termination = None
-rsa.read_termination = '\n'
-print('Connected to', rsa.query('*idn?'))
 
-rsa.write('*rst')
-rsa.write('*cls')
-rsa.write('abort')
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    # rsa = rm.open_resource('TCPIP::192.168.1.9::INSTR')
+    rsa = rm.open_resource('GPIB8::1::INSTR')
+    rsa.timeout = 10000
+    rsa.encoding = 'latin_1'
+    rsa.write_termination = None
+    rsa.read_termination = '\n'
+    print('Connected to', rsa.query('*idn?'))
 
-"""#################CONFIGURE INSTRUMENT#################"""
-# Configure acquisition parameters
-cf = 2.4453e9
-span = 40e6
+    rsa.write('*rst')
+    rsa.write('*cls')
+    rsa.write('abort')
 
-# Configure new displays
-rsa.write('display:general:measview:new dpx')
-rsa.write('spectrum:frequency:center {}'.format(cf))
-rsa.write('spectrum:frequency:span {}'.format(span))
+    """#################CONFIGURE INSTRUMENT#################"""
+    # Configure acquisition parameters
+    cf = 2.4453e9
+    span = 40e6
 
-# Configure mask test
-rsa.write('calculate:search:limit:match:beep on')
-rsa.write('calculate:search:limit:match:sacquire off')
-rsa.write('calculate:search:limit:match:sdata off')
-rsa.write('calculate:search:limit:match:spicture off')
-rsa.write('calculate:search:limit:match:strace off')
-rsa.write('calculate:search:limit:operation omask')
-rsa.write('calculate:search:limit:operation:feed "dpx", "Trace1"')
-rsa.write('calculate:search:limit:state on')
+    # Configure new displays
+    rsa.write('display:general:measview:new dpx')
+    rsa.write('spectrum:frequency:center {}'.format(cf))
+    rsa.write('spectrum:frequency:span {}'.format(span))
 
+    # Configure mask test
+    rsa.write('calculate:search:limit:match:beep on')
+    rsa.write('calculate:search:limit:match:sacquire off')
+    rsa.write('calculate:search:limit:match:sdata off')
+    rsa.write('calculate:search:limit:match:spicture off')
+    rsa.write('calculate:search:limit:match:strace off')
+    rsa.write('calculate:search:limit:operation omask')
+    rsa.write('calculate:search:limit:operation:feed "dpx", "Trace1"')
+    rsa.write('calculate:search:limit:state on')
 
-"""#################ACQUIRE DATA#################"""
-rsa.write('initiate:immediate')
-rsa.query('*opc?')
 
-# Query and print mask violations
-if int(rsa.query('calculate:search:limit:fail?').strip()) == 1:
-    maskPoints = rsa.query('calculate:search:limit:report:data?')
-    # print(maskPoints)
-    maskPoints = [m.replace('"', '') for m in maskPoints.strip().split(',"')]
-    print('Mask Violations: {}'.format(maskPoints[0]))
-    for m in maskPoints[1:]:
-        print('Violation Range: {}'.format(m))
-else:
-    print('No mask violations have occurred.')
+    """#################ACQUIRE DATA#################"""
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
 
-rsa.close()
+    # Query and print mask violations
+    if int(rsa.query('calculate:search:limit:fail?').strip()) == 1:
+        maskPoints = rsa.query('calculate:search:limit:report:data?')
+        # print(maskPoints)
+        maskPoints = [m.replace('"', '') for m in maskPoints.strip().split(',"')]
+        print('Mask Violations: {}'.format(maskPoints[0]))
+        for m in maskPoints[1:]:
+            print('Violation Range: {}'.format(m))
+    else:
+        print('No mask violations have occurred.')
+
+    rsa.close()
+
+
+if __name__ == '__main__':
+    main()
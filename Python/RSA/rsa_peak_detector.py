@@ -18,74 +18,80 @@ Tested on RSA306B, RSA507A, RSA5126B
 
 import visa
 from csv import writer
-import matplotlib.pyplot as plt
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-rsa = rm.open_resource('GPIB8::1::INSTR')
-rsa.timeout = 10000
-rsa.encoding = 'latin_1'
-rsa.write_termination = None
-rsa.read_termination = '\n'
-print('Connected to', rsa.query('*idn?'))
 
-rsa.write('*rst')
-rsa.write('*cls')
-rsa.write('abort')
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    rsa = rm.open_resource('GPIB8::1::INSTR')
+    rsa.timeout = 10000
+    rsa.encoding = 'latin_1'
+    rsa.write_termination = None
+    rsa.read_termination = '\n'
+    print('Connected to', rsa.query('*idn?'))
 
-"""#################CONFIGURE INSTRUMENT#################"""
-# Configure acquisition parameters.
-freq = 2e9
-span = 40e6
-rbw = 100
-refLevel = 0
+    rsa.write('*rst')
+    rsa.write('*cls')
+    rsa.write('abort')
 
-# Configure spectrum capture
-rsa.write('spectrum:frequency:center {}'.format(freq))
-rsa.write('spectrum:frequency:span {}'.format(span))
-rsa.write('spectrum:bandwidth {}'.format(rbw))
-rsa.write('input:rlevel {}'.format(refLevel))
+    """#################CONFIGURE INSTRUMENT#################"""
+    # Configure acquisition parameters.
+    freq = 2e9
+    span = 40e6
+    rbw = 100
+    refLevel = 0
 
-actualFreq = float(rsa.query('spectrum:frequency:center?'))
-actualSpan = float(rsa.query('spectrum:frequency:span?'))
-actualRbw = float(rsa.query('spectrum:bandwidth?'))
-actualRefLevel = float(rsa.query('input:rlevel?'))
+    # Configure spectrum capture
+    rsa.write('spectrum:frequency:center {}'.format(freq))
+    rsa.write('spectrum:frequency:span {}'.format(span))
+    rsa.write('spectrum:bandwidth {}'.format(rbw))
+    rsa.write('input:rlevel {}'.format(refLevel))
 
-# Sanity check.
-print('CF: {} Hz'.format(actualFreq))
-print('Span: {} Hz'.format(actualSpan))
-print('RBW: {} Hz'.format(actualRbw))
-print('Reference Level: {}\n'.format(actualRefLevel))
+    actualFreq = float(rsa.query('spectrum:frequency:center?'))
+    actualSpan = float(rsa.query('spectrum:frequency:span?'))
+    actualRbw = float(rsa.query('spectrum:bandwidth?'))
+    actualRefLevel = float(rsa.query('input:rlevel?'))
 
-rsa.write('trigger:status off')
-rsa.write('initiate:continuous off')
+    # Sanity check.
+    print('CF: {} Hz'.format(actualFreq))
+    print('Span: {} Hz'.format(actualSpan))
+    print('RBW: {} Hz'.format(actualRbw))
+    print('Reference Level: {}\n'.format(actualRefLevel))
 
-"""#################ACQUIRE DATA#################"""
-# Add marker for measurement
-rsa.write('calculate:marker:add')
-peakFreq = []
-peakAmp = []
-n = 10
-with open('peak_detector.csv', 'w') as f:
-    w = writer(f, lineterminator='\n')
-    w.writerow(['Frequency', 'Amplitude'])
-    # Acquisition/measurement loop.
-    for i in range(n):
-        rsa.write('initiate:immediate')
-        rsa.query('*opc?')
+    rsa.write('trigger:status off')
+    rsa.write('initiate:continuous off')
 
-        rsa.write('calculate:spectrum:marker0:maximum')
-        peakFreq.append(float(rsa.query('calculate:spectrum:marker0:X?')))
-        peakAmp.append(float(rsa.query('calculate:spectrum:marker0:Y?')))
-        w.writerow([peakFreq[i], peakAmp[i]])
+    """#################ACQUIRE DATA#################"""
+    # Add marker for measurement
+    rsa.write('calculate:marker:add')
+    peakFreq = []
+    peakAmp = []
+    n = 10
+    with open('peak_detector.csv', 'w') as f:
+        w = writer(f, lineterminator='\n')
+        w.writerow(['Frequency', 'Amplitude'])
+        # Acquisition/measurement loop.
+        for i in range(n):
+            rsa.write('initiate:immediate')
+            rsa.query('*opc?')
 
-plt.scatter(peakFreq, peakAmp)
-plt.title('Scatter Plot of Amplitude vs Frequency')
-plt.xlabel('Frequency (Hz)')
-plt.ylabel('Amplitude (dBm)')
-plt.xlim((freq - span / 2), (freq + span / 2))
-plt.ylim(refLevel, refLevel - 100)
-plt.tight_layout()
-plt.show()
+            rsa.write('calculate:spectrum:marker0:maximum')
+            peakFreq.append(float(rsa.query('calculate:spectrum:marker0:X?')))
+            peakAmp.append(float(rsa.query('calculate:spectrum:marker0:Y?')))
+            w.writerow([peakFreq[i], peakAmp[i]])
 
-rsa.close()
+    import matplotlib.pyplot as plt
+    plt.scatter(peakFreq, peakAmp)
+    plt.title('Scatter Plot of Amplitude vs Frequency')
+    plt.xlabel('Frequency (Hz)')
+    plt.ylabel('Amplitude (dBm)')
+    plt.xlim((freq - span / 2), (freq + span / 2))
+    plt.ylim(refLevel, refLevel - 100)
+    plt.tight_layout()
+    plt.show()
+
+    rsa.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -16,58 +16,67 @@ http://www.tek.com/spectrum-analyzer/inst5000-manual-7
 Tested on RSA306B, RSA507A, RSA5126B
 """
 
+import os
+import sys
 import visa
 import numpy as np
-import matplotlib.pyplot as plt
+# sampled_axis.py is in the parent directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sampled_axis import SampledAxis
 
-"""#################SEARCH/CONNECT#################"""
-rm = visa.ResourceManager()
-rsa = rm.open_resource('GPIB8::1::INSTR')
-rsa.timeout = 10000
-rsa.encoding = 'latin_1'
-rsa.write_termination = None
-rsa.read_termination = '\n'
-print('Connected to', rsa.query('*idn?'))
 
-rsa.write('*rst')
-rsa.write('*cls')
-rsa.write('abort')
+def main():
+    """#################SEARCH/CONNECT#################"""
+    rm = visa.ResourceManager()
+    rsa = rm.open_resource('GPIB8::1::INSTR')
+    rsa.timeout = 10000
+    rsa.encoding = 'latin_1'
+    rsa.write_termination = None
+    rsa.read_termination = '\n'
+    print('Connected to', rsa.query('*idn?'))
 
-"""#################CONFIGURE INSTRUMENT#################"""
-# Configure acquisition parameters.
-cf = 2.4453e9
-span = 40e6
-refLevel = 0
+    rsa.write('*rst')
+    rsa.write('*cls')
+    rsa.write('abort')
 
-rsa.write('spectrum:frequency:center {}'.format(cf))
-rsa.write('spectrum:frequency:span {}'.format(span))
-rsa.write('input:rlevel {}'.format(refLevel))
+    """#################CONFIGURE INSTRUMENT#################"""
+    # Configure acquisition parameters.
+    cf = 2.4453e9
+    span = 40e6
+    refLevel = 0
 
-rsa.write('initiate:continuous off')
-rsa.write('trigger:status off')
+    rsa.write('spectrum:frequency:center {}'.format(cf))
+    rsa.write('spectrum:frequency:span {}'.format(span))
+    rsa.write('input:rlevel {}'.format(refLevel))
 
-"""#################ACQUIRE DATA#################"""
-rsa.write('initiate:immediate')
-rsa.query('*opc?')
+    rsa.write('initiate:continuous off')
+    rsa.write('trigger:status off')
 
-spectrum = rsa.query_binary_values('fetch:spectrum:trace?', datatype='f',
-                                   container=np.array)
+    """#################ACQUIRE DATA#################"""
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
 
-"""#################PLOTS#################"""
-# Generate the frequency vector for plotting.
-fMin = cf - span / 2
-fMax = cf + span / 2
-freq = np.linspace(fMin, fMax, len(spectrum))
+    spectrum = rsa.query_binary_values('fetch:spectrum:trace?', datatype='f',
+                                       container=np.array)
 
-fig = plt.figure(1, figsize=(15, 8))
-ax = fig.add_subplot(111, facecolor='k')
-ax.plot(freq / 1e9, spectrum, 'y')
-ax.set_title('Spectrum')
-ax.set_xlabel('Frequency (GHz)')
-ax.set_ylabel('Amplitude (dBm)')
-ax.set_xlim(fMin / 1e9, fMax / 1e9)
-ax.set_ylim(refLevel - 100, refLevel)
-plt.tight_layout()
-plt.show()
+    """#################PLOTS#################"""
+    import matplotlib.pyplot as plt
+    # Frequency axis: the first and last trace points are on the span edges.
+    freq = SampledAxis.from_span(cf, span, len(spectrum)) / 1e9
 
-rsa.close()
+    fig = plt.figure(1, figsize=(15, 8))
+    ax = fig.add_subplot(111, facecolor='k')
+    ax.plot(np.asarray(freq), spectrum, 'y')
+    ax.set_title('Spectrum')
+    ax.set_xlabel('Frequency (GHz)')
+    ax.set_ylabel('Amplitude (dBm)')
+    ax.set_xlim(freq.start, freq.stop)
+    ax.set_ylim(refLevel - 100, refLevel)
+    plt.tight_layout()
+    plt.show()
+
+    rsa.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,52 +14,58 @@ PyVISA 1.8, NumPy 1.13.1
 import visa
 import numpy as np
 
-rm = visa.ResourceManager()
-tsg = rm.open_resource('TCPIP0::192.168.1.12::INSTR')
 
-tsg.write('*RST')
-instID = tsg.query('*idn?')
-print('Connected to {}'.format(instID))
+def main():
+    rm = visa.ResourceManager()
+    tsg = rm.open_resource('TCPIP0::192.168.1.12::INSTR')
 
-# Create waveform data
-# Simple sine wave for I, zero vector for Q.
-# NOTE: max sample rate is 6 MHz
-sampleRate = 6e6
-recordLength = 600
-freq = 10e3
+    tsg.write('*RST')
+    instID = tsg.query('*idn?')
+    print('Connected to {}'.format(instID))
 
-# Create Waveform
-t = np.linspace(0, recordLength / sampleRate, recordLength)
-# Scale the amplitude for int16 values
-i = np.array(32767 * np.sin(2 * np.pi * freq * t), dtype=np.int16)
-q = np.zeros(recordLength, dtype=np.int16)
+    # Create waveform data
+    # Simple sine wave for I, zero vector for Q.
+    # NOTE: max sample rate is 6 MHz
+    sampleRate = 6e6
+    recordLength = 600
+    freq = 10e3
 
-# Create interleaved IQ waveform
-iq = np.empty((i.size + q.size), dtype=i.dtype)
-iq[0::2] = i
-iq[1::2] = q
+    # Create Waveform
+    t = np.linspace(0, recordLength / sampleRate, recordLength)
+    # Scale the amplitude for int16 values
+    i = np.array(32767 * np.sin(2 * np.pi * freq * t), dtype=np.int16)
+    q = np.zeros(recordLength, dtype=np.int16)
 
-# Send IQ data to TSG into SRAM (waveform location 0)
-# Send data as big endian and ensure your data type is 'h' for int16
-tsg.write_binary_values('wrtw 2, {}, '.format(len(iq) * 16), iq, datatype='h', is_big_endian=True)
+    # Create interleaved IQ waveform
+    iq = np.empty((i.size + q.size), dtype=i.dtype)
+    iq[0::2] = i
+    iq[1::2] = q
 
-# Configure amplitude and frequency
-tsg.write('ampr 0')
-tsg.write('freq 1 GHz')
+    # Send IQ data to TSG into SRAM (waveform location 0)
+    # Send data as big endian and ensure your data type is 'h' for int16
+    tsg.write_binary_values('wrtw 2, {}, '.format(len(iq) * 16), iq, datatype='h', is_big_endian=True)
 
-# Select phase modulation
-tsg.write('type 2')
-# Vector modulation subtype
-tsg.write('styp 1')
-# User waveform source
-tsg.write('qfnc 11')
-# Load waveform sent previously
-tsg.write('wavf 0')
-# Configure sample rate
-tsg.write('symr {}'.format(sampleRate))
+    # Configure amplitude and frequency
+    tsg.write('ampr 0')
+    tsg.write('freq 1 GHz')
 
-# Turn on modulation and RF output
-tsg.write('modl 1')
-tsg.write('enbr 1')
+    # Select phase modulation
+    tsg.write('type 2')
+    # Vector modulation subtype
+    tsg.write('styp 1')
+    # User waveform source
+    tsg.write('qfnc 11')
+    # Load waveform sent previously
+    tsg.write('wavf 0')
+    # Configure sample rate
+    tsg.write('symr {}'.format(sampleRate))
 
-tsg.close()
+    # Turn on modulation and RF output
+    tsg.write('modl 1')
+    tsg.write('enbr 1')
+
+    tsg.close()
+
+
+if __name__ == '__main__':
+    main()
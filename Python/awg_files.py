@@ -0,0 +1,434 @@
+"""
+AWG Waveform and Sequence Files
+Updated: 10/26
+Writes and reads AWG70k/AWG5200 .wfmx waveform files and .seqx
+sequence files on the host, so waveform and sequence libraries can be
+built offline (e.g. in parallel on a build server) and loaded onto the
+AWG with one file transfer and one mmemory:open each.
+A .wfmx file is an XML header followed by float32 samples and, if
+included, one uint8 marker byte per sample. The header's DataFile
+offset attribute is the size of the header in bytes. Sample and marker
+data are accessed through memory maps, so files can be larger than
+RAM and are written chunk by chunk.
+A .seqx file is a zip archive of an .sml sequence description plus
+the .wfmx files it uses. Waveforms are stored uncompressed, so the
+reader maps them directly inside the archive.
+See AWG/awg_load_play.py for loading files that are already on the AWG.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import os
+import re
+import shutil
+import struct
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+import numpy as np
+from awg_sequence import SequenceStep
+
+
+NS = '{http://www.tektronix.com}'
+
+WFMX_HEADER = (
+    '<DataFile offset="{offset:09d}" version="0.1">'
+    '<DataSetsCollection xmlns="http://www.tektronix.com">'
+    '<DataSets version="1" xmlns="http://www.tektronix.com">'
+    '<DataDescription>'
+    '<NumberSamples>{numSamples}</NumberSamples>'
+    '<SamplesType>AWGWaveformSample</SamplesType>'
+    '<MarkersIncluded>{markers}</MarkersIncluded>'
+    '<NumberFormat>Single</NumberFormat>'
+    '<Endian>Little</Endian>'
+    '<Timestamp>{timestamp}</Timestamp>'
+    '</DataDescription>'
+    '<ProductSpecific name="">'
+    '<ReccSamplingRate units="Hz">{sampleRate}</ReccSamplingRate>'
+    '<ReccAmplitude units="Volts">{amplitude}</ReccAmplitude>'
+    '<ReccOffset units="Volts">{offsetVolts}</ReccOffset>'
+    '<SerialNumber />'
+    '<SoftwareVersion>1.0.0917</SoftwareVersion>'
+    '<UserNotes>{notes}</UserNotes>'
+    '<OriginalBitDepth>Floating</OriginalBitDepth>'
+    '<Thumbnail />'
+    '<CreatorProperties name="" />'
+    '<SignalFormat>Real</SignalFormat>'
+    '</ProductSpecific>'
+    '</DataSets>'
+    '<AuxDataSets version="1" xmlns="http://www.tektronix.com" />'
+    '</DataSetsCollection>'
+    '<Setup />'
+    '</DataFile>')
+
+
+class AWGFileError(Exception):
+    """AWG File Exception class"""
+    pass
+
+
+def _number(value):
+    return 'NaN' if value is None else repr(float(value))
+
+
+def _timestamp():
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def wfmx_header(numSamples, markers=True, sampleRate=None, amplitude=None,
+                offset=None, notes=''):
+    """Returns the .wfmx XML header as bytes, with its own length filled in."""
+    fields = dict(numSamples=int(numSamples), markers='true' if markers else 'false',
+                  timestamp=_timestamp(), sampleRate=_number(sampleRate),
+                  amplitude=_number(amplitude), offsetVolts=_number(offset),
+                  notes=escape(notes))
+    length = len(WFMX_HEADER.format(offset=0, **fields).encode('utf-8'))
+    return WFMX_HEADER.format(offset=length, **fields).encode('utf-8')
+
+
+class WfmxWriter:
+    def __init__(self, fileName, numSamples, markers=True, sampleRate=None,
+                 amplitude=None, offset=None, notes=''):
+        """Creates fileName with room for numSamples samples (and markers).
+
+        samples (float32) and markers (uint8) are writable memory maps
+        of the data sections; fill them directly or with write()."""
+        self.fileName = fileName
+        self.numSamples = int(numSamples)
+        header = wfmx_header(numSamples, markers, sampleRate, amplitude, offset, notes)
+        self.dataOffset = len(header)
+        size = self.dataOffset + self.numSamples * (5 if markers else 4)
+        with open(fileName, 'wb') as f:
+            f.write(header)
+            f.truncate(size)
+        self.samples = np.memmap(fileName, dtype=np.float32, mode='r+',
+                                 offset=self.dataOffset, shape=(self.numSamples,))
+        self.markers = None
+        if markers:
+            self.markers = np.memmap(fileName, dtype=np.uint8, mode='r+',
+                                     offset=self.dataOffset + 4 * self.numSamples,
+                                     shape=(self.numSamples,))
+
+    def write(self, start, samples=None, markers=None):
+        """Writes a chunk of samples and/or markers starting at sample start."""
+        if samples is not None:
+            self.samples[start:start + len(samples)] = samples
+        if markers is not None:
+            if self.markers is None:
+                raise AWGFileError(f'{self.fileName} was created without markers.')
+            self.markers[start:start + len(markers)] = markers
+
+    def close(self):
+        for m in (self.samples, self.markers):
+            if m is not None:
+                m.flush()
+        self.samples = self.markers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_wfmx(fileName, numSamples, chunks, markerChunks=None, **metadata):
+    """Writes a .wfmx file from iterables of sample (and marker) chunks.
+
+    Chunks are written as they arrive, e.g. from waveform_synth.synthesize()
+    and MarkerPattern.chunks() (whose (offset, data) pairs are accepted)."""
+    with WfmxWriter(fileName, numSamples, markerChunks is not None, **metadata) as w:
+        start = 0
+        for chunk in chunks:
+            w.write(start, chunk)
+            start += len(chunk)
+        if markerChunks is not None:
+            start = 0
+            for chunk in markerChunks:
+                if isinstance(chunk, tuple):
+                    start, chunk = chunk
+                w.write(start, markers=chunk)
+                start += len(chunk)
+
+
+def _read_header(f, base=0, maxHeader=1 << 16):
+    f.seek(base)
+    head = f.read(64)
+    m = re.search(rb'offset="(\d+)"', head)
+    if m is None:
+        raise AWGFileError('Not a .wfmx file: no DataFile offset.')
+    length = int(m.group(1))
+    if length > maxHeader:
+        raise AWGFileError(f'Unreasonable .wfmx header length: {length}')
+    f.seek(base)
+    return length, ET.fromstring(f.read(length))
+
+
+class WfmxFile:
+    def __init__(self, fileName, base=0):
+        """Opens a .wfmx file read-only (base is its offset inside a larger file).
+
+        samples and markers are read-only memory maps; markers is None
+        if the file has none. metadata holds the ProductSpecific fields."""
+        self.fileName = fileName
+        with open(fileName, 'rb') as f:
+            headerLength, root = _read_header(f, base)
+        desc = root.find(f'.//{NS}DataDescription')
+        if desc is None:
+            raise AWGFileError(f'{fileName}: missing DataDescription.')
+        self.numSamples = int(desc.findtext(f'{NS}NumberSamples'))
+        if desc.findtext(f'{NS}NumberFormat', 'Single') != 'Single' or \
+                desc.findtext(f'{NS}Endian', 'Little') != 'Little':
+            raise AWGFileError(f'{fileName}: only little-endian float32 data is supported.')
+        hasMarkers = desc.findtext(f'{NS}MarkersIncluded', 'false').lower() == 'true'
+        self.timestamp = desc.findtext(f'{NS}Timestamp')
+
+        self.metadata = {}
+        product = root.find(f'.//{NS}ProductSpecific')
+        if product is not None:
+            for child in product:
+                if child.text is not None and len(child) == 0:
+                    self.metadata[child.tag.replace(NS, '')] = child.text
+        self.sampleRate = self._float('ReccSamplingRate')
+        self.amplitude = self._float('ReccAmplitude')
+
+        dataOffset = base + headerLength
+        self.samples = np.memmap(fileName, dtype=np.float32, mode='r', offset=dataOffset,
+                                 shape=(self.numSamples,))
+        self.markers = None
+        if hasMarkers:
+            self.markers = np.memmap(fileName, dtype=np.uint8, mode='r',
+                                     offset=dataOffset + 4 * self.numSamples,
+                                     shape=(self.numSamples,))
+
+    def _float(self, key):
+        try:
+            value = float(self.metadata.get(key, 'nan'))
+        except ValueError:
+            return None
+        return None if np.isnan(value) else value
+
+    def __len__(self):
+        return self.numSamples
+
+
+# SequenceStep (SCPI) values -> .sml values.
+_REPEAT = {'once': 'Once', 'inf': 'Infinite', 'infinite': 'Infinite'}
+_EVENT = {'none': 'None', 'atrigger': 'TrigA', 'btrigger': 'TrigB', 'itrigger': 'Internal'}
+_JUMP = {'next': 'Next', 'first': 'First', 'last': 'Last', 'end': 'End'}
+
+
+def _jump(value):
+    if isinstance(value, str) and value.lower() in _JUMP:
+        return _JUMP[value.lower()], 1
+    return 'StepIndex', int(value)
+
+
+def sml_step(number, step, numTracks):
+    """XML for one SequenceStep."""
+    waveforms = step.waveforms
+    if isinstance(waveforms, str):
+        waveforms = [waveforms] * numTracks
+    if isinstance(step.repeat, str) and step.repeat.lower() in _REPEAT:
+        repeat, count = _REPEAT[step.repeat.lower()], 1
+    else:
+        repeat, count = 'RepeatCount', int(step.repeat)
+    eventTo, eventStep = _jump(step.eventJump)
+    goTo, goToStep = _jump(step.goto)
+    assets = ''.join(f'<Asset><AssetName>{escape(w)}</AssetName>'
+                     f'<AssetType>Waveform</AssetType></Asset>' for w in waveforms)
+    flags = ''.join('<FlagSet>' + ''.join(f'<Flag name="{f}">NoChange</Flag>' for f in 'ABCD')
+                    + '</FlagSet>' for _ in waveforms)
+    return (f'<Step><StepNumber>{number}</StepNumber>'
+            f'<Repeat>{repeat}</Repeat><RepeatCount>{count}</RepeatCount>'
+            f'<WaitInput>None</WaitInput>'
+            f'<EventJumpInput>{_EVENT[step.eventInput.lower()]}</EventJumpInput>'
+            f'<EventJumpTo>{eventTo}</EventJumpTo><EventJumpStep>{eventStep}</EventJumpStep>'
+            f'<GoTo>{goTo}</GoTo><GoToStep>{goToStep}</GoToStep>'
+            f'<Assets>{assets}</Assets><Flags>{flags}</Flags></Step>')
+
+
+def sml_document(name, steps, numTracks):
+    """The .sml description of a sequence of SequenceSteps."""
+    body = ''.join(sml_step(i, s, numTracks) for i, s in enumerate(steps, 1))
+    doc = ('<DataFile offset="{offset:09d}" version="0.1">'
+           '<DataSetsCollection xmlns="http://www.tektronix.com">'
+           '<DataSets version="1" xmlns="http://www.tektronix.com"><Sequence>'
+           f'<Name>{escape(name)}</Name><NumSteps>{len(steps)}</NumSteps>'
+           f'<WaveformType>Analog</WaveformType><NumTracks>{numTracks}</NumTracks>'
+           f'<Steps>{body}</Steps><CreatorProperties name="" />'
+           '</Sequence></DataSets></DataSetsCollection><Setup /></DataFile>')
+    length = len(doc.format(offset=0).encode('utf-8'))
+    return doc.format(offset=length).encode('utf-8')
+
+
+class SeqxWriter:
+    def __init__(self, fileName, name, numTracks=1):
+        """Creates a .seqx archive for sequence name."""
+        self.fileName = fileName
+        self.name = name
+        self.numTracks = numTracks
+        self.steps = []
+        self.waveforms = []
+        self.zip = zipfile.ZipFile(fileName, 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+    def add_waveform(self, wfmxFile, name=None):
+        """Copies a .wfmx file into the archive in bounded-size pieces."""
+        name = name or os.path.splitext(os.path.basename(wfmxFile))[0]
+        info = zipfile.ZipInfo(f'Waveforms/{name}.wfmx', time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with open(wfmxFile, 'rb') as src, self.zip.open(info, 'w', force_zip64=True) as dst:
+            shutil.copyfileobj(src, dst, 1 << 24)
+        self.waveforms.append(name)
+        return name
+
+    def add_step(self, step):
+        """Appends an awg_sequence.SequenceStep."""
+        self.steps.append(step)
+
+    def close(self):
+        missing = {w for s in self.steps for w in
+                   ([s.waveforms] if isinstance(s.waveforms, str) else s.waveforms)
+                   } - set(self.waveforms)
+        if missing:
+            self.zip.close()
+            raise AWGFileError(f'Steps use waveforms not in the archive: {sorted(missing)}')
+        self.zip.writestr(f'Sequences/{self.name}.sml',
+                          sml_document(self.name, self.steps, self.numTracks))
+        self.zip.writestr('DocumentProperties.xml',
+                          '<DocumentProperties><Timestamp>{}</Timestamp>'
+                          '</DocumentProperties>'.format(_timestamp()))
+        self.zip.writestr('setup.xml', '<RSAPersist version="0.1" />')
+        self.zip.writestr('userNotes.txt', '')
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc, *args):
+        if exc is None:
+            self.close()
+        else:
+            self.zip.close()
+
+
+def _member_offset(fileName, info):
+    """Byte offset of a stored zip member's data within the archive."""
+    with open(fileName, 'rb') as f:
+        f.seek(info.header_offset)
+        local = f.read(30)
+    if local[:4] != b'PK\x03\x04':
+        raise AWGFileError(f'{fileName}: bad local header for {info.filename}.')
+    nameLength, extraLength = struct.unpack('<HH', local[26:30])
+    return info.header_offset + 30 + nameLength + extraLength
+
+
+class SeqxFile:
+    def __init__(self, fileName):
+        """Opens a .seqx archive read-only.
+
+        sequences maps each sequence name to (numTracks, [SequenceStep]).
+        waveform(name) memory-maps a waveform inside the archive."""
+        self.fileName = fileName
+        self.sequences = {}
+        self._members = {}
+        with zipfile.ZipFile(fileName) as z:
+            for info in z.infolist():
+                if info.filename.startswith('Waveforms/') and info.filename.endswith('.wfmx'):
+                    name = info.filename[len('Waveforms/'):-len('.wfmx')]
+                    self._members[name] = info
+                elif info.filename.startswith('Sequences/') and info.filename.endswith('.sml'):
+                    self._read_sequence(z.read(info))
+
+    def _read_sequence(self, data):
+        root = ET.fromstring(data)
+        seq = root.find(f'.//{NS}Sequence')
+        name = seq.findtext(f'{NS}Name')
+        numTracks = int(seq.findtext(f'{NS}NumTracks'))
+        events = {v: k for k, v in _EVENT.items()}
+        steps = []
+        for s in seq.iter(f'{NS}Step'):
+            repeat = s.findtext(f'{NS}Repeat')
+            repeat = int(s.findtext(f'{NS}RepeatCount')) if repeat == 'RepeatCount' else \
+                {'Once': 'once', 'Infinite': 'inf'}[repeat]
+
+            def jump(kind, number):
+                kind = s.findtext(f'{NS}{kind}')
+                return int(s.findtext(f'{NS}{number}')) if kind == 'StepIndex' else kind.lower()
+
+            waveforms = [a.findtext(f'{NS}AssetName') for a in s.iter(f'{NS}Asset')]
+            steps.append(SequenceStep(waveforms, repeat, events[s.findtext(f'{NS}EventJumpInput')],
+                                      jump('EventJumpTo', 'EventJumpStep'),
+                                      jump('GoTo', 'GoToStep')))
+        self.sequences[name] = (numTracks, steps)
+
+    @property
+    def waveforms(self):
+        return list(self._members)
+
+    def waveform(self, name):
+        """Returns the waveform as a WfmxFile mapped inside the archive."""
+        info = self._members[name]
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise AWGFileError(f'{name} is compressed and cannot be memory-mapped.')
+        return WfmxFile(self.fileName, _member_offset(self.fileName, info))
+
+
+def send_file(awg, localFile, remoteFile, chunkSize=1 << 26, debug=False):
+    """Copies a host file to the AWG's disk with mmemory:data.
+
+    The file is memory-mapped and sent in chunkSize blocks, with the
+    status registers checked once at the end."""
+    size = os.path.getsize(localFile)
+    if size == 0:
+        raise AWGFileError(f'{localFile} is empty.')
+    data = np.memmap(localFile, dtype=np.uint8, mode='r')
+    for offset in range(0, size, chunkSize):
+        awg.binblockwrite(f'mmemory:data "{remoteFile}", {offset}, ',
+                          data[offset:offset + chunkSize], debug, check=False)
+    awg.query('*opc?')
+    awg.check_esr()
+
+
+def load_file(awg, localFile, remoteFile, sequence=None):
+    """Sends a .wfmx or .seqx file to the AWG and opens it there.
+
+    For a .seqx file, sequence names the sequence to load (its
+    waveforms are loaded with it)."""
+    send_file(awg, localFile, remoteFile)
+    if sequence is None:
+        awg.write(f'mmemory:open "{remoteFile}"')
+    else:
+        awg.write(f'mmemory:open:sasset:sequence "{remoteFile}", "{sequence}"')
+    awg.query('*opc?')
+
+
+def main():
+    from socket_instrument import SocketInstrument
+    from waveform_synth import Tone, Pulse, synthesize
+
+    sampleRate = 25e9
+    length = 250000000
+    # Build the library offline: one waveform file per frequency plus a sequence.
+    with SeqxWriter('library.seqx', 'library') as seqx:
+        for freq in (1e9, 2e9, 3e9):
+            name = f'tone_{int(freq / 1e6)}MHz'
+            signal = Tone(freq) * Pulse(10e-6, 100e-6)
+            write_wfmx(f'{name}.wfmx', length, synthesize(signal, length, sampleRate),
+                       sampleRate=sampleRate)
+            seqx.add_waveform(f'{name}.wfmx')
+            seqx.add_step(SequenceStep(name, 'once', 'atrigger'))
+        seqx.steps[-1].goto = 'first'
+
+    print(SeqxFile('library.seqx').sequences['library'][1][0].waveforms)
+
+    awg = SocketInstrument('192.168.1.12', port=4001, timeout=60)
+    print(awg.instId)
+    load_file(awg, 'library.seqx', 'C:\\Users\\OEM\\Documents\\library.seqx', 'library')
+    awg.write('source1:casset:sequence "library", 1')
+    print(awg.query('system:error:all?'))
+    awg.disconnect()
+
+
+if __name__ == '__main__':
+    main()
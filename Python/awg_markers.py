@@ -0,0 +1,155 @@
+"""
+AWG Marker Builder
+Updated: 10/26
+Builds AWG marker data from bit patterns without Python loops.
+Each bit pattern is held for sampPerSym samples per bit and repeated
+cyclically for the whole waveform, including a partial pattern at the
+end. sampPerSym doesn't have to be an integer (e.g. 18 GS/s and
+7 MS/s): bit k covers samples ceil(k * sampPerSym) up to
+ceil((k + 1) * sampPerSym), so symbol edges never drift.
+Marker bytes are written in place into a caller's uint8 buffer, so a
+waveform of any length can be built and uploaded in fixed-size chunks.
+See AWG/rf_generic_data_marker.py for the single-pattern version.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+
+
+# Bits of the AWG70k marker byte.
+MARKER1 = 0x80
+MARKER2 = 0x40
+
+
+class MarkerError(Exception):
+    """Marker Builder Exception class"""
+    pass
+
+
+def load_bits(fileName):
+    """Reads a bit pattern file with one 0 or 1 per line (e.g. testpattern2.txt)."""
+    bits = np.loadtxt(fileName, dtype=np.uint8, ndmin=1)
+    if np.any(bits > 1):
+        raise MarkerError(f'{fileName} contains values other than 0 and 1.')
+    return bits
+
+
+class MarkerPattern:
+    def __init__(self, sampPerSym, marker1=None, marker2=None, marker1Value=MARKER1,
+                 marker2Value=MARKER2):
+        """Marker pattern from per-symbol bit arrays for marker 1 and marker 2.
+
+        Either marker can be None (always low). If both are given they
+        must be the same length. Each symbol's byte is marker1Value where
+        marker1 is 1, ORed with marker2Value where marker2 is 1."""
+        if sampPerSym < 1:
+            raise MarkerError('sampPerSym must be at least 1.')
+        if marker1 is None and marker2 is None:
+            raise MarkerError('At least one marker pattern is required.')
+        planes = [(np.asarray(m, dtype=np.uint8), v) for m, v in
+                  ((marker1, marker1Value), (marker2, marker2Value)) if m is not None]
+        numBits = len(planes[0][0])
+        if any(len(bits) != numBits for bits, _ in planes) or numBits == 0:
+            raise MarkerError('Marker patterns must be non-empty and the same length.')
+
+        self.sampPerSym = float(sampPerSym)
+        self.symbols = np.zeros(numBits, dtype=np.uint8)
+        for bits, value in planes:
+            self.symbols |= bits.astype(np.bool_) * np.uint8(value)
+
+    @classmethod
+    def from_levels(cls, sampPerSym, bits, zeroValue=MARKER1, oneValue=MARKER2):
+        """Pattern that outputs zeroValue for 0 bits and oneValue for 1 bits.
+
+        The defaults match rf_generic_data_marker.py: marker 1 high on 0
+        bits, marker 2 high on 1 bits."""
+        bits = np.asarray(bits, dtype=np.bool_)
+        return cls(sampPerSym, ~bits, bits, zeroValue, oneValue)
+
+    def __len__(self):
+        """Number of symbols in one pattern period."""
+        return len(self.symbols)
+
+    def _edges(self, first, last):
+        """First sample of symbols first through last (inclusive)."""
+        return np.ceil(np.arange(first, last + 1, dtype=np.float64) * self.sampPerSym
+                       ).astype(np.int64)
+
+    def fill(self, out, offset=0):
+        """Writes the marker bytes for samples offset to offset + len(out) into out.
+
+        out is a writable uint8 array (a slice of a larger buffer, a
+        memory map, ...). Returns out."""
+        numSamples = len(out)
+        if numSamples == 0:
+            return out
+        first = int(offset // self.sampPerSym)
+        last = int((offset + numSamples - 1) // self.sampPerSym)
+        # Float rounding can put the sample just before an edge; step back a symbol.
+        if self._edges(first, first)[0] > offset:
+            first -= 1
+        edges = self._edges(first, last + 1) - offset
+        starts = np.clip(edges[:-1], 0, numSamples)
+        values = self.symbols[np.arange(first, last + 1) % len(self.symbols)]
+        keep = np.clip(edges[1:], 0, numSamples) > starts
+        starts, values = starts[keep], values[keep]
+
+        # Each symbol's first sample holds the change from the previous symbol
+        # (mod 256) and a running sum fills the runs in place.
+        out[:] = 0
+        out[starts[0]] = values[0]
+        out[starts[1:]] = values[1:] - values[:-1]
+        np.cumsum(out, out=out, dtype=np.uint8)
+        return out
+
+    def build(self, length):
+        """Returns a new uint8 array of length marker bytes."""
+        return self.fill(np.empty(length, dtype=np.uint8))
+
+    def chunks(self, length, chunkSize=1 << 24):
+        """Yields (offset, data) covering length samples in chunkSize pieces.
+
+        The same buffer is reused for every chunk, so consume (e.g.
+        upload) each chunk before asking for the next."""
+        buffer = np.empty(min(chunkSize, length), dtype=np.uint8)
+        for offset in range(0, length, chunkSize):
+            size = min(chunkSize, length - offset)
+            yield offset, self.fill(buffer[:size], offset)
+
+
+def write_markers(awg, wfmName, pattern, length, chunkSize=1 << 24, debug=False):
+    """Uploads pattern as the markers of wfmName through a SocketInstrument.
+
+    Marker bytes are generated chunk by chunk straight into one
+    reusable buffer and sent with wlist:waveform:marker:data, so no
+    full-length marker array is ever built. The status registers are
+    checked once after the last chunk."""
+    wfmName = wfmName.strip().strip('"')
+    for offset, data in pattern.chunks(length, chunkSize):
+        awg.binblockwrite(f'wlist:waveform:marker:data "{wfmName}", {offset}, {len(data)}, ',
+                          data, debug, check=False)
+    awg.query('*opc?')
+    awg.check_esr()
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    sampRate = 18e9
+    symRate = 7e6
+    awg = SocketInstrument('192.168.1.12', port=4000, timeout=25)
+    print(awg.instId)
+
+    # Waveform already compiled by rf_generic_data_marker.py.
+    wfmName = awg.query('wlist:name? 1').strip()
+    wlength = int(awg.query(f'wlist:waveform:length? {wfmName}'))
+
+    pattern = MarkerPattern.from_levels(sampRate / symRate, load_bits('AWG/testpattern2.txt'))
+    write_markers(awg, wfmName, pattern, wlength)
+    print(awg.query('system:error:all?'))
+    awg.disconnect()
+
+
+if __name__ == '__main__':
+    main()
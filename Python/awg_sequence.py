@@ -0,0 +1,191 @@
+"""
+AWG Sequence Builder
+Updated: 10/26
+Builds AWG70k/AWG5200 sequences from a whole table of steps at once.
+Missing waveforms are uploaded back to back with a single status check
+at the end, all step definitions are packed into a few long program
+messages, and editing the table afterwards only sends the fields of
+the steps that changed.
+See AWG/awg_sequencer_phase.py for the one-command-per-field version.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import hashlib
+import numpy as np
+from socket_instrument import SocketInstrument
+
+
+class SequenceError(Exception):
+    """Sequence Builder Exception class"""
+    pass
+
+
+class SequenceStep:
+    def __init__(self, waveforms, repeat='once', eventInput='none',
+                 eventJump='next', goto='next'):
+        """One sequence step.
+
+        waveforms is one waveform name per track (or a single name for
+        every track). repeat is 'once', 'inf', or a count. eventInput is
+        'none', 'atrigger', 'btrigger', or 'itrigger'. eventJump and
+        goto are 'next', 'first', 'last', 'end', or a step number."""
+        self.waveforms = waveforms
+        self.repeat = repeat
+        self.eventInput = eventInput
+        self.eventJump = eventJump
+        self.goto = goto
+
+    def fields(self, numTracks):
+        """Returns {command suffix: argument} for every field of the step."""
+        waveforms = self.waveforms
+        if isinstance(waveforms, str):
+            waveforms = [waveforms] * numTracks
+        if len(waveforms) != numTracks:
+            raise SequenceError(f'Step has {len(waveforms)} waveforms for {numTracks} tracks.')
+        fields = {f'tasset{t}:wav': f'"{w}"' for t, w in enumerate(waveforms, 1)}
+        fields['rcount'] = self.repeat
+        fields['ejinput'] = self.eventInput
+        fields['ejump'] = self.eventJump
+        fields['goto'] = self.goto
+        return fields
+
+
+def waveform_hash(data):
+    """Content hash used to tell whether a waveform needs re-uploading."""
+    return hashlib.sha1(memoryview(np.ascontiguousarray(data)).cast('B')).hexdigest()
+
+
+class SequenceBuilder:
+    def __init__(self, awg, name, numTracks=1, maxLength=4000):
+        """Sequence name on a connected SocketInstrument AWG.
+
+        maxLength is the longest program message sent when defining steps."""
+        self.awg = awg
+        self.name = name
+        self.numTracks = numTracks
+        self.maxLength = maxLength
+        self.table = None
+        self.uploaded = {}
+
+    def _send_batched(self, commands):
+        """Sends commands in as few ;:-joined messages as maxLength allows."""
+        msg = ''
+        for cmd in commands:
+            if msg and len(msg) + 2 + len(cmd) > self.maxLength:
+                self.awg.write(msg)
+                msg = ''
+            msg = cmd if not msg else msg + ';:' + cmd
+        if msg:
+            self.awg.write(msg)
+
+    def upload_waveforms(self, waveforms, force=False):
+        """Uploads the waveforms ({name: float32 array}) not already on the AWG.
+
+        A waveform is skipped if a waveform of that name is in the AWG's
+        waveform list and, when it was uploaded by this builder, its
+        content is unchanged. All blocks are sent back to back and the
+        status registers are checked once. Returns the uploaded names."""
+        onAwg = set()
+        count = int(self.awg.query('wlist:size?'))
+        if count:
+            names = self.awg.query('wlist:list?')
+            onAwg = {n.strip().strip('"') for n in names.split(',')}
+
+        uploaded = []
+        for name, data in waveforms.items():
+            data = np.asarray(data, dtype=np.float32)
+            digest = waveform_hash(data)
+            if not force and name in onAwg and self.uploaded.get(name, digest) == digest:
+                continue
+            if name in onAwg:
+                self.awg.write(f'wlist:waveform:delete "{name}"')
+            self.awg.write(f'wlist:waveform:new "{name}", {len(data)}')
+            self.awg.wfm_writer(name, data, check=False)
+            self.uploaded[name] = digest
+            uploaded.append(name)
+
+        if uploaded:
+            self.awg.query('*opc?')
+            self.awg.check_esr()
+        return uploaded
+
+    def _step_commands(self, step, fields):
+        return [f'slist:seq:step{step}:{field} "{self.name}", {value}'
+                for field, value in fields.items()]
+
+    def define(self, steps):
+        """Creates the sequence from scratch with every step in steps."""
+        self.awg.write(f'slist:seq:delete "{self.name}"')
+        self.awg.write(f'slist:seq:new "{self.name}", {len(steps)}, {self.numTracks}')
+        table = [s.fields(self.numTracks) for s in steps]
+        commands = []
+        for i, fields in enumerate(table, 1):
+            commands += self._step_commands(i, fields)
+        self._send_batched(commands)
+        self.awg.query('*opc?')
+        self.table = table
+        return len(commands)
+
+    def update(self, steps):
+        """Changes the sequence to steps, sending only changed fields.
+
+        If the number of steps changed the sequence is redefined.
+        Returns the number of field commands sent."""
+        if self.table is None or len(steps) != len(self.table):
+            return self.define(steps)
+        table = [s.fields(self.numTracks) for s in steps]
+        commands = []
+        for i, (old, new) in enumerate(zip(self.table, table), 1):
+            changed = {k: v for k, v in new.items() if old.get(k) != v}
+            commands += self._step_commands(i, changed)
+        if commands:
+            self._send_batched(commands)
+            self.awg.query('*opc?')
+        self.table = table
+        return len(commands)
+
+    def assign(self, channels=None):
+        """Assigns track n of the sequence to channel n (or to channels)."""
+        channels = channels or range(1, self.numTracks + 1)
+        for track, channel in enumerate(channels, 1):
+            self.awg.write(f'source{channel}:casset:sequence "{self.name}", {track}')
+
+
+def main():
+    recordLength = 50000
+    deadTime = np.zeros(recordLength, dtype=np.float32)
+    pulse = np.empty(recordLength, dtype=np.float32)
+    pulse[:recordLength // 2] = 1
+    pulse[recordLength // 2:] = -1
+
+    awg = SocketInstrument('192.168.1.12', port=4000, timeout=25)
+    print(awg.instId)
+
+    builder = SequenceBuilder(awg, 'Simple Sequence', numTracks=2)
+    builder.upload_waveforms({'deadTime': deadTime, 'pulse': pulse})
+
+    # 1000 steps: a pulse triggered by A trigger every 10th step.
+    steps = []
+    for i in range(1000):
+        if i % 10 == 0:
+            steps.append(SequenceStep('pulse', 'once', 'atrigger', 'next', 'next'))
+        else:
+            steps.append(SequenceStep('deadTime', 2, 'none', 'next', 'next'))
+    steps[-1].goto = 'first'
+    print('Commands sent:', builder.define(steps))
+
+    # Edit a few steps; only their changed fields are sent.
+    for i in (5, 6, 7):
+        steps[i].repeat = 'inf'
+    print('Commands sent:', builder.update(steps))
+
+    builder.assign()
+    awg.write('awgcontrol:run:immediate')
+    awg.query('*opc?')
+    print(awg.query('system:error:all?'))
+    awg.disconnect()
+
+
+if __name__ == '__main__':
+    main()
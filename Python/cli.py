@@ -0,0 +1,274 @@
+"""
+Command Line Workflows
+Updated: 10/26
+Command line entry points for the RSA, DPO, MDO, AWG, and TSG example
+workflows, for unattended and batch use:
+    python cli.py rsa-spectrum --host 192.168.1.10 --cf 2.4453e9 -o trace.csv
+    python cli.py rsa-iq --model RSA5 --search 192.168.1.0/24 -o iq.npy --plot iq.png
+    python cli.py dpo-fastframe --host 192.168.1.84 --frames 10 -o frame.csv
+    python cli.py awg-tone --host 192.168.1.12 --freq 100e6 --length 500000
+Parameters that the example scripts hardcode are options here. Results
+go to files (.csv or .npy by extension) and plots are only made when
+--plot (save to a file, headless) or --show is given; matplotlib is
+imported only then, so batch runs don't pay for it.
+The workflows themselves are the shared functions in procedures.py;
+this module only parses options, saves results, and plots. Plots of
+long records are decimated with decimation.MinMaxPyramid.
+Python 3.6.3 64-bit
+NumPy 1.13.3, MatPlotLib 2.1.0 (optional)
+"""
+
+import argparse
+import sys
+import numpy as np
+from sampled_axis import SampledAxis
+from procedures import (rsa_spectrum, rsa_iq, rsa_peaks, dpo_fastframe, mdo_rf_amplitude,
+                        awg_tone, awg_load_play, tsg_iq)
+
+
+def pyplot(show=False):
+    """Imports matplotlib.pyplot on first use; non-interactive unless show."""
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def save_result(fileName, columns, header=''):
+    """Saves equal-length columns to .npy (stacked) or text/.csv."""
+    if fileName.endswith('.npy'):
+        np.save(fileName, columns[0] if len(columns) == 1 else np.column_stack(columns))
+    else:
+        np.savetxt(fileName, np.column_stack(columns), delimiter=',', header=header,
+                   comments='')
+
+
+def finish_plot(plt, args):
+    plt.tight_layout()
+    if args.plot:
+        plt.savefig(args.plot)
+    if args.show:
+        plt.show()
+    plt.close('all')
+
+
+"""#################COMMAND LINE#################"""
+
+
+def connect(args, defaultPort):
+    """Opens a SocketInstrument by --host, or by --model/--serial through discovery."""
+    from socket_instrument import SocketInstrument
+    if args.model or args.serial:
+        from discovery import Inventory
+        inventory = Inventory(args.inventory, targets=args.search or ())
+        return inventory.connect(args.model, args.serial, timeout=args.timeout)
+    if not args.host:
+        sys.exit('Give --host, or --model/--serial to look the instrument up.')
+    return SocketInstrument(args.host, args.port or defaultPort, args.timeout)
+
+
+def run_rsa_spectrum(inst, args):
+    freq, spectrum = rsa_spectrum(inst, args.cf, args.span, args.ref_level)
+    if args.output:
+        save_result(args.output, [freq, spectrum], 'Frequency (Hz),Amplitude (dBm)')
+    print(f'Peak: {spectrum.max():.2f} dBm at {freq[spectrum.argmax()] / 1e9:.6f} GHz')
+    if args.plot or args.show:
+        plt = pyplot(args.show)
+        plt.figure(figsize=(15, 8))
+        plt.plot(np.asarray(freq / 1e9), spectrum, 'y')
+        plt.title('Spectrum')
+        plt.xlabel('Frequency (GHz)')
+        plt.ylabel('Amplitude (dBm)')
+        plt.ylim(args.ref_level - 100, args.ref_level)
+        finish_plot(plt, args)
+
+
+def run_rsa_iq(inst, args):
+    record = rsa_iq(inst, args.cf, args.span, args.ref_level, args.length, args.start,
+                    args.trig_level)
+    if args.output:
+        if args.output.endswith('.npy'):
+            np.save(args.output, record.data)
+        else:
+            save_result(args.output, [record.data.real, record.data.imag], 'I,Q')
+    print(f'{len(record)} samples at {record.sampleRate / 1e6:.3f} MS/s')
+    if args.plot or args.show:
+        from iq_dsp import welch_spectrum
+        from decimation import MinMaxPyramid
+        plt = pyplot(args.show)
+        time = SampledAxis(record.acqStart, 1 / record.sampleRate, len(record)) * 1e3
+        plt.figure(figsize=(15, 8))
+        ax = plt.subplot(211, facecolor='k')
+        MinMaxPyramid(record.data.real).plot(ax, axis=time, color='g')
+        MinMaxPyramid(record.data.imag).plot(ax, axis=time, color='y')
+        plt.xlabel('Time (msec)')
+        plt.ylabel('Amplitude (V)')
+        freq, dBm, _ = welch_spectrum(record.data, record.sampleRate,
+                                      centerFreq=record.centerFreq)
+        plt.subplot(212, facecolor='k')
+        plt.plot(freq / 1e9, dBm, 'y')
+        plt.xlabel('Frequency (GHz)')
+        plt.ylabel('Amplitude (dBm)')
+        finish_plot(plt, args)
+
+
+def run_rsa_peaks(inst, args):
+    peaks = rsa_peaks(inst, args.cf, args.span, args.rbw, args.ref_level, args.count)
+    freq, amp = peaks[:, 0], peaks[:, 1]
+    if args.output:
+        save_result(args.output, [freq, amp], 'Frequency,Amplitude')
+    for f, a in zip(freq, amp):
+        print(f, a)
+    if args.plot or args.show:
+        plt = pyplot(args.show)
+        plt.scatter(freq, amp)
+        plt.title('Scatter Plot of Amplitude vs Frequency')
+        plt.xlabel('Frequency (Hz)')
+        plt.ylabel('Amplitude (dBm)')
+        finish_plot(plt, args)
+
+
+def _run_scope(time, volts, args, title):
+    if args.output:
+        save_result(args.output, [time, volts], 'Time (s),Voltage (V)')
+    print(f'{len(volts)} points, {volts.min():.4g} to {volts.max():.4g} V')
+    if args.plot or args.show:
+        from decimation import MinMaxPyramid
+        plt = pyplot(args.show)
+        ax = plt.subplot(111, facecolor='k')
+        time = time * 1e3
+        MinMaxPyramid(volts).plot(ax, axis=time, color='y')
+        plt.title(title)
+        plt.ylabel('Voltage (V)')
+        plt.xlabel('Time (msec)')
+        finish_plot(plt, args)
+
+
+def run_dpo_fastframe(inst, args):
+    time, volts = dpo_fastframe(inst, args.h_scale, args.frames, args.v_scale, args.v_pos,
+                                args.trig_level, args.source)
+    _run_scope(time, volts, args, 'FastFrame Average')
+
+
+def run_mdo_rf(inst, args):
+    time, volts = mdo_rf_amplitude(inst, args.cf, args.span, args.trig_level, args.v_scale,
+                                   args.h_scale, args.h_pos)
+    _run_scope(time, volts, args, 'RF Amplitude vs Time')
+
+
+def run_awg_tone(inst, args):
+    print(awg_tone(inst, args.name, args.sample_rate, args.length, args.freq, args.channel))
+
+
+def run_awg_load(inst, args):
+    fileName = args.file
+    if args.remote is not None:
+        from awg_files import send_file
+        send_file(inst, fileName, args.remote)
+        fileName = args.remote
+    print(awg_load_play(inst, fileName, args.channel))
+
+
+def run_tsg_tone(inst, args):
+    t = np.arange(args.length) / args.sample_rate
+    tsg_iq(inst, np.sin(2 * np.pi * args.freq * t), np.zeros(args.length), args.carrier,
+           args.amplitude, args.sample_rate)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    conn = common.add_argument_group('connection')
+    conn.add_argument('--host', help='instrument IP address or host name')
+    conn.add_argument('--port', type=int, help='socket server port')
+    conn.add_argument('--timeout', type=float, default=10, help='seconds')
+    conn.add_argument('--model', help='find the instrument by model (prefix)')
+    conn.add_argument('--serial', help='find the instrument by serial number')
+    conn.add_argument('--search', action='append',
+                      help='host or subnet to search when discovering (repeatable)')
+    conn.add_argument('--inventory', default='instrument_inventory.json')
+    out = common.add_argument_group('output')
+    out.add_argument('-o', '--output', help='result file (.csv or .npy)')
+    out.add_argument('--plot', help='save a plot to this file (no display needed)')
+    out.add_argument('--show', action='store_true', help='show the plot in a window')
+
+    parser = argparse.ArgumentParser(description='Tektronix instrument workflows.')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    p = sub.add_parser('rsa-spectrum', parents=[common], help='RSA spectrum trace')
+    p.add_argument('--cf', type=float, default=2.4453e9)
+    p.add_argument('--span', type=float, default=40e6)
+    p.add_argument('--ref-level', type=float, default=0)
+    p.set_defaults(func=run_rsa_spectrum, defaultPort=4000)
+
+    p = sub.add_parser('rsa-iq', parents=[common], help='RSA IQ capture')
+    p.add_argument('--cf', type=float, default=1e9)
+    p.add_argument('--span', type=float, default=40e6)
+    p.add_argument('--ref-level', type=float, default=0)
+    p.add_argument('--length', type=float, default=100e-6, help='analysis length (s)')
+    p.add_argument('--start', type=float, default=-10e-6, help='analysis start (s)')
+    p.add_argument('--trig-level', type=float, help='power trigger level (dBm)')
+    p.set_defaults(func=run_rsa_iq, defaultPort=4000)
+
+    p = sub.add_parser('rsa-peaks', parents=[common], help='RSA repeated peak search')
+    p.add_argument('--cf', type=float, default=2e9)
+    p.add_argument('--span', type=float, default=40e6)
+    p.add_argument('--rbw', type=float, default=100)
+    p.add_argument('--ref-level', type=float, default=0)
+    p.add_argument('--count', type=int, default=10)
+    p.set_defaults(func=run_rsa_peaks, defaultPort=4000)
+
+    p = sub.add_parser('dpo-fastframe', parents=[common], help='DPO FastFrame summary frame')
+    p.add_argument('--source', default='ch1')
+    p.add_argument('--frames', type=int, default=10)
+    p.add_argument('--h-scale', type=float, default=1e-6)
+    p.add_argument('--v-scale', type=float, default=0.5)
+    p.add_argument('--v-pos', type=float, default=-2.5)
+    p.add_argument('--trig-level', type=float, default=0.15)
+    p.set_defaults(func=run_dpo_fastframe, defaultPort=4000)
+
+    p = sub.add_parser('mdo-rf', parents=[common], help='MDO RF amplitude vs time')
+    p.add_argument('--cf', type=float, default=1e9)
+    p.add_argument('--span', type=float, default=100e6)
+    p.add_argument('--trig-level', type=float, default=-20)
+    p.add_argument('--v-scale', type=float, default=20e-3)
+    p.add_argument('--h-scale', type=float, default=4e-6)
+    p.add_argument('--h-pos', type=float, default=25)
+    p.set_defaults(func=run_mdo_rf, defaultPort=4000)
+
+    p = sub.add_parser('awg-tone', parents=[common], help='AWG sine wave')
+    p.add_argument('--name', default='test_wfm')
+    p.add_argument('--sample-rate', type=float, default=10e9)
+    p.add_argument('--length', type=int, default=500000)
+    p.add_argument('--freq', type=float, default=100e6)
+    p.add_argument('--channel', type=int, default=1)
+    p.set_defaults(func=run_awg_tone, defaultPort=4001)
+
+    p = sub.add_parser('awg-load', parents=[common], help='AWG load and play a .wfmx file')
+    p.add_argument('file', help='.wfmx file (on the AWG unless --remote is given)')
+    p.add_argument('--remote', help='copy the host file to this path on the AWG first')
+    p.add_argument('--channel', type=int, default=1)
+    p.set_defaults(func=run_awg_load, defaultPort=4001)
+
+    p = sub.add_parser('tsg-tone', parents=[common], help='TSG vector-modulated tone')
+    p.add_argument('--freq', type=float, default=10e3, help='baseband tone (Hz)')
+    p.add_argument('--carrier', type=float, default=1e9)
+    p.add_argument('--amplitude', type=float, default=0, help='dBm')
+    p.add_argument('--sample-rate', type=float, default=6e6)
+    p.add_argument('--length', type=int, default=600)
+    p.set_defaults(func=run_tsg_tone, defaultPort=5025)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    inst = connect(args, args.defaultPort)
+    try:
+        args.func(inst, args)
+    finally:
+        inst.disconnect()
+
+
+if __name__ == '__main__':
+    main()
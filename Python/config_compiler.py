@@ -0,0 +1,206 @@
+"""
+Configuration Compiler
+Updated: 10/26
+Compiles a declarative instrument setup (a dict, or a JSON file, of
+SCPI header: value) into the shortest ordered command sequence and
+packs it into as few transmissions as possible.
+Ordering constraints (e.g. span before RBW, delay mode before delay
+time) are declared once per instrument family, and a setup is diffed
+against the previous one so only changed settings are sent.
+A list value sends the header once per element, in order, e.g.
+{'display:general:measview:new': ['spectrum', 'avtime']}.
+Python 3.6.3 64-bit
+"""
+
+import heapq
+import json
+from collections import OrderedDict
+
+
+class ConfigError(Exception):
+    """Configuration Compiler Exception class"""
+    pass
+
+
+# (before, after) header prefixes: any header starting with before is
+# sent ahead of any header starting with after.
+RSA_ORDER = [
+    ('display:general:measview:new', 'sense:'),
+    ('display:general:measview:new', 'spectrum:'),
+    ('display:general:measview:new', 'display:'),
+    ('spectrum:frequency:center', 'spectrum:frequency:span'),
+    ('spectrum:frequency:span', 'spectrum:bandwidth'),
+    ('spectrum:frequency:span', 'sense:avtime:span'),
+    ('spectrum:frequency:span', 'sense:iqvtime:span'),
+    ('spectrum:frequency:span', 'sense:dpx'),
+    ('input:rlevel', 'trigger:event:input:level'),
+    ('trigger:event:input:type', 'trigger:event:input:level'),
+    ('sense:acquisition', 'sense:analysis'),
+    ('sense:analysis:reference', 'sense:analysis:start'),
+    ('sense:analysis:length', 'sense:analysis:start'),
+    ('sense:ddemod:modulation:type', 'sense:ddemod:srate'),
+    ('sense:ddemod:filter:measurement', 'sense:ddemod:filter:alpha'),
+    ('sense:ddemod:filter:reference', 'sense:ddemod:filter:alpha'),
+    ('calculate:search:limit:operation', 'calculate:search:limit:state'),
+]
+
+SCOPE_ORDER = [
+    ('horizontal:mode:scale', 'horizontal:mode:recordlength'),
+    ('horizontal:delay:mode', 'horizontal:delay:position'),
+    ('horizontal:delay:mode', 'horizontal:delay:time'),
+    ('horizontal:fastframe:state', 'horizontal:fastframe:count'),
+    ('horizontal:fastframe:count', 'horizontal:fastframe:sumframe'),
+    ('horizontal:', 'data:stop'),
+    ('data:source', 'data:stop'),
+    ('data:source', 'wfmoutpre:'),
+    ('data:encdg', 'wfmoutpre:'),
+    ('data:framestart', 'data:framestop'),
+    ('rf:frequency', 'rf:span'),
+    ('select:rf_amplitude', 'rf:rf_amplitude'),
+    ('trigger:a:edge:source', 'trigger:a:logic:threshold'),
+]
+
+
+def load_setup(fileName):
+    """Reads a setup from a JSON object file, keeping its order."""
+    with open(fileName) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def format_value(value):
+    """SCPI text for a setup value."""
+    if isinstance(value, bool):
+        return 'on' if value else 'off'
+    return str(value)
+
+
+def _normalize(header):
+    return header.lower().lstrip(':')
+
+
+class ConfigCompiler:
+    def __init__(self, order=RSA_ORDER + SCOPE_ORDER, maxLength=1000):
+        """order is a list of (before, after) header prefixes.
+
+        maxLength is the longest program message pack() builds."""
+        self.order = [(_normalize(a), _normalize(b)) for a, b in order]
+        self.maxLength = maxLength
+        self.state = OrderedDict()
+
+    def _sorted_headers(self, headers):
+        """Stable topological sort of headers by the ordering constraints."""
+        position = {h: i for i, h in enumerate(headers)}
+        successors = {h: set() for h in headers}
+        indegree = {h: 0 for h in headers}
+        for before, after in self.order:
+            first = [h for h in headers if h.startswith(before)]
+            second = [h for h in headers if h.startswith(after)]
+            for a in first:
+                for b in second:
+                    if a != b and b not in successors[a]:
+                        successors[a].add(b)
+                        indegree[b] += 1
+        ready = [(position[h], h) for h in headers if indegree[h] == 0]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            _, h = heapq.heappop(ready)
+            ordered.append(h)
+            for s in successors[h]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    heapq.heappush(ready, (position[s], s))
+        if len(ordered) != len(headers):
+            cycle = [h for h in headers if indegree[h] > 0]
+            raise ConfigError(f'Ordering constraints form a cycle among: {cycle}')
+        return ordered
+
+    def compile(self, setup, previous=None):
+        """Returns the ordered commands that take previous to setup.
+
+        Settings equal to previous are left out. Settings absent from
+        setup are left as they are on the instrument."""
+        previous = previous or {}
+        prev = {_normalize(h): v for h, v in previous.items()}
+        changes = OrderedDict()
+        for header, value in setup.items():
+            header = _normalize(header)
+            if prev.get(header) != value:
+                changes[header] = value
+
+        commands = []
+        for header in self._sorted_headers(list(changes)):
+            value = changes[header]
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for v in values:
+                commands.append(header if v is None else f'{header} {format_value(v)}')
+        return commands
+
+    def pack(self, commands):
+        """Joins commands into as few program messages as maxLength allows."""
+        messages = []
+        current = ''
+        for cmd in commands:
+            if not current:
+                current = cmd
+            elif len(current) + 2 + len(cmd) <= self.maxLength:
+                current += ';:' + cmd
+            else:
+                messages.append(current)
+                current = cmd
+        if current:
+            messages.append(current)
+        return messages
+
+    def apply(self, inst, setup, sync=True):
+        """Sends only the changes from the last applied setup to inst.
+
+        With sync, a single *opc? after the last message waits for the
+        instrument to finish. Returns the list of messages sent."""
+        messages = self.pack(self.compile(setup, self.state))
+        for msg in messages:
+            inst.write(msg)
+        if sync and messages:
+            inst.query('*opc?')
+        for header, value in setup.items():
+            self.state[_normalize(header)] = value
+        return messages
+
+    def reset(self):
+        """Forgets the applied state (call after *rst or system:preset)."""
+        self.state.clear()
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    compiler = ConfigCompiler()
+    avtSetup = OrderedDict([
+        ('display:general:measview:new', ['spectrum', 'toverview', 'avtime']),
+        ('sense:analysis:start', -10e-6),
+        ('sense:analysis:length', 100e-6),
+        ('sense:avtime:span', 40e6),
+        ('spectrum:frequency:span', 40e6),
+        ('spectrum:frequency:center', 2.4453e9),
+        ('input:rlevel', 0),
+        ('trigger:event:input:level', -10),
+        ('trigger:event:input:type', 'power'),
+        ('initiate:continuous', False),
+        ('trigger:status', True)])
+
+    rsa = SocketInstrument('127.0.0.1', port=4000, timeout=10)
+    rsa.write('*rst')
+    rsa.write('abort')
+    for msg in compiler.apply(rsa, avtSetup):
+        print(msg)
+
+    # Step the center frequency; only one command is sent per point.
+    for cf in (1e9, 2e9, 3e9):
+        step = OrderedDict(avtSetup)
+        step['spectrum:frequency:center'] = cf
+        print(compiler.apply(rsa, step))
+    rsa.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Min/Max Decimation
+Updated: 10/26
+Multi-resolution min/max pyramid for plotting very long records.
+The pyramid is built once per waveform; afterwards any zoom window
+renders at screen resolution in time proportional to the number of
+pixels, not the record length. Every pixel column shows the minimum
+and maximum of all samples behind it, so narrow glitches stay visible.
+Plotting takes an existing matplotlib Axes, so this module doesn't
+import matplotlib.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    def __init__(self, data, base=64, factor=4, chunkSize=1 << 22):
+        """Builds the pyramid for a 1-D record.
+
+        Level 0 holds the min/max of every base samples, and each level
+        above combines factor buckets of the one below, until a level
+        has a single bucket. data may be a memory map; it is read in
+        chunks of chunkSize samples, and kept (not copied) for full
+        resolution zooms."""
+        self.data = data
+        self.base = base
+        self.factor = factor
+        self.length = len(data)
+
+        chunkSize = max(base, chunkSize // base * base)
+        mins = []
+        maxs = []
+        for start in range(0, self.length, chunkSize):
+            chunk = np.asarray(data[start:start + chunkSize])
+            numFull = len(chunk) // base
+            if numFull:
+                buckets = chunk[:numFull * base].reshape(numFull, base)
+                mins.append(buckets.min(axis=1))
+                maxs.append(buckets.max(axis=1))
+            if len(chunk) % base:
+                mins.append(chunk[numFull * base:].min(keepdims=True))
+                maxs.append(chunk[numFull * base:].max(keepdims=True))
+        self.levels = [(np.concatenate(mins), np.concatenate(maxs))] if mins else []
+
+        while self.levels and len(self.levels[-1][0]) > 1:
+            lo, hi = self.levels[-1]
+            index = np.arange(0, len(lo), factor)
+            self.levels.append((np.minimum.reduceat(lo, index),
+                                np.maximum.reduceat(hi, index)))
+
+    def bucket_size(self, level):
+        """Number of samples summarized by one bucket of level."""
+        return self.base * self.factor ** level
+
+    def render(self, start=0, stop=None, pixels=1000):
+        """Min/max envelope of samples start:stop at pixels columns.
+
+        Returns (x, ymin, ymax) where x is the sample index each column
+        starts at. When the window holds no more than 2 * pixels samples
+        the raw samples are returned (ymin is ymax). Otherwise the
+        coarsest level with at most one bucket per column is used, and
+        the window is widened to that level's bucket boundaries so no
+        peak inside the window is lost. If even level 0 has fewer
+        buckets than columns (fewer than base * pixels samples), the raw
+        samples are reduced to columns directly, which reads at most
+        base * pixels samples."""
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(0, start)
+        if stop - start <= 2 * pixels or not self.levels:
+            x = np.arange(start, stop)
+            y = np.asarray(self.data[start:stop])
+            return x, y, y
+
+        samplesPerPixel = (stop - start) / pixels
+        if self.bucket_size(0) > samplesPerPixel:
+            y = np.asarray(self.data[start:stop])
+            return _columns(y, y, start, 1, pixels)
+
+        level = 0
+        while (level + 1 < len(self.levels)
+               and self.bucket_size(level + 1) <= samplesPerPixel):
+            level += 1
+        size = self.bucket_size(level)
+        lo, hi = self.levels[level]
+        b0 = start // size
+        b1 = -(-stop // size)
+        return _columns(lo[b0:b1], hi[b0:b1], b0, size, pixels)
+
+    def plot(self, ax, start=0, stop=None, pixels=None, axis=None, **kwargs):
+        """Plots the envelope of start:stop on matplotlib Axes ax.
+
+        pixels defaults to the width of ax in pixels. axis (a
+        sampled_axis.SampledAxis or anything indexable by sample) maps
+        sample indices to x values. Extra keyword arguments go to
+        ax.fill_between, or to ax.plot at full resolution."""
+        if pixels is None:
+            pixels = max(1, int(ax.get_window_extent().width))
+        x, ymin, ymax = self.render(start, stop, pixels)
+        if axis is not None:
+            x = axis[x]
+        if ymin is ymax:
+            return ax.plot(x, ymin, **kwargs)
+        return ax.fill_between(x, ymin, ymax, step='post', **kwargs)
+
+
+def _columns(lo, hi, first, size, pixels):
+    """Combines consecutive buckets of size samples into pixels columns.
+
+    first is the index of the first bucket; x is returned in samples."""
+    group = np.unique(np.arange(pixels) * len(lo) // pixels)
+    x = (first + group) * size
+    return x, np.minimum.reduceat(lo, group), np.maximum.reduceat(hi, group)
+
+
+def to_line(x, ymin, ymax):
+    """Interleaves an envelope into a single polyline (x, y).
+
+    Each column becomes a vertical min -> max segment, which plots as a
+    solid trace with the same peaks as the full record."""
+    lineX = np.repeat(x, 2)
+    lineY = np.empty(2 * len(ymin), dtype=np.result_type(ymin, ymax))
+    lineY[0::2] = ymin
+    lineY[1::2] = ymax
+    return lineX, lineY
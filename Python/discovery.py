@@ -0,0 +1,220 @@
+"""
+Instrument Discovery
+Updated: 10/26
+Finds Tektronix instruments on the LAN by probing hosts concurrently
+on the socket server ports (4000 for TekVISA socket server, 4001 for
+Socket Server Plus) and asking each one for *idn? and *opt?.
+Results are kept in an inventory file with a time to live, so scripts
+can connect by model or serial number instead of a hardcoded address.
+If a cached address no longer answers (e.g. after a DHCP renewal) the
+inventory is refreshed and the instrument looked up again.
+Python 3.6.3 64-bit
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socket_instrument import SocketInstrument, SockInstError
+
+
+SOCKET_PORTS = (4000, 4001)
+
+
+class DiscoveryError(Exception):
+    """Instrument Discovery Exception class"""
+    pass
+
+
+def expand_hosts(targets):
+    """Expands host names, addresses, and subnets ('192.168.1.0/24') to addresses."""
+    if isinstance(targets, str):
+        targets = [targets]
+    hosts = []
+    for target in targets:
+        if '/' in target:
+            hosts.extend(str(h) for h in ipaddress.ip_network(target, strict=False).hosts())
+        else:
+            hosts.append(target)
+    return hosts
+
+
+def parse_idn(idn):
+    """Splits an *idn? reply into manufacturer, model, serial, and firmware."""
+    fields = [f.strip() for f in idn.split(',')] + [''] * 4
+    return dict(zip(('manufacturer', 'model', 'serial', 'firmware'), fields[:4]))
+
+
+def _ask(sock, cmd, maxBytes):
+    """Sends a query on a raw socket and returns the reply, or None.
+
+    None is returned if the peer closes the connection or sends
+    maxBytes without a newline, so unrelated services can't stall it."""
+    sock.sendall(f'{cmd}\n'.encode('latin_1'))
+    reply = b''
+    while not reply.endswith(b'\n'):
+        if len(reply) >= maxBytes:
+            return None
+        data = sock.recv(maxBytes - len(reply))
+        if not data:
+            return None
+        reply += data
+    return reply.decode('latin_1').strip()
+
+
+def probe(host, port, timeout=0.5, maxBytes=1024):
+    """Returns the inventory record of the instrument at host:port, or None.
+
+    Uses a plain socket with bounded reads rather than SocketInstrument,
+    since whatever listens on the port may not be an instrument."""
+    try:
+        with socket.create_connection((host, port), timeout) as sock:
+            idn = _ask(sock, '*idn?', maxBytes)
+            if not idn:
+                return None
+            try:
+                options = _ask(sock, '*opt?', maxBytes) or ''
+            except OSError:
+                options = ''
+    except OSError:
+        return None
+    options = options.strip('"')
+    record = {'host': host, 'port': port, 'idn': idn,
+              'options': [o.strip() for o in options.split(',') if o.strip() not in ('', '0')],
+              'seen': time.time()}
+    record.update(parse_idn(idn))
+    return record
+
+
+def discover(targets, ports=SOCKET_PORTS, timeout=0.5, workers=128):
+    """Probes every host and port in targets concurrently.
+
+    Returns a list of records, one per instrument (identified by
+    model and serial); an instrument answering on several ports
+    lists them all in 'ports'."""
+    jobs = [(h, p) for h in expand_hosts(targets) for p in ports]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        found = [r for r in pool.map(lambda hp: probe(hp[0], hp[1], timeout), jobs) if r]
+
+    instruments = {}
+    for r in found:
+        key = (r['model'], r['serial'] or r['host'])
+        if key in instruments:
+            instruments[key]['ports'].append(r['port'])
+        else:
+            r['ports'] = [r['port']]
+            instruments[key] = r
+    return list(instruments.values())
+
+
+class Inventory:
+    def __init__(self, fileName='instrument_inventory.json', ttl=3600, targets=(),
+                 ports=SOCKET_PORTS, timeout=0.5):
+        """Instrument inventory cached in fileName for ttl seconds.
+
+        targets are the hosts and subnets searched when the inventory
+        is refreshed."""
+        self.fileName = fileName
+        self.ttl = ttl
+        self.targets = list(targets)
+        self.ports = ports
+        self.timeout = timeout
+        self.records = []
+        self.updated = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.fileName) as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.records = saved.get('instruments', [])
+        self.updated = saved.get('updated', 0)
+
+    def save(self):
+        """Writes the inventory atomically so other processes never read half a file."""
+        tmpName = f'{self.fileName}.{os.getpid()}.tmp'
+        with open(tmpName, 'w') as f:
+            json.dump({'updated': self.updated, 'instruments': self.records}, f, indent=1)
+        os.replace(tmpName, self.fileName)
+
+    @property
+    def expired(self):
+        return time.time() - self.updated > self.ttl
+
+    def refresh(self, targets=None):
+        """Rediscovers instruments on targets (default: self.targets)."""
+        targets = list(targets) if targets is not None else self.targets
+        if not targets:
+            raise DiscoveryError('No hosts or subnets to search.')
+        self.records = discover(targets, self.ports, self.timeout)
+        self.updated = time.time()
+        self.save()
+        return self.records
+
+    def find(self, model=None, serial=None, option=None):
+        """Returns the records matching model (prefix, case-insensitive),
+        serial, and option, refreshing first if the inventory expired."""
+        if self.expired and self.targets:
+            self.refresh()
+        matches = []
+        for r in self.records:
+            if model is not None and not r['model'].upper().startswith(model.upper()):
+                continue
+            if serial is not None and r['serial'].upper() != serial.upper():
+                continue
+            if option is not None and option not in r['options']:
+                continue
+            matches.append(r)
+        return matches
+
+    def resolve(self, model=None, serial=None, option=None):
+        """Returns the one record matching the criteria."""
+        matches = self.find(model, serial, option)
+        if not matches:
+            raise DiscoveryError(f'No instrument found for model={model}, serial={serial}.')
+        if len(matches) > 1:
+            found = ', '.join(f"{r['model']} {r['serial']} at {r['host']}" for r in matches)
+            raise DiscoveryError(f'Several instruments match: {found}')
+        return matches[0]
+
+    def connect(self, model=None, serial=None, option=None, timeout=10):
+        """Opens a SocketInstrument to the matching instrument.
+
+        If the cached address doesn't answer, or answers with another
+        serial number, the inventory is refreshed once and the
+        connection retried."""
+        for attempt in range(2):
+            record = self.resolve(model, serial, option)
+            try:
+                inst = SocketInstrument(record['host'], record['ports'][-1], timeout)
+                if parse_idn(inst.instId)['serial'] == record['serial']:
+                    return inst
+                inst.disconnect()
+            except (OSError, SockInstError):
+                pass
+            if attempt == 0 and self.targets:
+                self.refresh()
+        raise DiscoveryError(f"Can't reach {record['model']} {record['serial']}.")
+
+    def visa_address(self, model=None, serial=None, option=None):
+        """VISA resource string for the matching instrument."""
+        return f"TCPIP::{self.resolve(model, serial, option)['host']}::INSTR"
+
+
+def main():
+    inventory = Inventory(targets=['192.168.1.0/24'], ttl=8 * 3600)
+    for r in inventory.find():
+        print(f"{r['model']:12} {r['serial']:12} {r['host']:15} {r['ports']} {r['options']}")
+
+    rsa = inventory.connect(model='RSA5')
+    print(rsa.instId)
+    rsa.disconnect()
+    print(inventory.visa_address(model='DPO7'))
+
+
+if __name__ == '__main__':
+    main()
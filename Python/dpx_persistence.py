@@ -0,0 +1,109 @@
+"""
+DPX Persistence
+Updated: 10/26
+Host-side DPX-style persistence. Spectrum traces (for example from
+fetch:spectrum:trace? or iq_dsp.welch_spectrum) are folded into an
+amplitude bins x frequency bins hit count bitmap with optional
+exponential decay, so persistence can be computed offline from
+recorded trace archives at rates well beyond the instrument display.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+
+
+class PersistenceBitmap:
+    def __init__(self, freqBins=801, ampBins=201, refLevel=0, dynamicRange=100,
+                 decay=1.0):
+        """Creates an empty bitmap.
+
+        Amplitude bins span refLevel - dynamicRange to refLevel (dBm);
+        row 0 is the lowest amplitude. Trace amplitudes outside that
+        range are clipped to the bottom or top row like the DPX display.
+        decay is the factor every existing hit is multiplied by each time
+        a new trace is added (1.0 is infinite persistence)."""
+        self.freqBins = freqBins
+        self.ampBins = ampBins
+        self.refLevel = refLevel
+        self.dynamicRange = dynamicRange
+        self.decay = decay
+        self.bitmap = np.zeros((ampBins, freqBins))
+        # Decayed number of traces folded in, used for hit density.
+        self.weight = 0.0
+        self.numTraces = 0
+        self._colCache = (None, None)
+
+    def amplitudes(self):
+        """Amplitude (dBm) at the center of each row."""
+        step = self.dynamicRange / self.ampBins
+        return self.refLevel - self.dynamicRange + step * (np.arange(self.ampBins) + 0.5)
+
+    def _columns(self, numPoints):
+        """Frequency bin of every trace point (cached per trace length)."""
+        if self._colCache[0] != numPoints:
+            cols = np.arange(numPoints, dtype=np.int64) * self.freqBins // numPoints
+            self._colCache = (numPoints, cols)
+        return self._colCache[1]
+
+    def add(self, traces):
+        """Folds one trace (1-D) or a batch of traces (2-D) into the bitmap.
+
+        Traces are in dBm. A batch is histogrammed in a single bincount,
+        with each trace weighted by the decay it would have accumulated
+        had the traces been added one at a time."""
+        traces = np.atleast_2d(np.asarray(traces, dtype=np.float32))
+        numTraces, numPoints = traces.shape
+
+        scale = self.ampBins / self.dynamicRange
+        rows = ((traces - (self.refLevel - self.dynamicRange)) * scale).astype(np.int64)
+        np.clip(rows, 0, self.ampBins - 1, out=rows)
+        flat = rows * self.freqBins
+        flat += self._columns(numPoints)
+
+        if self.decay == 1.0:
+            weights = None
+            self.weight += numTraces
+        else:
+            # The oldest trace in the batch decays numTraces - 1 times.
+            weights = np.repeat(self.decay ** np.arange(numTraces - 1, -1, -1.0), numPoints)
+            self.bitmap *= self.decay ** numTraces
+            self.weight = self.weight * self.decay ** numTraces + weights[::numPoints].sum()
+
+        hits = np.bincount(flat.ravel(), weights=weights, minlength=self.bitmap.size)
+        self.bitmap += hits.reshape(self.bitmap.shape)
+        self.numTraces += numTraces
+
+    def add_archive(self, traces, batchSize=4096):
+        """Folds a large (possibly memory-mapped) 2-D trace archive in batches."""
+        for start in range(0, len(traces), batchSize):
+            self.add(traces[start:start + batchSize])
+
+    def merge(self, other):
+        """Adds the hits of another bitmap with the same geometry.
+
+        Used to combine bitmaps computed in parallel from separate
+        archives; other is treated as the more recent history."""
+        if other.bitmap.shape != self.bitmap.shape:
+            raise ValueError('Bitmaps must have the same dimensions.')
+        self.bitmap *= self.decay ** other.numTraces
+        self.bitmap += other.bitmap
+        self.weight = self.weight * self.decay ** other.numTraces + other.weight
+        self.numTraces += other.numTraces
+
+    def reset(self):
+        self.bitmap[:] = 0
+        self.weight = 0.0
+        self.numTraces = 0
+
+    def to_array(self, density=False):
+        """Returns a float32 copy of the bitmap.
+
+        With density=True each pixel is the fraction of (decayed)
+        traces that hit it, the quantity the DPX color scale shows.
+        Traces with more points than freqBins can hit a column more
+        than once per trace."""
+        bitmap = self.bitmap
+        if density and self.weight > 0:
+            bitmap = bitmap / self.weight
+        return bitmap.astype(np.float32)
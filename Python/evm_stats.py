@@ -0,0 +1,158 @@
+"""
+EVM Statistics
+Updated: 10/26
+Streaming statistics over many EVM vs symbol traces (fetch:evm:trace?
+or qpsk_demod.DemodResult.evm). Traces are consumed one at a time and
+never stored: overall mean, RMS, standard deviation, min/max, and
+histogram-based percentiles are kept in constant memory, along with
+the same statistics for every symbol index.
+Means and variances use Welford's single-pass update, with Chan's
+parallel formula to merge a whole trace at once.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+
+
+class EVMStatistics:
+    def __init__(self, maxEvm=100.0, binWidth=0.01):
+        """Creates an empty aggregator.
+
+        Percentiles are resolved to binWidth (%) between 0 and maxEvm (%).
+        Values above maxEvm are counted in an overflow bin and reported
+        as the running maximum."""
+        self.binWidth = binWidth
+        self.maxEvm = maxEvm
+        self.hist = np.zeros(int(np.ceil(maxEvm / binWidth)) + 1, dtype=np.int64)
+
+        self.count = 0
+        self.numTraces = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._meanSq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+        # Per symbol index statistics, grown to the longest trace seen.
+        self.symCount = np.zeros(0, dtype=np.int64)
+        self.symMean = np.zeros(0)
+        self._symM2 = np.zeros(0)
+        self._symMeanSq = np.zeros(0)
+        self.symMax = np.zeros(0)
+
+        # Per trace RMS EVM, the figure reported by fetch:conste:results?.
+        self._traceRmsMean = 0.0
+        self._traceRmsM2 = 0.0
+        self.traceRmsMax = -np.inf
+
+    def _grow(self, length):
+        extra = length - len(self.symCount)
+        if extra > 0:
+            self.symCount = np.concatenate((self.symCount, np.zeros(extra, np.int64)))
+            self.symMean = np.concatenate((self.symMean, np.zeros(extra)))
+            self._symM2 = np.concatenate((self._symM2, np.zeros(extra)))
+            self._symMeanSq = np.concatenate((self._symMeanSq, np.zeros(extra)))
+            self.symMax = np.concatenate((self.symMax, np.full(extra, -np.inf)))
+
+    def update(self, trace):
+        """Adds one EVM vs symbol trace (%) to the statistics."""
+        trace = np.asarray(trace, dtype=np.float32)
+        n = len(trace)
+        if n == 0:
+            return
+        x = trace.astype(np.float64)
+
+        # Whole trace, merged with Chan's formula.
+        batchMean = x.mean()
+        batchM2 = np.sum((x - batchMean) ** 2)
+        batchMeanSq = np.mean(x * x)
+        total = self.count + n
+        delta = batchMean - self._mean
+        self._mean += delta * n / total
+        self._m2 += batchM2 + delta ** 2 * self.count * n / total
+        self._meanSq += (batchMeanSq - self._meanSq) * n / total
+        self.count = total
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+
+        bins = np.minimum((x / self.binWidth).astype(np.int64), len(self.hist) - 1)
+        np.maximum(bins, 0, out=bins)
+        self.hist += np.bincount(bins, minlength=len(self.hist))
+
+        # Per symbol index, one new sample per index (Welford).
+        self._grow(n)
+        count = self.symCount[:n]
+        count += 1
+        delta = x - self.symMean[:n]
+        self.symMean[:n] += delta / count
+        self._symM2[:n] += delta * (x - self.symMean[:n])
+        self._symMeanSq[:n] += (x * x - self._symMeanSq[:n]) / count
+        np.maximum(self.symMax[:n], x, out=self.symMax[:n])
+
+        # Per trace RMS.
+        self.numTraces += 1
+        rms = np.sqrt(batchMeanSq)
+        delta = rms - self._traceRmsMean
+        self._traceRmsMean += delta / self.numTraces
+        self._traceRmsM2 += delta * (rms - self._traceRmsMean)
+        self.traceRmsMax = max(self.traceRmsMax, rms)
+
+    @property
+    def mean(self):
+        return self._mean if self.count else np.nan
+
+    @property
+    def rms(self):
+        return np.sqrt(self._meanSq) if self.count else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    @property
+    def symRms(self):
+        return np.sqrt(self._symMeanSq)
+
+    @property
+    def symStd(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self._symM2 / (self.symCount - 1))
+
+    @property
+    def traceRmsMean(self):
+        return self._traceRmsMean if self.numTraces else np.nan
+
+    @property
+    def traceRmsStd(self):
+        if self.numTraces < 2:
+            return np.nan
+        return np.sqrt(self._traceRmsM2 / (self.numTraces - 1))
+
+    def percentile(self, q):
+        """Returns the q-th percentile(s) (0-100) of all EVM values.
+
+        Interpolates linearly within histogram bins, so the result is
+        accurate to binWidth. Percentiles falling in the overflow bin
+        return the running maximum."""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        q = np.asarray(q, dtype=np.float64)
+        cdf = np.cumsum(self.hist)
+        rank = q / 100 * self.count
+        i = np.searchsorted(cdf, rank, side='left')
+        i = np.minimum(i, len(self.hist) - 1)
+        below = np.where(i > 0, cdf[np.maximum(i - 1, 0)], 0)
+        inBin = np.maximum(self.hist[i], 1)
+        value = (i + np.clip((rank - below) / inBin, 0, 1)) * self.binWidth
+        value = np.where(i == len(self.hist) - 1, self.max, value)
+        return np.clip(value, self.min, self.max)
+
+    def summary(self):
+        """Returns the overall statistics as a dict."""
+        p50, p90, p99 = self.percentile([50, 90, 99])
+        return {'traces': self.numTraces, 'symbols': self.count,
+                'mean': self.mean, 'rms': self.rms, 'std': self.std,
+                'min': self.min, 'max': self.max,
+                'p50': p50, 'p90': p90, 'p99': p99,
+                'traceRmsMean': self.traceRmsMean, 'traceRmsMax': self.traceRmsMax}
@@ -0,0 +1,142 @@
+"""
+IQ DSP
+Updated: 10/26
+Host-side spectrum and amplitude vs time computation from IQ records.
+One IQ transfer from the RSA (see SocketInstrument.iq_fetch) can
+produce every display that otherwise requires a separate instrument
+measurement. All functions accept a single record (1-D) or a batch of
+equal-length records (2-D, one record per row) and operate on the
+whole batch at once.
+IQ samples are assumed to be scaled in volts such that |iq|^2 / R is
+instantaneous power into R ohms.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=32)
+def get_window(name, length):
+    """Returns a cached, read-only float32 window of the given length.
+
+    Supported windows: rect, hann, hamming, blackman, blackmanharris, flattop"""
+    n = np.arange(length) * 2 * np.pi / length
+    if name == 'rect':
+        coeffs = [1.0]
+    elif name == 'hann':
+        coeffs = [0.5, 0.5]
+    elif name == 'hamming':
+        coeffs = [0.54, 0.46]
+    elif name == 'blackman':
+        coeffs = [0.42, 0.5, 0.08]
+    elif name == 'blackmanharris':
+        coeffs = [0.35875, 0.48829, 0.14128, 0.01168]
+    elif name == 'flattop':
+        coeffs = [0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368]
+    else:
+        raise ValueError(f'Unknown window: {name}')
+
+    # Generalized cosine window with alternating signs.
+    window = np.zeros(length)
+    for k, a in enumerate(coeffs):
+        window += (-1) ** k * a * np.cos(k * n)
+    window = window.astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+def enbw(name, length):
+    """Equivalent noise bandwidth of a window in bins."""
+    window = get_window(name, length).astype(np.float64)
+    return length * np.sum(window ** 2) / np.sum(window) ** 2
+
+
+@lru_cache(maxsize=32)
+def _freq_offsets(nfft, sampleRate):
+    offsets = np.fft.fftshift(np.fft.fftfreq(nfft, 1 / sampleRate))
+    offsets.flags.writeable = False
+    return offsets
+
+
+def _segments(iq, nfft, step):
+    """Strided (no copy) view of overlapping segments along the last axis.
+
+    Returns an array of shape (..., numSegments, nfft)."""
+    numSegments = (iq.shape[-1] - nfft) // step + 1
+    if numSegments < 1:
+        raise ValueError(f'Record length {iq.shape[-1]} is shorter than nfft {nfft}.')
+    shape = iq.shape[:-1] + (numSegments, nfft)
+    strides = iq.strides[:-1] + (iq.strides[-1] * step, iq.strides[-1])
+    return np.lib.stride_tricks.as_strided(iq, shape=shape, strides=strides,
+                                           writeable=False)
+
+
+def to_dbm(power):
+    """Converts power in watts to dBm, flooring zeros at -300 dBm."""
+    return 10 * np.log10(np.maximum(power, 1e-33)) + 30
+
+
+def welch_spectrum(iq, sampleRate, nfft=1024, overlap=0.5,
+                   window='blackmanharris', centerFreq=0, impedance=50):
+    """Computes Welch-averaged power spectra of IQ records.
+
+    iq is complex, shape (numSamples,) or (numRecords, numSamples).
+    Segments of nfft samples overlapping by the overlap fraction are
+    windowed, transformed, and their power averaged.
+    Returns (freq, spectrum, rbw) where freq is the absolute frequency
+    axis (length nfft), spectrum is power per bin in dBm with the same
+    leading shape as iq, and rbw is the resolution bandwidth in Hz.
+    The window is normalized so a CW tone reads its true power."""
+    iq = np.ascontiguousarray(iq)
+    step = max(1, int(nfft * (1 - overlap)))
+    segments = _segments(iq, nfft, step)
+
+    w = get_window(window, nfft)
+    # Full-size arrays: the windowed segments (freed as soon as the FFT
+    # returns), the spectra, and one real power array squared in place.
+    spectra = np.fft.fft(segments * w, axis=-1)
+    power = np.abs(spectra)
+    del spectra
+    power *= power
+    power = power.mean(axis=-2)
+    power /= float(np.sum(w, dtype=np.float64)) ** 2 * impedance
+
+    freq = centerFreq + _freq_offsets(nfft, float(sampleRate))
+    rbw = enbw(window, nfft) * sampleRate / nfft
+    return freq, to_dbm(np.fft.fftshift(power, axes=-1)), rbw
+
+
+def amplitude_vs_time(iq, sampleRate, average=1, acqStart=0, impedance=50):
+    """Computes the amplitude vs time envelope of IQ records in dBm.
+
+    Instantaneous power is averaged over blocks of average samples
+    (trailing samples that don't fill a block are dropped).
+    Returns (time, avt) where time is the start time of each block
+    and avt has the same leading shape as iq."""
+    iq = np.asarray(iq)
+    numBlocks = iq.shape[-1] // average
+    iq = iq[..., :numBlocks * average]
+    power = iq.real ** 2
+    power += iq.imag ** 2
+    if average > 1:
+        power = power.reshape(iq.shape[:-1] + (numBlocks, average)).mean(axis=-1)
+    power /= impedance
+
+    time = acqStart + np.arange(numBlocks) * (average / sampleRate)
+    return time, to_dbm(power)
+
+
+def iq_views(record, nfft=1024, overlap=0.5, window='blackmanharris',
+             average=1, impedance=50):
+    """Computes spectrum and amplitude vs time from one IQRecord.
+
+    Returns a dict with 'freq', 'spectrum', 'rbw', 'time', and 'avt'."""
+    freq, spectrum, rbw = welch_spectrum(
+        record.data, record.sampleRate, nfft, overlap, window,
+        record.centerFreq, impedance)
+    time, avt = amplitude_vs_time(
+        record.data, record.sampleRate, average, record.acqStart, impedance)
+    return {'freq': freq, 'spectrum': spectrum, 'rbw': rbw,
+            'time': time, 'avt': avt}
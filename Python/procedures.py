@@ -0,0 +1,294 @@
+"""
+Instrument Procedures
+Updated: 10/26
+Configure-acquire-fetch procedures for the RSA, DPO, MDO, AWG, and TSG
+workflows, shared by cli.py, the job scheduler, the sweep engine, and
+session replay so each procedure exists once.
+Every procedure takes a connected instrument as its first argument,
+either a SocketInstrument or a PyVISA resource; binary blocks are
+received with binblockread() when available (no intermediate copies)
+and query_binary_values() otherwise. Time and frequency axes are
+returned as SampledAxis objects.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+from sampled_axis import SampledAxis
+from socket_instrument import IQRecord, IQ_SETTINGS_QUERY
+
+
+class ProcedureError(Exception):
+    """Instrument Procedure Exception class"""
+    pass
+
+
+def fetch_block(inst, cmd, dtype=np.int8, bigEndian=False):
+    """Sends a binary block query and returns the data as a NumPy array."""
+    dtype = np.dtype(dtype)
+    if hasattr(inst, 'binblockread'):
+        inst.write(cmd)
+        return inst.binblockread(dtype=dtype.newbyteorder('>' if bigEndian else '<'))
+    return inst.query_binary_values(cmd, datatype=dtype.char, is_big_endian=bigEndian,
+                                    container=np.array)
+
+
+"""#################RSA#################"""
+
+
+def rsa_spectrum(rsa, cf=2.4453e9, span=40e6, refLevel=0):
+    """Single spectrum trace (RSA/rsa_trace_transfer.py).
+
+    Returns (freq, dBm) where freq is a SampledAxis in Hz."""
+    rsa.write('abort')
+    rsa.write(f'spectrum:frequency:center {cf}')
+    rsa.write(f'spectrum:frequency:span {span}')
+    rsa.write(f'input:rlevel {refLevel}')
+    rsa.write('initiate:continuous off')
+    rsa.write('trigger:status off')
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
+    spectrum = fetch_block(rsa, 'fetch:spectrum:trace?', np.float32)
+    # The first and last trace points are on the span edges.
+    return SampledAxis.from_span(cf, span, len(spectrum)), spectrum
+
+
+def iq_record(rsa):
+    """Fetches the current IQ acquisition as an IQRecord."""
+    if hasattr(rsa, 'iq_fetch'):
+        return rsa.iq_fetch()
+    meta = rsa.query(IQ_SETTINGS_QUERY)
+    try:
+        centerFreq, samples, seconds, acqStart = [float(m) for m in meta.split(';')]
+    except ValueError:
+        raise ProcedureError(f'Unexpected IQ settings reply: {meta}')
+    # Interleaved float32 I/Q pairs have the memory layout of complex64.
+    data = fetch_block(rsa, 'fetch:rfin:iq? 1', np.float32).view(np.complex64)
+    return IQRecord(data, samples / seconds, centerFreq, acqStart)
+
+
+def rsa_iq(rsa, cf=1e9, span=40e6, refLevel=0, length=100e-6, start=-10e-6,
+           trigLevel=-10):
+    """Power-triggered IQ capture (RSA/rsa_iq_transfer.py). Returns an IQRecord.
+
+    With trigLevel None the RSA triggers freely."""
+    rsa.write('abort')
+    rsa.write('display:general:measview:new spectrum')
+    rsa.write('display:general:measview:new toverview')
+    rsa.write('display:general:measview:new iqvtime')
+    rsa.write(f'spectrum:frequency:center {cf}')
+    rsa.write(f'spectrum:frequency:span {span}')
+    rsa.write(f'input:rlevel {refLevel}')
+    rsa.write(f'sense:iqvtime:span {span}')
+    rsa.write(f'sense:analysis:length {length}')
+    rsa.write(f'sense:analysis:start {start}')
+    if trigLevel is None:
+        rsa.write('trigger:status off')
+    else:
+        rsa.write('trigger:event:input:type power')
+        rsa.write(f'trigger:event:input:level {trigLevel}')
+        rsa.write('trigger:status on')
+    rsa.write('initiate:continuous off')
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
+    return iq_record(rsa)
+
+
+def peak_marker(rsa):
+    """Acquires once and returns [frequency, amplitude] of the spectrum peak.
+
+    Needs a marker (calculate:marker:add); see rsa_peaks()."""
+    rsa.write('initiate:immediate')
+    rsa.query('*opc?')
+    rsa.write('calculate:spectrum:marker0:maximum')
+    return [float(rsa.query('calculate:spectrum:marker0:X?')),
+            float(rsa.query('calculate:spectrum:marker0:Y?'))]
+
+
+def rsa_peaks(rsa, cf=2e9, span=40e6, rbw=100, refLevel=0, count=10):
+    """Repeated peak search (RSA/rsa_peak_detector.py).
+
+    Returns a (count, 2) array of peak frequency and amplitude."""
+    rsa.write('abort')
+    rsa.write(f'spectrum:frequency:center {cf}')
+    rsa.write(f'spectrum:frequency:span {span}')
+    rsa.write(f'spectrum:bandwidth {rbw}')
+    rsa.write(f'input:rlevel {refLevel}')
+    rsa.write('trigger:status off')
+    rsa.write('initiate:continuous off')
+    rsa.write('calculate:marker:add')
+    return np.array([peak_marker(rsa) for _ in range(count)]).reshape(count, 2)
+
+
+"""#################SCOPES#################"""
+
+
+# data:encdg? prefix -> (signed, big-endian); FP formats are float32.
+_ENCODINGS = (('RIB', ('i', True)), ('FAS', ('i', True)), ('RPB', ('u', True)),
+              ('SRI', ('i', False)), ('SRP', ('u', False)), ('FP', ('f', True)),
+              ('SFP', ('f', False)))
+
+
+def waveform_format(scope):
+    """Returns (dtype, bigEndian) of curve? data from the transfer settings."""
+    encoding = scope.query('data:encdg?').strip().upper()
+    for prefix, (kind, bigEndian) in _ENCODINGS:
+        if encoding.startswith(prefix):
+            break
+    else:
+        raise ProcedureError(f'Unsupported waveform encoding: {encoding}')
+    if kind == 'f':
+        return np.dtype(np.float32), bigEndian
+    numBytes = int(scope.query('wfmoutpre:byt_nr?'))
+    return np.dtype(f'{kind}{numBytes}'), bigEndian
+
+
+def scope_curve(scope):
+    """Fetches curve? and returns (time, volts) scaled with wfmoutpre.
+
+    time is a SampledAxis built from the preamble."""
+    yOffset = float(scope.query('wfmoutpre:yoff?'))
+    yMult = float(scope.query('wfmoutpre:ymult?'))
+    yZero = float(scope.query('wfmoutpre:yzero?'))
+    xIncr = float(scope.query('wfmoutpre:xincr?'))
+    xZero = float(scope.query('wfmoutpre:xzero?'))
+    ptOffset = int(float(scope.query('wfmoutpre:pt_off?')))
+    dtype, bigEndian = waveform_format(scope)
+    data = fetch_block(scope, 'curve?', dtype, bigEndian)
+    volts = (data - yOffset) * yMult + yZero
+    return SampledAxis.from_preamble(xZero, xIncr, len(volts), ptOffset), volts
+
+
+def scope_acquire(scope):
+    """Single sequence acquisition, waiting until it has finished."""
+    scope.write('acquire:stopafter sequence')
+    scope.write('acquire:state on')
+    scope.query('*opc?')
+
+
+def dpo_fastframe(dpo, hScale=1e-6, numFrames=10, vScale=0.5, vPos=-2.5, trigLevel=0.15,
+                  source='ch1'):
+    """FastFrame average summary frame (DPO/dpo_fastframe.py).
+
+    Returns (time, volts) of the summary frame."""
+    dpo.write('acquire:state off')
+    dpo.write(f'horizontal:mode:scale {hScale}')
+    dpo.write('horizontal:fastframe:state on')
+    dpo.write(f'horizontal:fastframe:count {numFrames}')
+    dpo.write(f'{source}:scale {vScale}')
+    dpo.write(f'{source}:position {vPos}')
+    dpo.write(f'trigger:a:level:{source} {trigLevel}')
+    dpo.write('header off')
+    dpo.write('horizontal:fastframe:sumframe average')
+    dpo.write('data:encdg fastest')
+    dpo.write(f'data:source {source}')
+    recordLength = int(dpo.query('horizontal:mode:recordlength?'))
+    dpo.write(f'data:stop {recordLength}')
+    dpo.write('wfmoutpre:byt_n 1')
+    # The summary frame follows the acquired frames.
+    dpo.write(f'data:framestart {numFrames}')
+    dpo.write(f'data:framestop {numFrames}')
+    scope_acquire(dpo)
+    return scope_curve(dpo)
+
+
+def mdo_rf_setup(mdo, cf=1e9, span=100e6, trigLevel=-20, vScale=20e-3, hScale=4e-6,
+                 hPos=25):
+    """Configures the MDO for simultaneous RF and time domain analysis."""
+    mdo.write(f'rf:frequency {cf}')
+    mdo.write(f'rf:span {span}')
+    mdo.write(f'horizontal:scale {hScale}')
+    mdo.write('horizontal:delay:mode 0')
+    mdo.write(f'horizontal:position {hPos}')
+    mdo.write('select:rf_amplitude on')
+    mdo.write(f'rf:rf_amplitude:vertical:scale {vScale}')
+    mdo.write('trigger:a:edge:source rf')
+    mdo.write(f'trigger:a:logic:threshold:rf {trigLevel}')
+    mdo.write('data:source rf_amplitude')
+
+
+def mdo_rf_amplitude(mdo, cf=1e9, span=100e6, trigLevel=-20, vScale=20e-3, hScale=4e-6,
+                     hPos=25):
+    """RF amplitude vs time capture (MDO/mdo_rf_mask_test.py).
+
+    Returns (time, volts)."""
+    mdo_rf_setup(mdo, cf, span, trigLevel, vScale, hScale, hPos)
+    scope_acquire(mdo)
+    return scope_curve(mdo)
+
+
+"""#################AWG#################"""
+
+
+def awg_play(awg, name, channel=1):
+    """Assigns waveform name to channel, starts playback, and turns the output on.
+
+    Returns the AWG error queue."""
+    awg.write(f'source{channel}:casset:waveform "{name}"')
+    awg.write('awgcontrol:run:immediate')
+    awg.query('*opc?')
+    awg.write(f'output{channel}:state on')
+    return awg.query('system:error:all?')
+
+
+def awg_load_play(awg, wfmFile, channel=1):
+    """Opens a .wfmx file on the AWG's disk and plays it (AWG/awg_load_play.py)."""
+    awg.write(f'mmemory:open "{wfmFile}"')
+    awg.query('*opc?')
+    wfmName = awg.query('wlist:name? 1').strip('"')
+    return awg_play(awg, wfmName, channel)
+
+
+def awg_tone(awg, name='test_wfm', sampleRate=10e9, length=500000, freq=100e6, channel=1):
+    """Generates, sends, and plays a sine wave (AWG/awg_simple_waveform_sender.py).
+
+    The waveform is synthesized and streamed in chunks, so awg must be
+    a SocketInstrument."""
+    from waveform_synth import Tone, upload
+    awg.write(f'clock:srate {sampleRate}')
+    awg.write(f'wlist:waveform:delete "{name}"')
+    upload(awg, name, Tone(freq), length, sampleRate)
+    return awg_play(awg, name, channel)
+
+
+"""#################TSG#################"""
+
+
+def tsg_iq(tsg, i, q=None, carrier=1e9, amplitude=0, sampleRate=6e6, bank=None):
+    """Vector modulation with a user IQ waveform (TSG/tsg_iq_data_sender.py).
+
+    i and q are floats in [-1, 1] (or complex i). Pass a
+    TSGWaveformBank as bank to keep loaded waveforms between calls.
+    The maximum sample rate is 6 MHz. Returns the bank."""
+    from tsg_waveform_bank import TSGWaveformBank
+    if bank is None:
+        bank = TSGWaveformBank(tsg)
+    tsg.write(f'ampr {amplitude}')
+    tsg.write(f'freq {carrier}')
+    # Vector modulation of a user waveform.
+    tsg.write('type 2')
+    tsg.write('styp 1')
+    tsg.write('qfnc 11')
+    tsg.write(f'symr {sampleRate}')
+    bank.load(i, q)
+    tsg.write('modl 1')
+    tsg.write('enbr 1')
+    return bank
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    rsa = SocketInstrument('192.168.1.10', port=4000, timeout=10)
+    freq, spectrum = rsa_spectrum(rsa, cf=1e9, span=40e6)
+    print(f'Peak: {spectrum.max():.2f} dBm at {freq[spectrum.argmax()] / 1e6:.3f} MHz')
+    rsa.disconnect()
+
+    dpo = SocketInstrument('192.168.1.84', port=4000, timeout=10)
+    time, volts = dpo_fastframe(dpo, numFrames=10)
+    print(f'{len(volts)} points from {time.start} s, {volts.min()} to {volts.max()} V')
+    dpo.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Timeline Profiler
+Updated: 10/26
+Measures where the time of a test script goes. Script phases
+(SEARCH/CONNECT, CONFIGURE, ACQUIRE, TRANSFER, PLOT, ...) and the
+instrument calls made inside them are recorded as nested spans with
+wall time, bytes sent and received, and peak traced memory
+(tracemalloc), and exported as Chrome trace event JSON, which can be
+opened as a flame chart in chrome://tracing or https://ui.perfetto.dev.
+Python 3.6.3 64-bit
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+# Instrument methods wrapped by profile_instrument().
+INSTRUMENT_METHODS = ('write', 'query', 'read', 'write_raw', 'read_raw', 'read_bytes',
+                      'binblockread', 'binblockread_into', 'binblockwrite', 'wfm_writer',
+                      'wfm_stream_writer', 'iq_fetch', 'write_binary_values',
+                      'query_binary_values', 'query_ascii_values')
+
+
+class Span:
+    def __init__(self, name, category, args, start, thread):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = start
+        self.stop = None
+        self.thread = thread
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.instrumentCalls = 0    # instrument spans nested directly inside
+        self.peakMemory = None
+        self._memStart = 0
+        self._absPeak = 0
+
+    @property
+    def duration(self):
+        return (self.stop if self.stop is not None else time.perf_counter()) - self.start
+
+
+class Profiler:
+    def __init__(self, traceMemory=True):
+        """Records spans from every thread.
+
+        With traceMemory, tracemalloc is started (if it isn't already)
+        and each span records the peak traced memory above what was in
+        use when it began. Traced memory is process-wide, so spans on
+        other threads contribute. Before Python 3.9 tracemalloc can't
+        reset its peak, and a span's peak is an upper bound that
+        includes earlier peaks."""
+        self.spans = []
+        self.traceMemory = traceMemory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._wallOrigin = time.time()
+        if traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name, category='phase', **args):
+        span = Span(name, category, args, time.perf_counter(), threading.get_ident())
+        stack = self._stack()
+        if self.traceMemory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._absPeak = max(stack[-1]._absPeak, peak)
+            span._memStart = span._absPeak = current
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        stack.append(span)
+        return span
+
+    def end(self, span):
+        span.stop = time.perf_counter()
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        if self.traceMemory:
+            _, peak = tracemalloc.get_traced_memory()
+            span._absPeak = max(span._absPeak, peak)
+            span.peakMemory = span._absPeak - span._memStart
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        # Bytes and memory used inside a span count for its parent too.
+        if stack:
+            parent = stack[-1]
+            parent.bytesSent += span.bytesSent
+            parent.bytesReceived += span.bytesReceived
+            if span.category == 'instrument':
+                parent.instrumentCalls += 1
+            parent._absPeak = max(parent._absPeak, span._absPeak)
+        with self._lock:
+            self.spans.append(span)
+
+    def span(self, name, category='phase', **args):
+        """Context manager timing the enclosed block as one span."""
+        return _SpanContext(self, name, category, args)
+
+    def trace(self, name=None, category='function'):
+        """Decorator recording every call of a function as a span."""
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(label, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_bytes(self, sent=0, received=0):
+        """Adds bytes moved to the innermost open span of this thread."""
+        stack = self._stack()
+        if stack:
+            stack[-1].bytesSent += sent
+            stack[-1].bytesReceived += received
+
+    def chrome_trace(self):
+        """Returns the spans as a Chrome trace event dictionary."""
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            tid = threads.setdefault(s.thread, len(threads))
+            args = dict(s.args)
+            args.update(bytesSent=s.bytesSent, bytesReceived=s.bytesReceived)
+            if s.peakMemory is not None:
+                args['peakMemory'] = s.peakMemory
+            events.append({'name': s.name, 'cat': s.category, 'ph': 'X', 'pid': pid,
+                           'tid': tid, 'ts': (s.start - self._origin) * 1e6,
+                           'dur': s.duration * 1e6, 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'startTime': self._wallOrigin}}
+
+    def save(self, fileName):
+        """Writes a Chrome trace JSON file."""
+        with open(fileName, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self, category=None):
+        """Totals per span name: calls, time, bytes, and largest peak memory."""
+        totals = {}
+        for s in self.spans:
+            if category is not None and s.category != category:
+                continue
+            t = totals.setdefault(s.name, {'calls': 0, 'time': 0.0, 'bytesSent': 0,
+                                           'bytesReceived': 0, 'peakMemory': 0})
+            t['calls'] += 1
+            t['time'] += s.duration
+            t['bytesSent'] += s.bytesSent
+            t['bytesReceived'] += s.bytesReceived
+            t['peakMemory'] = max(t['peakMemory'], s.peakMemory or 0)
+        return totals
+
+    def report(self, category=None):
+        for name, t in sorted(self.summary(category).items(), key=lambda i: -i[1]['time']):
+            print(f"{name:30} {t['calls']:6} {t['time']:10.4f} s "
+                  f"{t['bytesSent']:12} B out {t['bytesReceived']:12} B in "
+                  f"{t['peakMemory'] / 1e6:10.2f} MB peak")
+
+
+class _SpanContext:
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.span = self.profiler.begin(self.name, self.category, **self.args)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.profiler.end(self.span)
+
+
+class _CountingSocket:
+    """Socket wrapper adding bytes sent and received to the current span."""
+
+    def __init__(self, sock, profiler):
+        self.sock = sock
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def send(self, data):
+        sent = self.sock.send(data)
+        self.profiler.add_bytes(sent=sent)
+        return sent
+
+    def sendall(self, data):
+        self.sock.sendall(data)
+        self.profiler.add_bytes(sent=memoryview(data).nbytes)
+
+    def recv(self, n, *args):
+        data = self.sock.recv(n, *args)
+        self.profiler.add_bytes(received=len(data))
+        return data
+
+    def recv_into(self, buffer, n=0, *args):
+        count = self.sock.recv_into(buffer, n, *args)
+        self.profiler.add_bytes(received=count)
+        return count
+
+
+def _payload_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return memoryview(value).nbytes
+    except TypeError:
+        return len(value) if hasattr(value, '__len__') else 0
+
+
+def profile_instrument(inst, profiler, name=None, methods=INSTRUMENT_METHODS):
+    """Records every call of methods on inst as an 'instrument' span.
+
+    Works on SocketInstrument (bytes counted at the socket) and PyVISA
+    resources (bytes estimated from arguments and return values).
+    PyVISA methods such as query() call write() and read() on the same
+    resource, so only calls that made no nested instrument call are
+    estimated; the nested calls' bytes roll up into the outer span.
+    Methods are wrapped on the instance itself, so code that already
+    holds inst is profiled too."""
+    label = name or getattr(inst, 'instId', None) or type(inst).__name__
+    counted = hasattr(inst, 'socket')
+    if counted:
+        inst.socket = _CountingSocket(inst.socket, profiler)
+
+    for method in methods:
+        func = getattr(inst, method, None)
+        if func is None:
+            continue
+
+        def wrapper(*args, _func=func, _method=method, **kwargs):
+            cmd = args[0] if args and isinstance(args[0], str) else ''
+            with profiler.span(_method, 'instrument', instrument=label, cmd=cmd[:80]) as span:
+                result = _func(*args, **kwargs)
+                if not counted and not span.instrumentCalls:
+                    profiler.add_bytes(sent=sum(_payload_size(a) for a in args),
+                                       received=_payload_size(result))
+            return result
+
+        setattr(inst, method, wrapper)
+    return inst
+
+
+def main():
+    from socket_instrument import SocketInstrument
+    from iq_dsp import welch_spectrum
+
+    prof = Profiler()
+    with prof.span('SEARCH/CONNECT'):
+        rsa = profile_instrument(SocketInstrument('127.0.0.1', port=4000, timeout=10), prof)
+
+    with prof.span('CONFIGURE'):
+        rsa.write('*rst')
+        rsa.write('abort')
+        rsa.write('display:general:measview:new iqvtime')
+        rsa.write('spectrum:frequency:center 2.4453e9')
+        rsa.write('iqvtime:maxtracepoints one_million')
+        rsa.write('initiate:continuous off')
+
+    for i in range(5):
+        with prof.span('ACQUIRE', iteration=i):
+            rsa.write('initiate:immediate')
+            rsa.query('*opc?')
+        with prof.span('TRANSFER', iteration=i):
+            record = rsa.iq_fetch()
+        with prof.span('PROCESS', iteration=i):
+            welch_spectrum(record.data, record.sampleRate, nfft=4096)
+
+    with prof.span('DISCONNECT'):
+        rsa.disconnect()
+
+    prof.report()
+    prof.save('rsa_iq_profile.json')
+
+
+if __name__ == '__main__':
+    main()
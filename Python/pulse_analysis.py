@@ -0,0 +1,191 @@
+"""
+Pulse Analysis
+Updated: 10/26
+Host-side pulse measurements on amplitude vs time traces, such as
+fetch:avtime:first? from the RSA or SignalVu on a scope. Every pulse
+in a 2-D batch of traces (one trace per row) is found with a
+threshold and hysteresis, and its width, rise and fall time, PRI,
+droop, top, and peak are measured using interpolated level crossings.
+All traces and pulses are processed with array operations; there is
+no Python loop over pulses.
+Rise/fall times and width use the 10%, 50%, and 90% points between
+the trace base level and the pulse top, computed on linear voltage.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import warnings
+import numpy as np
+
+
+PULSE_DTYPE = np.dtype([
+    ('trace', np.int64),        # row of the trace the pulse was found in
+    ('start', np.float64),      # time of 50% rising crossing (s)
+    ('width', np.float64),      # 50% to 50% (s)
+    ('riseTime', np.float64),   # 10% to 90% (s)
+    ('fallTime', np.float64),   # 90% to 10% (s)
+    ('pri', np.float64),        # start - start of previous pulse in trace (s)
+    ('peak', np.float64),       # maximum amplitude (dBm or V)
+    ('top', np.float64),        # mean amplitude over center of pulse (dBm or V)
+    ('droop', np.float64)])     # (top at start - top at end) / top (%)
+
+
+def _hysteresis_state(x, upper, lower):
+    """Boolean pulse-on state of every sample along the last axis.
+
+    A sample turns the state on at or above upper and off at or below
+    lower; in between the previous state holds. Samples before the
+    first decision are off."""
+    mark = np.where(x >= upper, 1, np.where(x <= lower, 0, -1)).astype(np.int8)
+    index = np.where(mark >= 0, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    state = mark[np.arange(x.shape[0])[:, None], index]
+    return state > 0
+
+
+def _crossing(v, center, lo, hi, level, rising, window):
+    """Interpolated crossing of level nearest each edge center.
+
+    v is the flattened linear trace data. center is the first sample
+    past the hysteresis transition, and the crossing is searched for
+    within [lo, hi] and window samples of center. Returns fractional
+    flat indices, NaN where no crossing was found."""
+    offsets = np.arange(-window, window + 1)
+    idx = center[:, None] + offsets
+    inside = (idx >= lo[:, None]) & (idx <= hi[:, None])
+    np.clip(idx, 0, len(v) - 1, out=idx)
+    w = v[idx]
+    lvl = level[:, None]
+
+    on = (w >= lvl) if rising else (w < lvl)
+    # If the center sample is already past the level, the crossing is
+    # before it: find the last sample left of center not past the level.
+    # Otherwise it's after: find the first sample right of center past it.
+    past = on[:, window]
+    left = np.where(~on & inside & (offsets <= 0), offsets, -window - 1).max(axis=1)
+    right = np.where(on & inside & (offsets >= 0), offsets, window + 1).min(axis=1)
+    k0 = np.where(past, left, right - 1)
+    found = np.where(past, left > -window - 1, right < window + 1)
+
+    k0 = np.clip(k0, -window, window - 1)
+    rows = np.arange(len(w))
+    a = w[rows, k0 + window]
+    b = w[rows, k0 + window + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.where(b != a, (level - a) / (b - a), 0.5)
+    crossing = center + k0 + np.clip(frac, 0, 1)
+    return np.where(found, crossing, np.nan)
+
+
+def _segment_reduce(ufunc, x, start, stop):
+    """ufunc.reduceat over [start, stop) segments of flat array x."""
+    x = np.append(x, 0)
+    bounds = np.empty(2 * len(start), dtype=np.int64)
+    bounds[0::2] = start
+    bounds[1::2] = np.maximum(stop, start + 1)
+    return ufunc.reduceat(x, bounds)[0::2]
+
+
+def measure_pulses(traces, xIncr, threshold, hysteresis=3.0, units='dBm',
+                   edgeWindow=64):
+    """Finds and measures every complete pulse in a batch of traces.
+
+    traces is 1-D or 2-D (one trace per row) in dBm or linear volts
+    (units='V'). xIncr is the time between samples. threshold and
+    hysteresis are in the units of the traces: a pulse starts at or
+    above threshold + hysteresis / 2 and ends at or below threshold -
+    hysteresis / 2. Pulses cut off by the start or end of a trace are
+    ignored. edgeWindow bounds how many samples either side of the
+    threshold crossing are searched for the 10/50/90% points.
+    Returns a structured array with PULSE_DTYPE fields, ordered by
+    trace and then by time."""
+    traces = np.atleast_2d(np.asarray(traces, dtype=np.float64))
+    numTraces, numPoints = traces.shape
+    if units == 'dBm':
+        v = 10 ** (traces / 20)
+    elif units == 'V':
+        v = traces
+    else:
+        raise ValueError(f'Unknown units: {units}')
+
+    state = _hysteresis_state(traces, threshold + hysteresis / 2,
+                              threshold - hysteresis / 2)
+    edges = np.diff(state.astype(np.int8), axis=1)
+    riseRow, riseCol = np.nonzero(edges == 1)
+    fallRow, fallCol = np.nonzero(edges == -1)
+
+    # Pair each rising edge with the next falling edge in the same trace.
+    riseKey = riseRow * numPoints + riseCol + 1
+    fallKey = fallRow * numPoints + fallCol + 1
+    j = np.searchsorted(fallKey, riseKey)
+    valid = j < len(fallKey)
+    valid[valid] = fallRow[j[valid]] == riseRow[valid]
+    row = riseRow[valid]
+    rise = riseKey[valid]           # first flat index of pulse
+    fall = fallKey[j[valid]]        # first flat index after pulse
+    numPulses = len(row)
+    result = np.zeros(numPulses, dtype=PULSE_DTYPE)
+    if numPulses == 0:
+        return result
+
+    flatV = v.ravel()
+    rowStart = row * numPoints
+    rowEnd = rowStart + numPoints - 1
+
+    # Base level: median of the off state of each trace.
+    off = np.where(state, np.nan, v)
+    with warnings.catch_warnings():
+        # All-nan rows (trace never off) warn; their base becomes 0.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        base = np.nanmedian(off, axis=1)
+    base = np.nan_to_num(base)[row]
+
+    # Top: mean over the center half of the pulse; droop from its two halves.
+    width = fall - rise
+    q1 = rise + width // 4
+    mid = rise + width // 2
+    q3 = fall - width // 4
+    firstHalf = _segment_reduce(np.add, flatV, q1, mid) / np.maximum(mid - q1, 1)
+    secondHalf = _segment_reduce(np.add, flatV, mid, q3) / np.maximum(q3 - mid, 1)
+    top = _segment_reduce(np.add, flatV, q1, q3) / np.maximum(q3 - q1, 1)
+    peak = _segment_reduce(np.maximum, flatV, rise, fall)
+
+    # Neighboring pulses bound the edge searches.
+    sameRowPrev = np.r_[False, row[1:] == row[:-1]]
+    sameRowNext = np.r_[row[:-1] == row[1:], False]
+    prevFall = np.where(sameRowPrev, np.r_[0, fall[:-1]], rowStart)
+    nextRise = np.where(sameRowNext, np.r_[rise[1:], 0], rowEnd)
+
+    amplitude = top - base
+    levels = {p: base + p * amplitude for p in (0.1, 0.5, 0.9)}
+    r = {p: _crossing(flatV, rise, prevFall, fall - 1, levels[p], True, edgeWindow)
+         for p in levels}
+    f = {p: _crossing(flatV, fall, rise, nextRise, levels[p], False, edgeWindow)
+         for p in levels}
+
+    result['trace'] = row
+    result['start'] = (r[0.5] - rowStart) * xIncr
+    result['width'] = (f[0.5] - r[0.5]) * xIncr
+    result['riseTime'] = (r[0.9] - r[0.1]) * xIncr
+    result['fallTime'] = (f[0.1] - f[0.9]) * xIncr
+    result['pri'] = np.where(sameRowPrev, np.r_[np.nan, np.diff(result['start'])], np.nan)
+    result['droop'] = (firstHalf - secondHalf) / top * 100
+    if units == 'dBm':
+        result['peak'] = 20 * np.log10(peak)
+        result['top'] = 20 * np.log10(top)
+    else:
+        result['peak'] = peak
+        result['top'] = top
+    return result
+
+
+def summarize(pulses):
+    """Mean, std, min, and max of every measurement over all pulses."""
+    summary = {}
+    for name in PULSE_DTYPE.names[1:]:
+        x = pulses[name][np.isfinite(pulses[name])]
+        if len(x):
+            summary[name] = (x.mean(), x.std(), x.min(), x.max())
+        else:
+            summary[name] = (np.nan,) * 4
+    return summary
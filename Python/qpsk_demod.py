@@ -0,0 +1,217 @@
+"""
+QPSK Demodulator
+Updated: 10/26
+Host-side QPSK demodulation and EVM for IQ records captured from the
+RSA, using the same configuration as rsa_digital_demod.py: symbol
+rate, RRC measurement filter, RC reference filter, and filter alpha.
+The processing chain is resampling to an integer number of samples
+per symbol, coarse carrier frequency removal, matched filtering,
+symbol timing recovery, fine carrier frequency/phase recovery, and
+per-symbol EVM. Batches of records are spread over a process pool so
+the instrument can keep capturing while the host does the math.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+
+
+class DemodError(Exception):
+    """Demodulation Exception class"""
+    pass
+
+
+def rrc_taps(alpha, sps, span=16):
+    """Root raised cosine filter taps, unit energy, span symbols long."""
+    t = np.arange(-span * sps // 2, span * sps // 2 + 1) / sps
+    taps = np.empty(len(t))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        num = (np.sin(np.pi * t * (1 - alpha))
+               + 4 * alpha * t * np.cos(np.pi * t * (1 + alpha)))
+        den = np.pi * t * (1 - (4 * alpha * t) ** 2)
+        taps[:] = num / den
+    taps[t == 0] = 1 - alpha + 4 * alpha / np.pi
+    if alpha > 0:
+        singular = np.isclose(np.abs(t), 1 / (4 * alpha))
+        taps[singular] = alpha / np.sqrt(2) * (
+            (1 + 2 / np.pi) * np.sin(np.pi / (4 * alpha))
+            + (1 - 2 / np.pi) * np.cos(np.pi / (4 * alpha)))
+    return taps / np.sqrt(np.sum(taps ** 2))
+
+
+def rc_taps(alpha, sps, span=16):
+    """Raised cosine filter taps, unity gain at t = 0."""
+    t = np.arange(-span * sps // 2, span * sps // 2 + 1) / sps
+    taps = np.sinc(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taps *= np.cos(np.pi * alpha * t) / (1 - (2 * alpha * t) ** 2)
+    if alpha > 0:
+        singular = np.isclose(np.abs(t), 1 / (2 * alpha))
+        taps[singular] = np.pi / 4 * np.sinc(1 / (2 * alpha))
+    return taps
+
+
+def resample(iq, sampleRate, newRate):
+    """Band-limited (FFT) resampling of a complex record.
+
+    Returns (resampled, actualRate). actualRate differs from newRate
+    only by the rounding of the output length."""
+    numIn = len(iq)
+    numOut = int(round(numIn * newRate / sampleRate))
+    spectrum = np.fft.fftshift(np.fft.fft(iq))
+    if numOut > numIn:
+        pad = numOut - numIn
+        spectrum = np.pad(spectrum, (pad // 2, pad - pad // 2), 'constant')
+    else:
+        cut = numIn - numOut
+        spectrum = spectrum[cut // 2:numIn - (cut - cut // 2)]
+    out = np.fft.ifft(np.fft.ifftshift(spectrum)) * (numOut / numIn)
+    return out, numOut * sampleRate / numIn
+
+
+def _fourth_power_freq(x, rate):
+    """Carrier frequency offset of a QPSK signal from the 4th power line."""
+    n = 1 << int(np.ceil(np.log2(len(x))))
+    spectrum = np.abs(np.fft.fft(x ** 4, n))
+    peak = np.argmax(spectrum)
+    # Parabolic interpolation of the peak for sub-bin resolution.
+    a, b, c = spectrum[peak - 1], spectrum[peak], spectrum[(peak + 1) % n]
+    frac = 0.5 * (a - c) / (a - 2 * b + c) if (a - 2 * b + c) != 0 else 0
+    freq = np.fft.fftfreq(n, 1 / rate)[peak] + frac * rate / n
+    return freq / 4
+
+
+class DemodResult:
+    """Demodulated symbols and EVM for one record.
+
+    evmRms and evmPeak are in percent and peakSymbol is the index of
+    the symbol with peak EVM, matching fetch:conste:results?.
+    evm is EVM vs symbol (%) as float32, like fetch:evm:trace?."""
+
+    def __init__(self, symbols, reference, freqError, phaseOffset):
+        self.symbols = symbols
+        self.reference = reference
+        self.freqError = freqError
+        self.phaseOffset = phaseOffset
+        self.evm = (np.abs(symbols - reference) * 100).astype(np.float32)
+        self.evmRms = float(np.sqrt(np.mean(self.evm.astype(np.float64) ** 2)))
+        self.peakSymbol = int(np.argmax(self.evm))
+        self.evmPeak = float(self.evm[self.peakSymbol])
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def demodulate(iq, sampleRate, symRate=3.84e6, alpha=0.22,
+               measFilter='rrcosine', refFilter='rcosine', sps=8):
+    """Demodulates a QPSK IQ record and computes per-symbol EVM.
+
+    measFilter is applied to the received signal ('rrcosine' or 'none').
+    refFilter is the overall channel response used for the reference
+    ('rcosine' or 'rrcosine'); with a Nyquist RC reference and symbol
+    point measurements the reference at each symbol is the ideal
+    constellation point, with an RRC reference the reference is the
+    ideal symbol sequence passed through that filter.
+    Symbols are normalized so the reference has unit RMS magnitude."""
+    iq = np.asarray(iq, dtype=np.complex128)
+    if len(iq) < 64 * sampleRate / symRate:
+        raise DemodError('Record is too short to demodulate.')
+
+    x, rate = resample(iq, sampleRate, symRate * sps)
+    spsActual = rate / symRate
+
+    # Coarse carrier removal. The 4th power line is sharpest after
+    # matched filtering, so filter first and then correct the frequency.
+    if measFilter == 'rrcosine':
+        x = np.convolve(x, rrc_taps(alpha, sps), mode='same')
+    elif measFilter != 'none':
+        raise DemodError(f'Unsupported measurement filter: {measFilter}')
+    freqError = _fourth_power_freq(x, rate)
+    n = np.arange(len(x))
+    x *= np.exp(-2j * np.pi * freqError * n / rate)
+
+    # Symbol timing: the sampling phase with the most energy is the eye
+    # center. Refine the integer phase with a parabola and interpolate.
+    guard = 8 * sps
+    numSym = int((len(x) - 2 * guard) / spsActual) - 1
+    base = guard + np.arange(numSym) * spsActual
+    energy = np.empty(sps)
+    for p in range(sps):
+        idx = np.round(base + p).astype(np.int64)
+        energy[p] = np.mean(np.abs(x[idx]) ** 2)
+    peak = int(np.argmax(energy))
+    a, b, c = energy[peak - 1], energy[peak], energy[(peak + 1) % sps]
+    frac = 0.5 * (a - c) / (a - 2 * b + c) if (a - 2 * b + c) != 0 else 0
+    t = base + peak + frac
+    i0 = np.floor(t).astype(np.int64)
+    mu = t - i0
+    symbols = x[i0] * (1 - mu) + x[i0 + 1] * mu
+
+    # Fine carrier recovery: residual frequency and phase from the slope
+    # of the unwrapped 4th power phase. QPSK points sit at odd multiples
+    # of pi/4, so their 4th power is at pi.
+    phase4 = np.unwrap(np.angle(symbols ** 4 * -1))
+    k = np.arange(numSym)
+    slope, intercept = np.polyfit(k, phase4, 1)
+    symbols *= np.exp(-1j * (slope * k + intercept) / 4)
+    freqError += slope / 4 * symRate / (2 * np.pi)
+    phaseOffset = intercept / 4
+
+    # Decisions and reference.
+    symbols /= np.sqrt(np.mean(np.abs(symbols) ** 2))
+    ideal = (np.sign(symbols.real) + 1j * np.sign(symbols.imag)) / np.sqrt(2)
+    if refFilter == 'rcosine':
+        reference = ideal
+    elif refFilter == 'rrcosine':
+        taps = rrc_taps(alpha, 1)
+        reference = np.convolve(ideal, taps / np.max(taps), mode='same')
+    else:
+        raise DemodError(f'Unsupported reference filter: {refFilter}')
+    scale = np.sqrt(np.mean(np.abs(reference) ** 2))
+    return DemodResult(symbols / scale, reference / scale, freqError, phaseOffset)
+
+
+def demodulate_batch(records, sampleRate, symRate=3.84e6, alpha=0.22,
+                     measFilter='rrcosine', refFilter='rcosine', sps=8,
+                     workers=None):
+    """Demodulates many IQ records in parallel on a process pool.
+
+    records is a 2-D array (one record per row) or a list of 1-D
+    records. workers is the number of processes (default: CPU count).
+    Returns a list of DemodResult in the same order as records."""
+    demod = partial(demodulate, sampleRate=sampleRate, symRate=symRate,
+                    alpha=alpha, measFilter=measFilter, refFilter=refFilter,
+                    sps=sps)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(demod, records, chunksize=4))
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    rsa = SocketInstrument('127.0.0.1', port=4000, timeout=25)
+    print(rsa.instId)
+    rsa.write('abort')
+    rsa.write('display:general:measview:new iqvtime')
+    rsa.write('spectrum:frequency:center 2.4453e9')
+    rsa.write('spectrum:frequency:span 40e6')
+    rsa.write('initiate:continuous off')
+    rsa.write('trigger:status off')
+
+    records = []
+    for i in range(16):
+        rsa.write('initiate:immediate')
+        rsa.query('*opc?')
+        records.append(rsa.iq_fetch())
+    rsa.disconnect()
+
+    results = demodulate_batch([r.data for r in records], records[0].sampleRate)
+    for r in results:
+        print('EVM (RMS): {:2.3f}%, EVM (peak): {:2.3f}%, Symbol: {:<4d}'.format(
+            r.evmRms, r.evmPeak, r.peakSymbol))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+RSA DPX Bitmap and DPXogram Transfer
+Updated: 10/26
+Retrieves the DPX bitmap (trace 5) and DPXogram (trace 6) from the RSA
+as binary blocks and decodes them into 2-D float32 arrays.
+DPXogram lines are fetched incrementally: each poll transfers the
+lines added since the previous poll as one binary block, received
+directly into the rows of a preallocated ring buffer, so DPXogram
+history can be archived continuously without re-transferring the
+waterfall.
+The DPX display and traces must already be enabled (see
+RSA/rsa_dpx_trace_selector.py).
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import time
+import numpy as np
+from socket_instrument import SocketInstrument, BinblockError
+
+
+# DPX queries, see the DPX section of the SignalVu-PC/RSA programmer manual.
+BITMAP_QUERY = 'fetch:dpx:trace:bitmap?'
+DGRAM_COUNT_QUERY = 'fetch:dpx:dgram:line:count?'
+# DPXogram lines are numbered from 0 (oldest) to count - 1 (newest).
+# Returns lines first through last (inclusive) as one block, oldest first.
+DGRAM_LINES_QUERY = 'fetch:dpx:trace:dgram:line? {},{}'
+
+# The DPX bitmap is 201 amplitude rows high.
+BITMAP_ROWS = 201
+
+
+def fetch_bitmap(rsa, rows=BITMAP_ROWS, out=None):
+    """Fetches the DPX bitmap as a (rows, frequency points) float32 array.
+
+    If out is given (a contiguous float32 array of the right size) the
+    bitmap is received straight into it."""
+    rsa.write(BITMAP_QUERY)
+    numBytes = rsa.binblock_size()
+    numPoints, err = divmod(numBytes, 4 * rows)
+    if err != 0:
+        rsa.binblock_discard(numBytes)
+        raise BinblockError(f'Bitmap of {numBytes} bytes is not {rows} float32 rows.')
+    if out is None:
+        out = np.empty((rows, numPoints), dtype=np.float32)
+    elif out.size != rows * numPoints:
+        rsa.binblock_discard(numBytes)
+        raise BinblockError(f'out has {out.size} points, bitmap has {rows * numPoints}.')
+    rsa.binblockread_into(out, numBytes)
+    return out.reshape(rows, numPoints)
+
+
+class LineRing:
+    def __init__(self, capacity, width):
+        """Preallocated ring of capacity float32 lines of width points.
+
+        Each line also stores the host time it was received."""
+        self.lines = np.zeros((capacity, width), dtype=np.float32)
+        self.times = np.zeros(capacity)
+        self.capacity = capacity
+        self.width = width
+        self.head = 0          # next row to write
+        self.total = 0         # lines written since creation
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def reserve(self, n):
+        """Returns writable views of the next n rows (two if they wrap).
+
+        The ring doesn't change until commit(n) is called, so rows that
+        are never filled aren't counted."""
+        stop = self.head + n
+        if stop <= self.capacity:
+            return [self.lines[self.head:stop]]
+        return [self.lines[self.head:], self.lines[:stop - self.capacity]]
+
+    def commit(self, n):
+        """Advances the ring over n reserved rows and timestamps them."""
+        index = (self.head + np.arange(n)) % self.capacity
+        self.times[index] = time.time()
+        self.head = (self.head + n) % self.capacity
+        self.total += n
+
+    def to_array(self):
+        """Returns the stored lines, oldest first (copy)."""
+        if self.total < self.capacity:
+            return self.lines[:self.total].copy()
+        return np.concatenate((self.lines[self.head:], self.lines[:self.head]))
+
+    def latest(self, n):
+        """Returns the n most recent lines, oldest first (copy)."""
+        n = min(n, len(self))
+        index = (self.head - n + np.arange(n)) % self.capacity
+        return self.lines[index]
+
+
+class DPXogramReader:
+    def __init__(self, rsa, capacity=10000):
+        """Incremental DPXogram reader for a connected SocketInstrument.
+
+        capacity is the number of lines kept in the ring; the line width
+        is taken from the first line received."""
+        self.rsa = rsa
+        self.capacity = capacity
+        self.ring = None
+        self.lastCount = 0
+        self.dropped = 0
+
+    def line_count(self):
+        return int(float(self.rsa.query(DGRAM_COUNT_QUERY)))
+
+    def _fetch_lines(self, first, count):
+        """Receives lines first to count - 1 in one block into the ring."""
+        n = count - first
+        self.rsa.write(DGRAM_LINES_QUERY.format(first, count - 1))
+        numBytes = self.rsa.binblock_size()
+        width, err = divmod(numBytes, 4 * n)
+        if err != 0:
+            self.rsa.binblock_discard(numBytes)
+            raise BinblockError(f'DPXogram block is not {n} lines of float32 points.')
+        if self.ring is None:
+            self.ring = LineRing(self.capacity, width)
+        elif width != self.ring.width:
+            self.rsa.binblock_discard(numBytes)
+            raise BinblockError(
+                f'DPXogram line width changed from {self.ring.width} to {width}.')
+        self.rsa.binblockread_into(self.ring.reserve(n), numBytes)
+        # Only count the lines once they have all arrived.
+        self.ring.commit(n)
+
+    def poll(self):
+        """Fetches only the lines added since the last poll.
+
+        If the DPXogram was restarted (line count went down) reading
+        starts again from line 0. If more lines arrived than the ring
+        holds, only the newest capacity lines are fetched and the rest
+        are counted in dropped. If the transfer fails nothing is
+        recorded, and the same lines are fetched again by the next
+        poll. Returns the number of lines fetched."""
+        count = self.line_count()
+        if count < self.lastCount:
+            self.lastCount = 0
+        first = self.lastCount
+        skipped = 0
+        if count - first > self.capacity:
+            skipped = count - first - self.capacity
+            first = count - self.capacity
+        if count > first:
+            self._fetch_lines(first, count)
+        self.dropped += skipped
+        self.lastCount = count
+        return count - first
+
+    def to_array(self):
+        """DPXogram history held in the ring, oldest line first."""
+        if self.ring is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self.ring.to_array()
+
+
+def main():
+    rsa = SocketInstrument('127.0.0.1', port=4000, timeout=10)
+    print(rsa.instId)
+    rsa.write('display:general:measview:new DPX')
+    rsa.write('sense:dpx:plot split')
+    rsa.write('spectrum:frequency:center 2.4453e9')
+    rsa.write('spectrum:frequency:span 40e6')
+    rsa.write('trace5:dpx 1')
+    rsa.write('trace6:dpx 1')
+    rsa.write('initiate:continuous on')
+
+    bitmap = fetch_bitmap(rsa)
+    print('Bitmap shape:', bitmap.shape)
+
+    reader = DPXogramReader(rsa, capacity=20000)
+    for i in range(10):
+        time.sleep(1)
+        print('New DPXogram lines:', reader.poll())
+    print('DPXogram history:', reader.to_array().shape)
+
+    rsa.write('initiate:continuous off')
+    rsa.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+RSA IQ Recorder
+Updated: 10/26
+This program records IQ data from the RSA in bounded chunks and
+writes it continuously to a memory-mapped complex64 file, so a single
+recording can be many times larger than host RAM.
+A chunk index (sample offset, length, timestamps, and acquisition
+settings of every chunk) is saved next to the data file.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import os
+import socket
+import time
+import numpy as np
+from socket_instrument import (SocketInstrument, BinblockError, SockInstError,
+                               IQ_SETTINGS_QUERY)
+
+
+INDEX_DTYPE = np.dtype([
+    ('offset', np.int64),       # first sample of chunk in data file
+    ('length', np.int64),       # number of samples in chunk
+    ('hostTime', np.float64),   # time.time() when chunk was initiated
+    ('acqStart', np.float64),   # acquisition start relative to trigger (s)
+    ('sampleRate', np.float64),
+    ('centerFreq', np.float64)])
+
+
+# Errors that can interrupt an IQ transfer part way through.
+TRANSFER_ERRORS = (BinblockError, SockInstError, socket.timeout)
+
+
+class RecorderError(Exception):
+    """IQ Recorder Exception class"""
+    pass
+
+
+def index_file(fileName):
+    """Returns the name of the chunk index file for a recording."""
+    return fileName + '.idx.npy'
+
+
+def open_recording(fileName):
+    """Opens a finished recording read-only.
+
+    Returns (data, index) where data is a complex64 memory map covering
+    only the recorded samples and index is the chunk index array."""
+    index = np.load(index_file(fileName))
+    numSamples = int(index['offset'][-1] + index['length'][-1]) if len(index) else 0
+    if numSamples == 0:
+        return np.zeros(0, dtype=np.complex64), index
+    data = np.memmap(fileName, dtype=np.complex64, mode='r', shape=(numSamples,))
+    return data, index
+
+
+class IQRecorder:
+    def __init__(self, rsa, fileName, maxSamples):
+        """Creates a recording file with room for maxSamples IQ samples.
+
+        rsa is a connected SocketInstrument already configured for IQ
+        capture. The chunk size is whatever one acquisition returns, so
+        it is bounded by the RSA's acquisition length setting."""
+        self.rsa = rsa
+        self.fileName = fileName
+        self.maxSamples = int(maxSamples)
+        # Sparse on most file systems; pages are only backed as they're written.
+        self.data = np.memmap(fileName, dtype=np.complex64, mode='w+',
+                              shape=(self.maxSamples,))
+        self.chunks = []
+        self.numSamples = 0
+        self.startTime = None
+        self.stopTime = None
+        self.errors = 0
+
+    def record_chunk(self, debug=False):
+        """Acquires one chunk and writes it to the end of the recording.
+
+        IQ data is received straight into the memory map. Returns the
+        number of samples recorded. The recording state only changes
+        once the whole chunk has arrived."""
+        hostTime = time.time()
+        self.rsa.write('initiate:immediate')
+        # The IQ settings are read with *opc? and passed on to iq_fetch(), so
+        # checking the chunk length against the file costs no extra query.
+        reply = self.rsa.query('*opc?;:' + IQ_SETTINGS_QUERY)
+        settings = reply.split(';')[1:]
+        try:
+            length = int(float(settings[1]))
+        except (IndexError, ValueError):
+            raise SockInstError(f'Unexpected IQ settings reply: {reply}')
+        if self.numSamples + length > self.maxSamples:
+            raise RecorderError('Recording file is full.')
+
+        record = self.rsa.iq_fetch(out=self.data[self.numSamples:], settings=settings,
+                                   debug=debug)
+        if self.startTime is None:
+            self.startTime = hostTime
+
+        self.chunks.append((self.numSamples, len(record), hostTime,
+                            record.acqStart, record.sampleRate, record.centerFreq))
+        self.numSamples += len(record)
+        self.stopTime = time.time()
+        return len(record)
+
+    def record(self, duration=None, numChunks=None, maxErrors=3, debug=False):
+        """Records chunks until duration (s), numChunks, or the file is full.
+
+        A chunk whose transfer fails is dropped and the socket resynced;
+        recording stops after maxErrors consecutive failures. The
+        recording is flushed however recording ends."""
+        start = time.time()
+        count = 0
+        failures = 0
+        try:
+            while True:
+                if numChunks is not None and count >= numChunks:
+                    break
+                if duration is not None and time.time() - start >= duration:
+                    break
+                try:
+                    self.record_chunk(debug)
+                except RecorderError:
+                    break
+                except TRANSFER_ERRORS:
+                    self.errors += 1
+                    failures += 1
+                    if failures >= maxErrors:
+                        raise
+                    self.resync()
+                    continue
+                failures = 0
+                count += 1
+        finally:
+            self.flush()
+        return count
+
+    def resync(self, wait=0.5):
+        """Discards the rest of an interrupted transfer.
+
+        Reads until the RSA has been silent for wait seconds, then
+        confirms the connection answers queries again."""
+        sock = self.rsa.socket
+        timeout = sock.gettimeout()
+        sock.settimeout(wait)
+        try:
+            while sock.recv(1 << 20):
+                pass
+        except socket.timeout:
+            pass
+        finally:
+            sock.settimeout(timeout)
+        self.rsa.query('*opc?')
+
+    @property
+    def index(self):
+        """Chunk index as a structured array (see INDEX_DTYPE)."""
+        return np.array(self.chunks, dtype=INDEX_DTYPE)
+
+    def flush(self):
+        """Writes recorded data and the chunk index to disk."""
+        self.data.flush()
+        np.save(index_file(self.fileName), self.index)
+
+    def close(self):
+        """Flushes the recording and trims the data file to the recorded length."""
+        self.flush()
+        # Dropping the only reference closes the memory map before truncating.
+        del self.data
+        with open(self.fileName, 'r+b') as f:
+            f.truncate(self.numSamples * np.dtype(np.complex64).itemsize)
+
+    def gaps(self, tolerance=0.0):
+        """Returns (chunkIndex, gapSeconds) for every discontinuity.
+
+        A gap is the time between the end of chunk k (host initiate time
+        plus chunk duration) and the initiate time of chunk k + 1. The
+        RSA does not capture between single acquisitions, so any gap
+        larger than tolerance is dead time in the recording."""
+        index = self.index
+        if len(index) < 2:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        chunkEnd = index['hostTime'][:-1] + index['length'][:-1] / index['sampleRate'][:-1]
+        gap = index['hostTime'][1:] - chunkEnd
+        where = np.flatnonzero(gap > tolerance)
+        return where, gap[where]
+
+    def throughput(self):
+        """Returns sustained (samples/s, bytes/s) since recording started."""
+        if self.startTime is None or self.stopTime == self.startTime:
+            return 0.0, 0.0
+        elapsed = self.stopTime - self.startTime
+        samplesPerSec = self.numSamples / elapsed
+        return samplesPerSec, samplesPerSec * np.dtype(np.complex64).itemsize
+
+
+def main():
+    rsa = SocketInstrument('127.0.0.1', port=4000, timeout=10)
+    print(rsa.instId)
+    rsa.write('abort')
+    rsa.write('display:general:measview:new iqvtime')
+    rsa.write('spectrum:frequency:center 1e9')
+    rsa.write('spectrum:frequency:span 40e6')
+    rsa.write('sense:acquisition:seconds 10e-3')
+    rsa.write('initiate:continuous off')
+    rsa.write('trigger:status off')
+
+    fileName = os.path.join(os.getcwd(), 'iq_recording.c64')
+    recorder = IQRecorder(rsa, fileName, maxSamples=2e9)
+    numChunks = recorder.record(duration=60)
+    recorder.close()
+
+    samplesPerSec, bytesPerSec = recorder.throughput()
+    where, gap = recorder.gaps(tolerance=1e-6)
+    print(f'Chunks: {numChunks}, samples: {recorder.numSamples}')
+    print(f'Throughput: {samplesPerSec / 1e6:.3f} MS/s, {bytesPerSec / 1e6:.3f} MB/s')
+    print(f'Gaps: {len(where)}, total dead time: {gap.sum():.6f} s')
+
+    rsa.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Sampled Axis
+Updated: 10/26
+Lazy time/frequency axis for uniformly sampled data. An axis is
+defined by its first value, increment, and length, so a 1 GS record
+doesn't need an 8 GB time vector next to it. Index <-> value
+conversion and slicing are O(1); values are only materialized when
+asked for (np.asarray(axis) or axis.values()), and then only for the
+requested range.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import numpy as np
+
+
+class SampledAxis:
+    def __init__(self, start, incr, length):
+        """Axis whose value at index n is start + n * incr."""
+        self.start = float(start)
+        self.incr = float(incr)
+        self.length = int(length)
+
+    @classmethod
+    def from_preamble(cls, xZero, xIncr, numPoints, ptOffset=0):
+        """Scope time axis from wfmoutpre:xzero?, xincr?, nr_pt?, pt_off?.
+
+        Point n is at xZero + xIncr * (n - ptOffset)."""
+        return cls(xZero - ptOffset * xIncr, xIncr, numPoints)
+
+    @classmethod
+    def from_span(cls, cf, span, numPoints):
+        """RSA frequency axis for a trace covering cf - span/2 to cf + span/2.
+
+        The first and last trace points sit on the span edges."""
+        return cls.from_limits(cf - span / 2, cf + span / 2, numPoints)
+
+    @classmethod
+    def from_limits(cls, first, last, numPoints, endpoint=True):
+        """Axis like np.linspace(first, last, numPoints, endpoint)."""
+        divisor = numPoints - 1 if endpoint else numPoints
+        incr = (last - first) / divisor if divisor > 0 else 0.0
+        return cls(first, incr, numPoints)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def stop(self):
+        """Value of the last point."""
+        return self.start + (self.length - 1) * self.incr
+
+    def value(self, index):
+        """Value(s) at index; negative indices count from the end."""
+        index = np.asarray(index)
+        index = np.where(index < 0, index + self.length, index)
+        if np.any((index < 0) | (index >= self.length)):
+            raise IndexError('SampledAxis index out of range.')
+        value = self.start + index * self.incr
+        return float(value) if value.ndim == 0 else value
+
+    def index(self, value, mode='nearest'):
+        """Index(es) of value, clipped to the axis.
+
+        mode is 'nearest', 'floor', 'ceil', or 'exact' (fractional)."""
+        position = (np.asarray(value, dtype=np.float64) - self.start) / self.incr
+        if mode == 'exact':
+            return position
+        if mode == 'nearest':
+            position = np.rint(position)
+        elif mode == 'floor':
+            position = np.floor(position)
+        elif mode == 'ceil':
+            position = np.ceil(position)
+        else:
+            raise ValueError(f'Unknown mode: {mode}')
+        index = np.clip(position, 0, self.length - 1).astype(np.int64)
+        return int(index) if index.ndim == 0 else index
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            return SampledAxis(self.start + start * self.incr, self.incr * step,
+                               len(range(start, stop, step)))
+        return self.value(key)
+
+    def window(self, first, last):
+        """Sub-axis covering values first to last (inclusive) and its slice."""
+        i0 = int(np.clip(np.ceil(self.index(first, 'exact')), 0, self.length))
+        i1 = int(np.clip(np.floor(self.index(last, 'exact')) + 1, i0, self.length))
+        return self[i0:i1], slice(i0, i1)
+
+    def values(self, start=0, stop=None, dtype=np.float64):
+        """Materializes the values for indices start:stop."""
+        start, stop, _ = slice(start, stop).indices(self.length)
+        return (self.start + np.arange(start, stop, dtype=np.float64) * self.incr).astype(
+            dtype, copy=False)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values(dtype=dtype or np.float64)
+
+    def __iter__(self):
+        for n in range(self.length):
+            yield self.start + n * self.incr
+
+    def __mul__(self, scale):
+        """Scaled axis, e.g. axis * 1e3 for milliseconds."""
+        return SampledAxis(self.start * scale, self.incr * scale, self.length)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scale):
+        return self * (1 / scale)
+
+    def __add__(self, offset):
+        return SampledAxis(self.start + offset, self.incr, self.length)
+
+    __radd__ = __add__
+
+    def __sub__(self, offset):
+        return self + (-offset)
+
+    def __eq__(self, other):
+        return (isinstance(other, SampledAxis) and self.start == other.start
+                and self.incr == other.incr and self.length == other.length)
+
+    def __repr__(self):
+        return 'SampledAxis(start={}, incr={}, length={})'.format(
+            self.start, self.incr, self.length)
@@ -0,0 +1,250 @@
+"""
+Instrument Job Scheduler
+Updated: 10/26
+Runs test procedures as jobs across a pool of instruments. Each
+instrument has one worker thread and is used by exactly one job at a
+time. Jobs can target a specific instrument or any instrument of a
+kind ('RSA', 'DPO', 'AWG', ...), are taken from priority queues
+(highest priority first, then in submission order), and can have a
+timeout. Per-instrument utilization is tracked.
+A procedure is any callable taking the instrument as its first
+argument, e.g. procedure(inst, *args, **kwargs).
+Python 3.6.3 64-bit
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class SchedulerError(Exception):
+    """Scheduler Exception class"""
+    pass
+
+
+class Job:
+    def __init__(self, procedure, args=(), kwargs=None, kind=None, instrument=None,
+                 priority=0, timeout=None, name=None):
+        self.procedure = procedure
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.kind = kind
+        self.instrument = instrument
+        self.priority = priority
+        self.timeout = timeout
+        self.name = name or getattr(procedure, '__name__', 'job')
+        self.future = Future()
+        # Filled in when the job runs.
+        self.ranOn = None
+        self.startTime = None
+        self.stopTime = None
+
+
+class _Station:
+    """One instrument, its lock, and its bookkeeping."""
+
+    def __init__(self, name, inst, kind):
+        self.name = name
+        self.inst = inst
+        self.kind = kind
+        self.lock = threading.Lock()
+        self.thread = None
+        self.busy = 0.0
+        self.jobs = 0
+        self.timeouts = 0
+        self.failures = 0
+
+
+class Scheduler:
+    def __init__(self):
+        self.stations = {}
+        # One heap per target (instrument name or kind) of (-priority, seq, job).
+        self._queues = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self.startTime = None
+
+    def add_instrument(self, name, inst, kind):
+        """Adds an instrument (an open SocketInstrument, PyVISA resource, ...).
+
+        Instruments can be added while the scheduler is running."""
+        if name in self.stations:
+            raise SchedulerError(f'Instrument {name} already added.')
+        station = _Station(name, inst, kind)
+        with self._cond:
+            self.stations[name] = station
+            if self._running:
+                self._start_worker(station)
+        return station
+
+    def submit(self, procedure, *args, kind=None, instrument=None, priority=0,
+               timeout=None, name=None, **kwargs):
+        """Queues procedure(inst, *args, **kwargs) and returns its Future.
+
+        Exactly one of kind or instrument selects where the job can run.
+        The Future raises concurrent.futures.TimeoutError if the job runs
+        longer than timeout seconds."""
+        if (kind is None) == (instrument is None):
+            raise SchedulerError('Specify either kind or instrument.')
+        if instrument is not None and instrument not in self.stations:
+            raise SchedulerError(f'Unknown instrument: {instrument}')
+        if kind is not None and not any(s.kind == kind for s in self.stations.values()):
+            raise SchedulerError(f'No instrument of kind {kind} to run the job.')
+        job = Job(procedure, args, kwargs, kind, instrument, priority, timeout, name)
+        target = ('inst', instrument) if instrument is not None else ('kind', kind)
+        with self._cond:
+            heapq.heappush(self._queues.setdefault(target, []),
+                           (-priority, next(self._seq), job))
+            self._cond.notify_all()
+        return job.future
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self.startTime = time.time()
+            for station in self.stations.values():
+                self._start_worker(station)
+
+    def shutdown(self, wait=True, cancelPending=False):
+        """Stops the workers after their current job.
+
+        Queued jobs are run first unless cancelPending is True."""
+        with self._cond:
+            if cancelPending:
+                for queue in self._queues.values():
+                    for _, _, job in queue:
+                        job.future.cancel()
+                    queue.clear()
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for station in self.stations.values():
+                if station.thread is not None:
+                    station.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=True)
+
+    def _start_worker(self, station):
+        station.thread = threading.Thread(target=self._worker, args=(station,),
+                                          name=f'scheduler-{station.name}', daemon=True)
+        station.thread.start()
+
+    def _next_job(self, station):
+        """Pops the best job this station can run (call with _cond held)."""
+        best = None
+        for target in (('inst', station.name), ('kind', station.kind)):
+            queue = self._queues.get(target)
+            while queue and queue[0][2].future.cancelled():
+                heapq.heappop(queue)
+            if queue and (best is None or queue[0] < best[0]):
+                best = (queue[0], queue)
+        if best is None:
+            return None
+        return heapq.heappop(best[1])[2]
+
+    def _pending(self, station):
+        """True if a queue this station can serve has jobs (call with _cond held)."""
+        return any(self._queues.get(target) for target in
+                   (('inst', station.name), ('kind', station.kind)))
+
+    def _worker(self, station):
+        while True:
+            with self._cond:
+                job = self._next_job(station)
+                while job is None:
+                    if not self._running and not self._pending(station):
+                        return
+                    self._cond.wait()
+                    job = self._next_job(station)
+                # Let waiting workers recheck the queues.
+                self._cond.notify_all()
+            if job.future.set_running_or_notify_cancel():
+                self._run(station, job)
+            with self._cond:
+                self._cond.notify_all()
+
+    def _run(self, station, job):
+        """Runs job with the station's lock held, enforcing its timeout.
+
+        A timed-out procedure can't be killed; the instrument stays
+        locked until the procedure returns, so no other job can
+        interleave commands with it."""
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = job.procedure(station.inst, *job.args, **job.kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+
+        with station.lock:
+            job.ranOn = station.name
+            job.startTime = time.time()
+            runner = threading.Thread(target=target, name=f'{station.name}-{job.name}',
+                                      daemon=True)
+            runner.start()
+            runner.join(job.timeout)
+            if runner.is_alive():
+                station.timeouts += 1
+                job.future.set_exception(TimeoutError(
+                    f'{job.name} exceeded {job.timeout} s on {station.name}'))
+                runner.join()
+            elif 'error' in outcome:
+                station.failures += 1
+                job.future.set_exception(outcome['error'])
+            else:
+                job.future.set_result(outcome.get('result'))
+            job.stopTime = time.time()
+            station.busy += job.stopTime - job.startTime
+            station.jobs += 1
+
+    def utilization(self):
+        """Per-instrument busy time, job counts, and busy fraction."""
+        elapsed = time.time() - self.startTime if self.startTime else 0.0
+        report = {}
+        for name, station in self.stations.items():
+            report[name] = {
+                'kind': station.kind,
+                'jobs': station.jobs,
+                'failures': station.failures,
+                'timeouts': station.timeouts,
+                'busy': station.busy,
+                'utilization': station.busy / elapsed if elapsed else 0.0}
+        return report
+
+
+def main():
+    from socket_instrument import SocketInstrument
+    from procedures import rsa_spectrum, dpo_fastframe
+
+    scheduler = Scheduler()
+    scheduler.add_instrument('rsa1', SocketInstrument('192.168.1.10', 4000), 'RSA')
+    scheduler.add_instrument('rsa2', SocketInstrument('192.168.1.11', 4000), 'RSA')
+    scheduler.add_instrument('dpo1', SocketInstrument('192.168.1.84', 4000), 'DPO')
+
+    with scheduler:
+        futures = [scheduler.submit(rsa_spectrum, 1e9 + 100e6 * i, kind='RSA', timeout=30)
+                   for i in range(20)]
+        futures.append(scheduler.submit(dpo_fastframe, kind='DPO', priority=10))
+        for f in futures:
+            axis, data = f.result()
+            print(len(data))
+
+    for name, stats in scheduler.utilization().items():
+        print('{}: {jobs} jobs, {utilization:.1%} busy'.format(name, **stats))
+    for station in scheduler.stations.values():
+        station.inst.disconnect()
+
+
+if __name__ == '__main__':
+    main()
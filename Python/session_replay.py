@@ -0,0 +1,490 @@
+"""
+Session Record and Replay
+Updated: 10/26
+Records an instrument session and replays it to unchanged host code
+without the instrument, for profiling and regression testing the host
+side of acquisition loops.
+- SocketInstrument sessions are recorded at the socket: every byte
+  sent and received, grouped into send and receive segments, with the
+  instrument's response latency and transfer time.
+- PyVISA sessions are recorded at the resource: every write, query,
+  and binary transfer call and the value it returned.
+Payloads larger than inlineLimit are stored once per content in a
+blob directory named by SHA-1, so repeated traces, waveforms, and
+sessions sharing a blob directory are deduplicated. Blobs are memory
+mapped on replay.
+Replay serves the recorded replies at wire speed (as fast as the host
+reads them) or paced (replies arrive with the recorded latency and
+transfer rate), and by default checks that the host sends exactly what
+was recorded.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import socket
+import time
+import uuid
+import numpy as np
+from socket_instrument import SocketInstrument
+
+
+class ReplayError(Exception):
+    """Session Replay Exception class"""
+    pass
+
+
+class _Segment:
+    """Payload being recorded; spills from memory to a temp file when large."""
+
+    def __init__(self, store):
+        self.store = store
+        self.hash = hashlib.sha1()
+        self.buffer = bytearray()
+        self.file = None
+        self.tmpName = None
+        self.length = 0
+
+    def write(self, data):
+        data = memoryview(data).cast('B')
+        self.hash.update(data)
+        self.length += data.nbytes
+        if self.file is None:
+            self.buffer += data
+            if len(self.buffer) > self.store.inlineLimit:
+                self.tmpName = os.path.join(self.store.blobDir,
+                                            f'{os.getpid()}.{uuid.uuid4().hex}.tmp')
+                self.file = open(self.tmpName, 'wb')
+                self.file.write(self.buffer)
+                self.buffer = None
+        else:
+            self.file.write(data)
+
+    def finish(self):
+        """Returns the payload's reference for the event log."""
+        if self.file is None:
+            return {'b': self.buffer.decode('latin_1')}
+        self.file.close()
+        digest = self.hash.hexdigest()
+        blob = self.store.blob_path(digest)
+        if os.path.exists(blob):
+            os.remove(self.tmpName)
+        else:
+            os.replace(self.tmpName, blob)
+        return {'blob': digest, 'n': self.length}
+
+
+class SessionStore:
+    def __init__(self, directory, blobDir=None, inlineLimit=256):
+        """Session files in directory; blobs in blobDir (shareable between sessions)."""
+        self.directory = directory
+        self.blobDir = blobDir or os.path.join(directory, 'blobs')
+        self.inlineLimit = inlineLimit
+        os.makedirs(self.blobDir, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blobDir, digest)
+
+    def segment(self):
+        return _Segment(self)
+
+    def put(self, data):
+        seg = self.segment()
+        seg.write(data)
+        return seg.finish()
+
+    def get(self, ref):
+        """Returns a payload as a bytes-like object (a memory map for blobs)."""
+        if 'b' in ref:
+            return ref['b'].encode('latin_1')
+        if ref['n'] == 0:
+            return b''
+        with open(self.blob_path(ref['blob']), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def save(self, meta, events):
+        with open(os.path.join(self.directory, 'session.json'), 'w') as f:
+            json.dump({'meta': meta, 'events': events}, f)
+
+    def load(self):
+        with open(os.path.join(self.directory, 'session.json')) as f:
+            session = json.load(f)
+        return session['meta'], session['events']
+
+
+class RecordingSocket:
+    def __init__(self, sock, store):
+        """Socket wrapper that logs all traffic of sock to store."""
+        self.sock = sock
+        self.store = store
+        self.events = []
+        self._kind = None
+        self._segment = None
+        self._start = None
+        self._lastSend = self._lastRecv = time.perf_counter()
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def _switch(self, kind):
+        """Closes the current segment if the direction of traffic changes."""
+        if self._kind == kind:
+            return
+        self.flush()
+        self._kind = kind
+        self._segment = self.store.segment()
+        self._start = time.perf_counter()
+
+    def flush(self):
+        if self._kind is None:
+            return
+        ref = self._segment.finish()
+        if self._kind == 'send':
+            self.events.append(['send', ref])
+        else:
+            # Latency from the end of the last send, and transfer time.
+            self.events.append(['recv', self._start - self._lastSend,
+                                self._lastRecv - self._start, ref])
+        self._kind = None
+
+    def send(self, data):
+        self._switch('send')
+        sent = self.sock.send(data)
+        self._lastSend = time.perf_counter()
+        self._segment.write(memoryview(data).cast('B')[:sent])
+        return sent
+
+    def sendall(self, data):
+        self._switch('send')
+        self.sock.sendall(data)
+        self._lastSend = time.perf_counter()
+        self._segment.write(data)
+
+    def _received(self, data):
+        # Called after data arrives, so the segment starts at the first byte.
+        self._switch('recv')
+        self._segment.write(data)
+        self._lastRecv = time.perf_counter()
+
+    def recv(self, n, *args):
+        try:
+            data = self.sock.recv(n, *args)
+        except socket.timeout:
+            self.flush()
+            self.events.append(['timeout'])
+            raise
+        self._received(data)
+        return data
+
+    def recv_into(self, buffer, n=0, *args):
+        try:
+            count = self.sock.recv_into(buffer, n, *args)
+        except socket.timeout:
+            self.flush()
+            self.events.append(['timeout'])
+            raise
+        self._received(memoryview(buffer).cast('B')[:count])
+        return count
+
+
+class ReplaySocket:
+    def __init__(self, store, events, paced=False, strict=True):
+        """Socket stand-in that plays back recorded traffic.
+
+        With paced, replies are delayed by the recorded latency and
+        delivered at the recorded rate. With strict, bytes sent by the
+        host must match the recording exactly."""
+        self.store = store
+        self.events = events
+        self.paced = paced
+        self.strict = strict
+        self.index = 0
+        self._expected = None
+        self._sent = 0
+        self._reply = None
+        self._pos = 0
+        self._lastSend = time.perf_counter()
+
+    def settimeout(self, timeout):
+        pass
+
+    def setblocking(self, flag):
+        pass
+
+    def connect(self, address):
+        pass
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+    def _next(self):
+        if self.index >= len(self.events):
+            raise ReplayError('Host code went past the end of the recording.')
+        event = self.events[self.index]
+        self.index += 1
+        return event
+
+    def _end_send(self):
+        if self._expected is None:
+            return
+        if self.strict and self._sent != len(self._expected):
+            raise ReplayError(f'Host sent {self._sent} bytes where {len(self._expected)} '
+                              f'were recorded (event {self.index - 1}).')
+        self._expected = None
+        self._lastSend = time.perf_counter()
+
+    def sendall(self, data):
+        data = memoryview(data).cast('B')
+        if self._reply is not None and self._pos < len(self._reply) and self.strict:
+            raise ReplayError('Host sent a command before reading the whole reply.')
+        self._reply = None
+        if self._expected is None:
+            event = self._next()
+            if event[0] != 'send':
+                raise ReplayError(f'Host sent data where the recording has {event[0]} '
+                                  f'(event {self.index - 1}).')
+            self._expected = self.store.get(event[1])
+            self._sent = 0
+        if self.strict:
+            end = self._sent + data.nbytes
+            if end > len(self._expected) or \
+                    self._expected[self._sent:end] != data.tobytes():
+                expected = bytes(self._expected[self._sent:self._sent + 80])
+                raise ReplayError(f'Host sent {data[:80].tobytes()!r}..., recording has '
+                                  f'{expected!r}... (event {self.index - 1}).')
+        self._sent += data.nbytes
+
+    def send(self, data):
+        self.sendall(data)
+        return memoryview(data).nbytes
+
+    def _reply_bytes(self, n):
+        """Returns up to n bytes of the current reply, advancing to the next one."""
+        if self._reply is None or self._pos >= len(self._reply):
+            self._end_send()
+            event = self._next()
+            if event[0] == 'timeout':
+                raise socket.timeout('timed out (recorded)')
+            if event[0] != 'recv':
+                raise ReplayError(f'Host is reading where the recording has {event[0]} '
+                                  f'(event {self.index - 1}).')
+            _, self._latency, self._duration, ref = event
+            self._reply = self.store.get(ref)
+            self._pos = 0
+        n = min(n or len(self._reply), len(self._reply) - self._pos)
+        if self.paced:
+            fraction = (self._pos + n) / len(self._reply)
+            due = self._lastSend + self._latency + self._duration * fraction
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        data = memoryview(self._reply)[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+    def recv(self, n, *args):
+        return self._reply_bytes(n).tobytes()
+
+    def recv_into(self, buffer, n=0, *args):
+        out = memoryview(buffer).cast('B')
+        data = self._reply_bytes(n or out.nbytes)
+        out[:data.nbytes] = data
+        return data.nbytes
+
+
+def record_instrument(inst, directory, blobDir=None, inlineLimit=256):
+    """Starts recording a connected SocketInstrument to directory.
+
+    Returns a function that stops recording and saves the session."""
+    store = SessionStore(directory, blobDir, inlineLimit)
+    recorder = RecordingSocket(inst.socket, store)
+    inst.socket = recorder
+    meta = {'type': 'socket', 'instId': inst.instId, 'started': time.time()}
+
+    def stop():
+        recorder.flush()
+        inst.socket = recorder.sock
+        meta['stopped'] = time.time()
+        store.save(meta, recorder.events)
+        return recorder.events
+
+    return stop
+
+
+def replay_instrument(directory, blobDir=None, paced=False, strict=True):
+    """Returns a SocketInstrument whose traffic is served from a recording."""
+    store = SessionStore(directory, blobDir)
+    meta, events = store.load()
+    if meta.get('type') != 'socket':
+        raise ReplayError(f'{directory} is not a SocketInstrument recording.')
+    # Built without __init__, which would connect and query *idn?.
+    inst = SocketInstrument.__new__(SocketInstrument)
+    inst.socket = ReplaySocket(store, events, paced, strict)
+    inst.instId = meta['instId']
+    return inst
+
+
+# PyVISA resource methods whose calls are recorded.
+VISA_METHODS = ('write', 'query', 'read', 'write_raw', 'read_raw', 'read_bytes',
+                'write_ascii_values', 'write_binary_values', 'query_ascii_values',
+                'query_binary_values', 'clear', 'close')
+
+
+def _pack_value(store, value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return {'v': value}
+    if isinstance(value, str):
+        if len(value) <= store.inlineLimit:
+            return {'v': value}
+        return dict(store.put(value.encode('utf-8')), type='str')
+    if isinstance(value, (bytes, bytearray)):
+        return dict(store.put(value), type='bytes')
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        return dict(store.put(value), type='array', dtype=value.dtype.str,
+                    shape=value.shape)
+    if isinstance(value, (list, tuple)):
+        return {'v': [_pack_value(store, v) for v in value], 'type': type(value).__name__}
+    return {'v': repr(value)}
+
+
+def _unpack_value(store, ref):
+    kind = ref.get('type')
+    if kind == 'str':
+        return bytes(store.get(ref)).decode('utf-8')
+    if kind == 'bytes':
+        return bytes(store.get(ref))
+    if kind == 'array':
+        dtype = np.dtype(ref['dtype'])
+        data = store.get(ref)
+        return np.frombuffer(data, dtype=dtype).reshape(ref['shape'])
+    if kind in ('list', 'tuple'):
+        values = [_unpack_value(store, v) for v in ref['v']]
+        return values if kind == 'list' else tuple(values)
+    return ref['v']
+
+
+def _describe_args(args):
+    """Short, comparable description of call arguments (payloads are hashed)."""
+    described = []
+    for a in args:
+        if isinstance(a, (str, int, float, bool)) or a is None:
+            described.append(a)
+        else:
+            data = np.ascontiguousarray(a)
+            described.append('sha1:' + hashlib.sha1(data.tobytes()).hexdigest())
+    return described
+
+
+class RecordingResource:
+    def __init__(self, resource, directory, blobDir=None, inlineLimit=256):
+        """Wraps a PyVISA resource and records every call in VISA_METHODS."""
+        self.__dict__['resource'] = resource
+        self.__dict__['store'] = SessionStore(directory, blobDir, inlineLimit)
+        self.__dict__['events'] = []
+        self.__dict__['started'] = time.time()
+
+    def __getattr__(self, name):
+        attr = getattr(self.resource, name)
+        if name not in VISA_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+            self.events.append(['call', name, _describe_args(args),
+                                time.perf_counter() - start,
+                                _pack_value(self.store, result)])
+            return result
+
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self.resource, name, value)
+
+    def save(self):
+        meta = {'type': 'visa', 'started': self.started, 'stopped': time.time()}
+        self.store.save(meta, self.events)
+
+
+class ReplayResource:
+    def __init__(self, directory, blobDir=None, paced=False, strict=True):
+        """PyVISA resource stand-in returning the recorded results in order.
+
+        With paced, each call takes as long as it did when recorded.
+        With strict, call names and arguments must match the recording.
+        Attributes such as timeout can be set and are ignored."""
+        self.store = SessionStore(directory, blobDir)
+        meta, self.events = self.store.load()
+        if meta.get('type') != 'visa':
+            raise ReplayError(f'{directory} is not a PyVISA recording.')
+        self.paced = paced
+        self.strict = strict
+        self.index = 0
+
+    def _replay(self, name, args):
+        start = time.perf_counter()
+        if self.index >= len(self.events):
+            raise ReplayError('Host code went past the end of the recording.')
+        _, recorded, recordedArgs, duration, result = self.events[self.index]
+        if self.strict and (recorded != name or
+                            recordedArgs != json.loads(json.dumps(_describe_args(args)))):
+            raise ReplayError(f'Call {self.index}: host called {name}{tuple(args)!r}, '
+                              f'recording has {recorded}{tuple(recordedArgs)!r}.')
+        self.index += 1
+        value = _unpack_value(self.store, result)
+        if self.paced:
+            delay = duration - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        return value
+
+    def __getattr__(self, name):
+        if name in VISA_METHODS:
+            return lambda *args, **kwargs: self._replay(name, args)
+        raise AttributeError(name)
+
+
+def main():
+    import visa
+    from procedures import rsa_spectrum
+
+    # Record a real RSA session...
+    rsa = SocketInstrument('192.168.1.10', port=4000, timeout=10)
+    stop = record_instrument(rsa, 'rsa_session')
+    traces = [rsa_spectrum(rsa, cf)[1] for cf in (1e9, 2e9, 3e9)]
+    stop()
+    rsa.disconnect()
+
+    # ...and run the same host code against the recording.
+    for paced in (False, True):
+        replay = replay_instrument('rsa_session', paced=paced)
+        start = time.perf_counter()
+        replayed = [rsa_spectrum(replay, cf)[1] for cf in (1e9, 2e9, 3e9)]
+        print(f'paced={paced}: {time.perf_counter() - start:.3f} s',
+              all(np.array_equal(a, b) for a, b in zip(traces, replayed)))
+
+    # PyVISA sessions are recorded at the resource.
+    rm = visa.ResourceManager()
+    dpo = RecordingResource(rm.open_resource('TCPIP::192.168.1.84::INSTR'), 'dpo_session')
+    dpo.write('data:source ch1')
+    dpo.query('*opc?')
+    data = dpo.query_binary_values('curve?', datatype='b', container=np.array)
+    dpo.close()
+    dpo.save()
+
+    replay = ReplayResource('dpo_session')
+    replay.write('data:source ch1')
+    replay.query('*opc?')
+    print(np.array_equal(replay.query_binary_values('curve?', datatype='b',
+                                                    container=np.array), data))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Settings Cache
+Updated: 10/26
+Opt-in shadow cache for an instrument session. CachedInstrument wraps
+a SocketInstrument or PyVISA resource and
+- remembers the last value written to every setting and skips writes
+  that would set the value already in place, and
+- serves repeated queries from cache until the setting is written or
+  a command invalidates it (*rst, system:preset, abort, *rcl, or a
+  configured dependency).
+Everything else (binblock transfers, close, attributes) is passed
+through to the wrapped instrument.
+Headers are compared after lower-casing and removing a leading colon;
+the cache doesn't know SCPI short forms, so use one spelling of each
+command consistently.
+Python 3.6.3 64-bit
+"""
+
+
+# Commands that reset or reload instrument state and clear the whole cache.
+INVALIDATE_ALL = ('*rst', 'system:preset', '*rcl', 'mmemory:open', 'mmemory:load',
+                  'abort', 'application:activate', 'autoset')
+
+# Commands that must always be sent, even with the same arguments.
+ACTIONS = ('*', 'initiate', 'abort', 'trigger:immediate', 'trigger:sequence',
+           'wlist:', 'slist:', 'mmemory:', 'awgcontrol:', 'rfgsignal:compile',
+           'calculate:marker:add', 'calculate:spectrum:marker', 'autoset',
+           'acquire:state', 'system:', 'display:general:measview:new',
+           'display:ddemod:measview:new', 'application:')
+
+# Queries whose replies change without a command and are never cached.
+VOLATILE = ('*opc', '*esr', '*stb', '*idn', 'fetch:', 'read:', 'measure:', 'curve',
+            'calculate:', 'system:error', 'allev', 'event', 'busy', 'acquire:',
+            'trigger:state', 'wfmoutpre', 'wlist:', 'slist:', 'awgcontrol:', 'status:')
+
+# Setting -> header prefixes whose cached queries it invalidates.
+DEPENDENCIES = {
+    'spectrum:frequency:span': ('spectrum:bandwidth', 'sense:acquisition',
+                                'sense:analysis', 'display:'),
+    'spectrum:frequency:center': ('display:',),
+    'spectrum:bandwidth': ('sense:acquisition', 'display:'),
+    'sense:analysis': ('display:', 'sense:acquisition'),
+    'sense:acquisition': ('display:', 'sense:analysis'),
+    'sense:avtime': ('display:avtime',),
+    'sense:iqvtime': ('display:iqvtime',),
+    'horizontal:': ('horizontal:', 'data:'),
+    'data:source': ('data:',),
+    'clock:': ('clock:',),
+}
+
+
+def _split_units(msg):
+    """Splits a program message into commands at ; outside quotes."""
+    units = []
+    start = 0
+    quote = None
+    for i, c in enumerate(msg):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in '"\'':
+            quote = c
+        elif c == ';':
+            units.append(msg[start:i])
+            start = i + 1
+    units.append(msg[start:])
+    return [u.strip() for u in units if u.strip()]
+
+
+def _normalize_value(value):
+    """Canonical argument text, so 2.4453e9 matches 2445300000."""
+    parts = []
+    for part in value.split(','):
+        part = part.strip()
+        try:
+            parts.append(repr(float(part)))
+        except ValueError:
+            parts.append(part if part[:1] in '"\'' else part.lower())
+    return ','.join(parts)
+
+
+def parse_command(unit):
+    """Returns (header, value) for one command; value is None if absent."""
+    header, _, value = unit.partition(' ')
+    header = header.lower().lstrip(':')
+    value = value.strip()
+    return header, (_normalize_value(value) if value else None)
+
+
+def _matches(header, prefixes):
+    return any(header.startswith(p) for p in prefixes)
+
+
+class CachedInstrument:
+    def __init__(self, inst, invalidateAll=INVALIDATE_ALL, actions=ACTIONS,
+                 volatile=VOLATILE, dependencies=DEPENDENCIES):
+        """Wraps inst; the wrapper is used in place of inst."""
+        self.inst = inst
+        self.invalidateAll = tuple(invalidateAll)
+        self.actions = tuple(actions)
+        self.volatile = tuple(volatile)
+        self.dependencies = dict(dependencies)
+        self.settings = {}
+        self.replies = {}
+        self.stats = {'writesSent': 0, 'writesSkipped': 0,
+                      'queriesSent': 0, 'queriesCached': 0}
+
+    def __getattr__(self, name):
+        return getattr(self.inst, name)
+
+    def invalidate(self, header=None):
+        """Forgets cached settings and replies (all, or header and its dependents)."""
+        if header is None:
+            self.settings.clear()
+            self.replies.clear()
+            return
+        header = header.lower().lstrip(':').rstrip('?')
+        self.settings.pop(header, None)
+        prefixes = (header,)
+        for setting, dependents in self.dependencies.items():
+            if header.startswith(setting):
+                prefixes += tuple(dependents)
+        for query in [q for q in self.replies if _matches(q, prefixes)]:
+            del self.replies[query]
+
+    def _needs_sending(self, unit):
+        """Updates the cache for one command; False if it can be skipped."""
+        header, value = parse_command(unit)
+        if header.endswith('?'):
+            return True
+        if _matches(header, self.invalidateAll):
+            self.invalidate()
+            return True
+        if value is None or _matches(header, self.actions):
+            self.invalidate(header)
+            return True
+        if self.settings.get(header) == value:
+            return False
+        self.invalidate(header)
+        self.settings[header] = value
+        return True
+
+    def write(self, cmd, *args, **kwargs):
+        """Writes only the commands of cmd that change something."""
+        units = _split_units(cmd)
+        send = [u for u in units if self._needs_sending(u)]
+        self.stats['writesSkipped'] += len(units) - len(send)
+        if not send:
+            return None
+        self.stats['writesSent'] += 1
+        if len(send) == len(units):
+            return self.inst.write(cmd, *args, **kwargs)
+        return self.inst.write(';:'.join(u.lstrip(':') for u in send), *args, **kwargs)
+
+    def query(self, cmd, *args, **kwargs):
+        """Returns a cached reply for repeated non-volatile queries."""
+        units = _split_units(cmd)
+        parsed = [parse_command(u) for u in units]
+        key = ';'.join(h if v is None else f'{h} {v}' for h, v in parsed)
+        cacheable = all(h.endswith('?') for h, _ in parsed) and not any(
+            _matches(h, self.volatile) for h, _ in parsed)
+        if cacheable and key in self.replies:
+            self.stats['queriesCached'] += 1
+            return self.replies[key]
+        for u in units:
+            self._needs_sending(u)
+        self.stats['queriesSent'] += 1
+        reply = self.inst.query(cmd, *args, **kwargs)
+        if cacheable:
+            self.replies[key] = reply
+        return reply
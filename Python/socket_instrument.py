@@ -18,6 +18,14 @@ import socket
 import numpy as np
 
 
+# Center frequency, acquisition samples and seconds, and acquisition
+# start of the current IQ acquisition, in one compound query.
+IQ_SETTINGS_QUERY = ('spectrum:frequency:center?;'
+                     ':sense:acquisition:samples?;'
+                     ':sense:acquisition:seconds?;'
+                     ':display:iqvtime:x:scale:offset?')
+
+
 class BinblockError(Exception):
     """Binary Block Exception class"""
     pass
@@ -28,6 +36,26 @@ class SockInstError(Exception):
     pass
 
 
+class IQRecord:
+    """Complex IQ record with the acquisition settings it was captured with.
+
+    data is a complex64 view of the received binary block, so iq.real
+    and iq.imag are I and Q without de-interleaving."""
+
+    def __init__(self, data, sampleRate, centerFreq, acqStart):
+        self.data = data
+        self.sampleRate = sampleRate
+        self.centerFreq = centerFreq
+        self.acqStart = acqStart
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def duration(self):
+        return len(self.data) / self.sampleRate
+
+
 class SocketInstrument:
     def __init__(self, host, port, timeout=10):
         """Open socket connection with settings for instrument control."""
@@ -53,7 +81,10 @@ class SocketInstrument:
         # Read continuously until termination character is found.
         response = b''
         while response[-1:] != b'\n':
-            response += self.socket.recv(1024)
+            data = self.socket.recv(1024)
+            if not data:
+                raise SockInstError('Connection closed by instrument.')
+            response += data
 
         # Strip out whitespace and return.
         return response.decode('latin_1').strip()
@@ -82,6 +113,18 @@ class SocketInstrument:
         <newline> is a single byte new line character at the end of the data.
         """
 
+        numBytes = self.binblock_size(debug)
+        rawData = bytearray(numBytes)
+        self.binblockread_into(rawData, numBytes, debug)
+
+        # Convert binary data to NumPy array of specified data type and return.
+        return np.frombuffer(rawData, dtype=dtype)
+
+    def binblock_size(self, debug=False):
+        """Reads a IEEE 488.2 binary block header and returns <yyy>
+
+        Leaves the socket positioned at the start of <data>."""
+
         # Read # character, raise exception if not present.
         if self.socket.recv(1) != b'#':
             raise BinblockError('Data in buffer is not in binblock format.')
@@ -92,21 +135,43 @@ class SocketInstrument:
 
         if debug:
             print('Header: #{}{}'.format(headerLength, numBytes))
-
-        rawData = bytearray(numBytes)
-        buf = memoryview(rawData)
-
-        # While there is data left to read...
-        while numBytes:
-            # Read data from instrument into buffer.
-            bytesRecv = self.socket.recv_into(buf, numBytes)
-            # Slice buffer to preserve data already written to it.
-            buf = buf[bytesRecv:]
-            # Subtract bytes received from total bytes.
-            numBytes -= bytesRecv
-            if debug:
-                print('numBytes: {}, bytesRecv: {}'.format(
-                    numBytes, bytesRecv))
+        return numBytes
+
+    def binblockread_into(self, buffer, numBytes, debug=False):
+        """Reads <data><newline> of a binary block directly into buffer
+
+        buffer can be any writable object that supports the buffer
+        protocol (bytearray, NumPy array, memory map, ...) and must hold
+        at least numBytes bytes. A list or tuple of buffers is filled
+        in order, e.g. the two halves of a ring buffer that wraps.
+        Call binblock_size() first to consume the header. No
+        intermediate copies are made."""
+
+        if not isinstance(buffer, (list, tuple)):
+            buffer = [buffer]
+        bufs = [memoryview(b).cast('B') for b in buffer]
+        size = sum(b.nbytes for b in bufs)
+        if size < numBytes:
+            # Discard the block so the next query doesn't read its data.
+            self.binblock_discard(numBytes)
+            raise BinblockError(
+                f'Buffer too small: {size} bytes for {numBytes} byte block.')
+
+        for buf in bufs:
+            buf = buf[:numBytes]
+            # While there is data left to read into this buffer...
+            while buf.nbytes:
+                # Read data from instrument into buffer.
+                bytesRecv = self.socket.recv_into(buf, buf.nbytes)
+                if not bytesRecv:
+                    raise BinblockError('Connection closed during binary block.')
+                # Slice buffer to preserve data already written to it.
+                buf = buf[bytesRecv:]
+                # Subtract bytes received from total bytes.
+                numBytes -= bytesRecv
+                if debug:
+                    print('numBytes: {}, bytesRecv: {}'.format(
+                        numBytes, bytesRecv))
 
         # Receive termination character.
         term = self.socket.recv(1)
@@ -114,12 +179,22 @@ class SocketInstrument:
             print('Term char: ', term)
         # If term char is incorrect or not present, raise exception.
         if term != b'\n':
-            print('Term char: {}, rawData Length: {}'.format(
-                term, len(rawData)))
+            print('Term char: {}, rawData Length: {}'.format(term, size))
             raise BinblockError('Data not terminated correctly.')
 
-        # Convert binary data to NumPy array of specified data type and return.
-        return np.frombuffer(rawData, dtype=dtype)
+    def binblock_discard(self, numBytes, chunkSize=1 << 20):
+        """Reads and drops <data><newline> of a binary block
+
+        Used after binblock_size() when the data can't be kept, so the
+        socket stays in step with the instrument."""
+
+        scratch = memoryview(bytearray(min(numBytes + 1, chunkSize)))
+        numBytes += 1
+        while numBytes:
+            bytesRecv = self.socket.recv_into(scratch, min(numBytes, len(scratch)))
+            if not bytesRecv:
+                raise BinblockError('Connection closed during binary block.')
+            numBytes -= bytesRecv
 
     def binblock_header(self, data):
         """Returns a IEEE 488.2 binary block header
@@ -132,7 +207,7 @@ class SocketInstrument:
         numBytes = memoryview(data).nbytes
         return f'#{len(str(numBytes))}{numBytes}'
 
-    def binblockwrite(self, msg, data, debug=False):
+    def binblockwrite(self, msg, data, debug=False, check=True):
         """Send data with IEEE 488.2 binary block format
 
         The data is formatted as:
@@ -145,15 +220,18 @@ class SocketInstrument:
         type used by the instrument that sends the data.
         <data> is the curve data in binary format.
         <newline> is a single byte new line character at the end of the data.
+
+        With check=False the *esr? round trip after the block is skipped,
+        so several blocks can be sent back to back and checked once.
         """
 
         header = self.binblock_header(data)
 
         # Send message, header, data, and termination
-        self.socket.send(msg.encode('latin_1'))
-        self.socket.send(header.encode('latin_1'))
-        self.socket.send(data)
-        self.socket.send(b'\n')
+        self.socket.sendall(msg.encode('latin_1'))
+        self.socket.sendall(header.encode('latin_1'))
+        self.socket.sendall(data)
+        self.socket.sendall(b'\n')
 
         if debug:
             print(f'binblockwrite --')
@@ -161,25 +239,88 @@ class SocketInstrument:
             print(f'header: {header}')
 
         # Check error status register and notify of problems
+        if check:
+            self.check_esr()
+
+    def check_esr(self):
+        """Raises BinblockError if the event status register is non-zero."""
         r = self.query('*esr?')
-        if int(r) is not 0:
+        if int(r) != 0:
             raise BinblockError(f'Non-zero ESR: {r}')
-        pass
 
-    def wfm_writer(self, name, data, debug=False):
+    def wfm_writer(self, name, data, debug=False, check=True):
         """Helper function for writing waveform data to AWGs"""
-        blockData = memoryview(data)
+        blockData = memoryview(data).cast('B')
         numSamples, err = divmod(blockData.nbytes, 4)
-        if err is not 0:
+        if err != 0:
             raise BinblockError('Total waveform data must be a multiple of 4 bytes.')
         # The maximum write size of wlist:waveform:data is 250 MSamples (1 GB)
         maxWrite = 249999999
-        if blockData.nbytes < maxWrite:  # If waveform is small enough, one write
-            self.binblockwrite(f'wlist:waveform:data "{name}", 0,', blockData, debug)
+        if numSamples < maxWrite:  # If waveform is small enough, one write
+            self.binblockwrite(f'wlist:waveform:data "{name}", 0,', blockData, debug, check)
         else:   # If it's too big, multiple writes are required
             for offset in range(0, numSamples, maxWrite):
-                partialData = blockData[offset:offset + maxWrite]
-                self.binblockwrite(f'wlist:waveform:data "{name}", {offset},', partialData, debug)
+                partialData = blockData[offset * 4:(offset + maxWrite) * 4]
+                self.binblockwrite(f'wlist:waveform:data "{name}", {offset},', partialData, debug, check)
+
+    def wfm_stream_writer(self, name, chunks, debug=False):
+        """Writes waveform data to AWGs from an iterable of float32 chunks
+
+        Each chunk is sent as its own wlist:waveform:data block at the
+        next sample offset, so the full waveform never has to be in
+        memory. The ESR is checked once after the last chunk.
+        Returns the number of samples written."""
+        offset = 0
+        for chunk in chunks:
+            blockData = memoryview(chunk).cast('B')
+            numSamples, err = divmod(blockData.nbytes, 4)
+            if err != 0:
+                raise BinblockError('Waveform chunks must be a multiple of 4 bytes.')
+            self.binblockwrite(f'wlist:waveform:data "{name}", {offset}, {numSamples},',
+                               blockData, debug, check=False)
+            offset += numSamples
+        self.query('*opc?')
+        self.check_esr()
+        return offset
+
+    def iq_fetch(self, out=None, debug=False, settings=None):
+        """Helper function for fetching IQ data from RSAs
+
+        Receives fetch:rfin:iq? directly into a buffer and returns an
+        IQRecord whose data is a complex64 view of that buffer. The RSA
+        sends interleaved little-endian float32 I/Q pairs, which is
+        exactly the memory layout of complex64, so no copy is needed.
+        If out is given (a contiguous complex64 array, e.g. a slice of
+        a memory map), samples are received straight into it and the
+        returned data is a view of out.
+
+        Center frequency, sample rate, and acquisition start time are
+        retrieved with a single compound query (IQ_SETTINGS_QUERY). A
+        caller that already has its reply fields can pass them as
+        settings to skip the query."""
+
+        if settings is None:
+            settings = self.query(IQ_SETTINGS_QUERY).split(';')
+        try:
+            centerFreq, samples, seconds, acqStart = [float(m) for m in settings]
+        except ValueError:
+            raise SockInstError(f'Unexpected IQ settings reply: {settings}')
+
+        if out is not None and (out.dtype != np.complex64 or not out.flags.c_contiguous):
+            raise ValueError('out must be a contiguous complex64 array.')
+
+        self.write('fetch:rfin:iq? 1')
+        numBytes = self.binblock_size(debug)
+        numSamples, err = divmod(numBytes, np.dtype(np.complex64).itemsize)
+        if err != 0:
+            self.binblock_discard(numBytes)
+            raise BinblockError('IQ data is not a whole number of I/Q pairs.')
+
+        if out is None:
+            out = np.empty(numSamples, dtype=np.complex64)
+        self.binblockread_into(out, numBytes, debug)
+
+        return IQRecord(out[:numSamples], samples / seconds, centerFreq, acqStart)
 
 
 def awg_example(ipAddress, port=4000):
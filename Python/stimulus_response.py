@@ -0,0 +1,175 @@
+"""
+Stimulus-Response Acquisition
+Updated: 10/26
+Coordinates an AWG and an analyzer (RSA or DPO) so that every AWG
+trigger produces one capture tagged with the AWG state that caused
+it. Each step applies the AWG state, arms the analyzer, triggers the
+AWG sequence, waits for the capture, and fetches it. Steps are
+pipelined: once capture k is complete, the AWG is set up for step
+k + 1 on another thread while capture k is transferred.
+The analyzer must be configured to trigger on the AWG (external
+trigger, or a power/edge trigger on the stimulus) before running.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+class CoordinationError(Exception):
+    """Stimulus-Response Exception class"""
+    pass
+
+
+class Capture:
+    """One analyzer capture and the AWG state it was taken with."""
+
+    def __init__(self, step, state, data, armTime, triggerTime, doneTime):
+        self.step = step
+        self.state = state
+        self.data = data
+        self.armTime = armTime
+        self.triggerTime = triggerTime
+        self.doneTime = doneTime
+
+
+class RSACapture:
+    def __init__(self, rsa, fetchCmd='fetch:avtime:first?', dtype=np.float32,
+                 armDelay=0.01):
+        """Single-shot RSA capture through a SocketInstrument.
+
+        The RSA has no query for 'armed', so arm() waits armDelay
+        seconds after initiate before the AWG is triggered."""
+        self.inst = rsa
+        self.fetchCmd = fetchCmd
+        self.dtype = dtype
+        self.armDelay = armDelay
+        rsa.write('initiate:continuous off')
+        rsa.write('trigger:status on')
+
+    def arm(self, timeout):
+        self.inst.write('initiate:immediate')
+        time.sleep(self.armDelay)
+
+    def wait(self):
+        self.inst.query('*opc?')
+
+    def fetch(self):
+        self.inst.write(self.fetchCmd)
+        return self.inst.binblockread(dtype=self.dtype)
+
+
+class ScopeCapture:
+    def __init__(self, dpo, dtype=np.int8, poll=0.001):
+        """Single-sequence scope capture through a SocketInstrument.
+
+        arm() polls trigger:state? until the scope reports READY."""
+        self.inst = dpo
+        self.dtype = dtype
+        self.poll = poll
+        dpo.write('acquire:stopafter sequence')
+
+    def arm(self, timeout):
+        self.inst.write('acquire:state on')
+        deadline = time.time() + timeout
+        while not self.inst.query('trigger:state?').upper().startswith('READY'):
+            if time.time() > deadline:
+                raise CoordinationError('Scope did not arm.')
+            time.sleep(self.poll)
+
+    def wait(self):
+        self.inst.query('*opc?')
+
+    def fetch(self):
+        self.inst.write('curve?')
+        return self.inst.binblockread(dtype=self.dtype)
+
+
+def apply_awg_state(awg, state):
+    """Writes every header: value of state to the AWG and waits for it."""
+    for header, value in state.items():
+        awg.write(f'{header} {value}')
+    awg.query('*opc?')
+
+
+def skew_states(delays, channel=1):
+    """AWG states stepping source<channel>:skew, as in awg_sequencer_phase.py."""
+    return [{f'source{channel}:skew': d} for d in delays]
+
+
+class StimulusResponse:
+    def __init__(self, awg, analyzer, triggerCmd='trigger:immediate atrigger',
+                 applyState=apply_awg_state, armTimeout=5):
+        """awg is a connected instrument already running its sequence.
+
+        analyzer is an RSACapture, ScopeCapture, or any object with
+        arm(timeout), wait(), and fetch() methods."""
+        self.awg = awg
+        self.analyzer = analyzer
+        self.triggerCmd = triggerCmd
+        self.applyState = applyState
+        self.armTimeout = armTimeout
+
+    def run(self, states, process=None):
+        """Captures one response per AWG state and returns a list of Captures.
+
+        process, if given, is called on each fetched array on a worker
+        thread and its result stored as the capture data, so host
+        processing overlaps the next step as well."""
+        captures = []
+        # Separate workers so queued processing never delays the AWG setup.
+        with ThreadPoolExecutor(max_workers=1) as awgPool, \
+                ThreadPoolExecutor(max_workers=1) as processPool:
+            setup = awgPool.submit(self.applyState, self.awg, states[0]) if states else None
+            for step, state in enumerate(states):
+                setup.result()
+                armTime = time.time()
+                self.analyzer.arm(self.armTimeout)
+                triggerTime = time.time()
+                self.awg.write(self.triggerCmd)
+
+                self.analyzer.wait()
+                doneTime = time.time()
+
+                # The stimulus must not change until the capture is complete,
+                # but the next state can be set up while this capture transfers.
+                if step + 1 < len(states):
+                    setup = awgPool.submit(self.applyState, self.awg, states[step + 1])
+                data = self.analyzer.fetch()
+                if process is not None:
+                    data = processPool.submit(process, data)
+                captures.append(Capture(step, dict(state), data, armTime,
+                                        triggerTime, doneTime))
+        for c in captures:
+            if process is not None:
+                c.data = c.data.result()
+        return captures
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    awg = SocketInstrument('192.168.1.12', port=4000, timeout=25)
+    rsa = SocketInstrument('192.168.1.10', port=4000, timeout=10)
+    print(awg.instId)
+    print(rsa.instId)
+
+    # AWG sequence from awg_sequencer_phase.py is already loaded and running.
+    rsa.write('trigger:event:input:type external')
+    analyzer = RSACapture(rsa, fetchCmd='fetch:avtime:first?')
+    delays = ['100ps', '80ps', '60ps', '40ps', '20ps', '0ps',
+              '-20ps', '-40ps', '-60ps', '-80ps', '-100ps']
+
+    coordinator = StimulusResponse(awg, analyzer)
+    captures = coordinator.run(skew_states(delays), process=np.max)
+    for c in captures:
+        print(c.step, c.state['source1:skew'], c.data)
+
+    awg.disconnect()
+    rsa.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Parameter Sweep Engine
+Updated: 10/26
+Sweeps any settable SCPI parameters over an N-dimensional grid and
+stores one measurement per grid point in a preallocated NumPy array
+indexed by the sweep axes (results[i, j, ...] for axes[0].values[i],
+axes[1].values[j], ...).
+To keep round trips to a minimum the grid is walked in serpentine
+order so usually only the innermost axis changes, and all changed
+settings are sent as one program message without waiting for a reply:
+the instrument executes commands in order, so the settings are queued
+ahead of the measurement's own trigger and *opc?, and only axes with a
+settle time cost an extra *opc? round trip. Processing of point k runs
+on a worker thread while point k + 1 is set up and acquired. The
+instrument itself still acquires and returns one point at a time.
+With a stateFile the results are kept in memory-mapped .npy files
+together with a mask of finished points, so an interrupted overnight
+sweep picks up where it stopped. refine() adds points between
+neighbours whose results differ by more than a threshold.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+class SweepError(Exception):
+    """Sweep Engine Exception class"""
+    pass
+
+
+class SweepAxis:
+    def __init__(self, header, values, settle=0.0, fmt='{}'):
+        """One swept setting.
+
+        header is the SCPI command, e.g. 'spectrum:frequency:center'.
+        settle is the time in seconds to wait after changing it, and
+        fmt formats each value into the command argument."""
+        self.header = header
+        self.values = np.asarray(values)
+        self.settle = settle
+        self.fmt = fmt
+
+    def __len__(self):
+        return len(self.values)
+
+    def command(self, i):
+        return f'{self.header} {self.fmt.format(self.values[i])}'
+
+
+def serpentine(shape):
+    """Yields every index of shape, reversing inner axes on alternate passes.
+
+    Consecutive indices differ in as few (and as inner) axes as possible."""
+    if not shape:
+        yield ()
+        return
+    reverse = False
+    for i in range(shape[0]):
+        inner = list(serpentine(shape[1:]))
+        for rest in (reversed(inner) if reverse else inner):
+            yield (i,) + rest
+        if len(shape) > 1:
+            reverse = not reverse
+
+
+def _state_files(stateFile):
+    return stateFile + '.npy', stateFile + '.done.npy', stateFile + '.axes.json'
+
+
+class Sweep:
+    def __init__(self, inst, axes, measure, pointShape=(), dtype=np.float32,
+                 process=None, stateFile=None, checkpoint=100):
+        """Sweep of axes on inst.
+
+        measure(inst) triggers and fetches one measurement, e.g.
+        procedures.peak_marker. process(data), if given, reduces it on a
+        worker thread. The stored value of each point must have shape
+        pointShape and be castable to dtype. Unfinished points are NaN
+        for floating point dtypes. With a stateFile, the memory maps are
+        flushed every checkpoint points and at the end of run()."""
+        self.inst = inst
+        self.axes = list(axes)
+        self.measure = measure
+        self.process = process
+        self.checkpoint = checkpoint
+        self.stateFile = stateFile
+        self.shape = tuple(len(a) for a in self.axes)
+        fullShape = self.shape + tuple(pointShape)
+        dtype = np.dtype(dtype)
+
+        if stateFile is not None:
+            resultsFile, doneFile, axesFile = _state_files(stateFile)
+            if os.path.exists(resultsFile):
+                self._check_axes(axesFile)
+                self.results = open_memmap(resultsFile, mode='r+')
+                self.done = open_memmap(doneFile, mode='r+')
+                if self.results.shape != fullShape or self.results.dtype != dtype:
+                    raise SweepError(f'{resultsFile} holds a different sweep.')
+            else:
+                self.results = open_memmap(resultsFile, mode='w+', dtype=dtype,
+                                           shape=fullShape)
+                self.done = open_memmap(doneFile, mode='w+', dtype=np.bool_,
+                                        shape=self.shape)
+                self._save_axes(axesFile)
+        else:
+            self.results = np.empty(fullShape, dtype=dtype)
+            self.done = np.zeros(self.shape, dtype=np.bool_)
+        if dtype.kind in 'fc' and not self.done.any():
+            self.results[...] = np.nan
+        self.timing = {'set': 0.0, 'acquire': 0.0, 'points': 0}
+
+    def _axes_description(self):
+        return [{'header': a.header, 'values': a.values.tolist()} for a in self.axes]
+
+    def _save_axes(self, axesFile):
+        with open(axesFile, 'w') as f:
+            json.dump(self._axes_description(), f)
+
+    def _check_axes(self, axesFile):
+        with open(axesFile) as f:
+            saved = json.load(f)
+        if saved != json.loads(json.dumps(self._axes_description())):
+            raise SweepError(f'{axesFile} was saved for different sweep axes.')
+
+    def coordinates(self, index):
+        """Returns {header: value} for a grid index."""
+        return {a.header: a.values[i] for a, i in zip(self.axes, index)}
+
+    def _set(self, index, previous):
+        """Sends the settings that differ from previous in one message.
+
+        Only waits for the instrument when a changed axis has to settle;
+        otherwise the measurement's own *opc? covers the settings."""
+        changed = [n for n, i in enumerate(index) if previous is None or previous[n] != i]
+        if not changed:
+            return
+        self.inst.write(';:'.join(self.axes[n].command(index[n]) for n in changed))
+        settle = max(self.axes[n].settle for n in changed)
+        if settle:
+            self.inst.query('*opc?')
+            time.sleep(settle)
+
+    def _store(self, index, data):
+        self.results[index] = data
+        self.done[index] = True
+
+    def flush(self):
+        if isinstance(self.results, np.memmap):
+            self.results.flush()
+            self.done.flush()
+
+    def run(self, maxPoints=None):
+        """Measures every unfinished grid point (at most maxPoints of them).
+
+        Returns the number of points measured. Safe to interrupt: the
+        next run() with the same stateFile continues from the last
+        checkpoint."""
+        pending = [i for i in serpentine(self.shape) if not self.done[i]]
+        if maxPoints is not None:
+            pending = pending[:maxPoints]
+        previous = None
+        futures = []
+        try:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                for count, index in enumerate(pending, 1):
+                    start = time.perf_counter()
+                    self._set(index, previous)
+                    previous = index
+                    setTime = time.perf_counter()
+                    data = self.measure(self.inst)
+                    self.timing['set'] += setTime - start
+                    self.timing['acquire'] += time.perf_counter() - setTime
+                    self.timing['points'] += 1
+                    if self.process is None:
+                        self._store(index, data)
+                    else:
+                        futures.append(pool.submit(
+                            lambda i, d: self._store(i, self.process(d)), index, data))
+                    if count % self.checkpoint == 0:
+                        for f in futures:
+                            f.result()
+                        futures = []
+                        self.flush()
+                for f in futures:
+                    f.result()
+        finally:
+            self.flush()
+        return len(pending)
+
+    def refine(self, axis, threshold, maxNew=None, reduce=np.nanmax, element=None):
+        """Returns a new Sweep with points added halfway along axis.
+
+        A midpoint is added between neighbouring values of axis wherever
+        the results of the two neighbours differ by more than threshold
+        (reduced over the other axes and the point shape with reduce).
+        element selects part of each point to compare, e.g. 1 for the
+        amplitude of [frequency, amplitude] points, so the threshold is
+        only applied to values in its own unit.
+        The new Sweep already holds every measured result, so its run()
+        only measures the added points. It uses stateFile + '.refined'
+        when this sweep has a stateFile."""
+        ax = self.axes[axis]
+        if len(ax) < 2:
+            return self
+        results = self.results if element is None else self.results[(Ellipsis, element)]
+        diff = np.abs(np.diff(results, axis=axis)).astype(np.float64)
+        others = tuple(n for n in range(diff.ndim) if n != axis)
+        score = reduce(diff, axis=others) if others else diff
+        candidates = np.flatnonzero(score > threshold)
+        if maxNew is not None:
+            candidates = candidates[np.argsort(score[candidates])[::-1][:maxNew]]
+            candidates.sort()
+        if not len(candidates):
+            return self
+
+        mids = (ax.values[candidates] + ax.values[candidates + 1]) / 2
+        values = np.insert(ax.values.astype(mids.dtype), candidates + 1, mids)
+        oldPositions = np.arange(len(ax)) + np.searchsorted(candidates, np.arange(len(ax)))
+        axes = list(self.axes)
+        axes[axis] = SweepAxis(ax.header, values, ax.settle, ax.fmt)
+
+        stateFile = None if self.stateFile is None else self.stateFile + '.refined'
+        refined = Sweep(self.inst, axes, self.measure, self.results.shape[len(self.shape):],
+                        self.results.dtype, self.process, stateFile, self.checkpoint)
+        select = [slice(None)] * len(self.shape)
+        select[axis] = oldPositions
+        refined.results[tuple(select)] = self.results
+        refined.done[tuple(select)] = self.done
+        refined.flush()
+        return refined
+
+
+def main():
+    from socket_instrument import SocketInstrument
+    from procedures import peak_marker
+
+    rsa = SocketInstrument('127.0.0.1', port=4000, timeout=10)
+    rsa.write('*rst')
+    rsa.write('abort')
+    rsa.write('spectrum:frequency:span 40e6')
+    rsa.write('trigger:status off')
+    rsa.write('initiate:continuous off')
+    rsa.write('calculate:marker:add')
+
+    axes = [SweepAxis('input:rlevel', [-20, -10, 0]),
+            SweepAxis('spectrum:frequency:center', np.linspace(1e9, 3e9, 21), settle=0.01)]
+    sweep = Sweep(rsa, axes, peak_marker, pointShape=(2,), dtype=np.float64,
+                  stateFile='peak_sweep')
+    print('Measured', sweep.run(), 'points')
+
+    # Fill in frequencies where the peak amplitude changes by more than 3 dB.
+    refined = sweep.refine(1, threshold=3, element=1)
+    print('Measured', refined.run(), 'more points')
+    print(refined.results[..., 1])
+    rsa.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decimation import MinMaxPyramid
+
+
+def test_mid_size_window_renders_at_pixel_width():
+    # 10,000 samples at 1000 px is between 2 * pixels and base * pixels.
+    data = np.sin(np.arange(100000) / 50.0)
+    pyramid = MinMaxPyramid(data, base=64)
+    x, ymin, ymax = pyramid.render(20000, 30000, pixels=1000)
+    assert len(x) == len(ymin) == len(ymax) == 1000
+    assert x[0] == 20000
+    window = data[20000:30000]
+    assert ymin.min() == window.min() and ymax.max() == window.max()
+
+
+def test_glitch_is_kept_in_every_window():
+    data = np.zeros(1 << 20)
+    data[654321] = 5.0
+    pyramid = MinMaxPyramid(data)
+    for start, stop in [(0, len(data)), (600000, 700000), (650000, 660000)]:
+        x, ymin, ymax = pyramid.render(start, stop, pixels=800)
+        assert len(x) <= 800
+        assert ymax.max() == 5.0
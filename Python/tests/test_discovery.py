@@ -0,0 +1,87 @@
+import os
+import socket
+import sys
+import threading
+import time
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import discovery
+
+IDN = b'TEKTRONIX,RSA507A,B012345,1.0\n'
+
+
+def _close(conn):
+    conn.close()
+
+
+def _stream(conn):
+    # Endless data without a newline.
+    try:
+        while True:
+            conn.sendall(b'x' * 4096)
+    except OSError:
+        pass
+
+
+def _instrument(conn):
+    with conn, conn.makefile('rb') as f:
+        for line in f:
+            conn.sendall(IDN if line.strip() == b'*idn?' else b'"B40,0"\n')
+
+
+@pytest.fixture
+def listen():
+    servers = []
+
+    def start(handler):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(5)
+        servers.append(server)
+
+        def accept():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                threading.Thread(target=handler, args=(conn,), daemon=True).start()
+        threading.Thread(target=accept, daemon=True).start()
+        return server.getsockname()[1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.mark.parametrize('handler', [_close, _stream])
+def test_probe_gives_up_on_non_instruments(listen, handler):
+    port = listen(handler)
+    start = time.perf_counter()
+    assert discovery.probe('127.0.0.1', port, timeout=1) is None
+    assert time.perf_counter() - start < 1
+
+
+def test_discover_finds_only_the_instrument(listen):
+    ports = (listen(_close), listen(_stream), listen(_instrument))
+    start = time.perf_counter()
+    found = discovery.discover(['127.0.0.1'], ports=ports, timeout=1)
+    assert time.perf_counter() - start < 2
+    assert len(found) == 1
+    assert (found[0]['model'], found[0]['serial']) == ('RSA507A', 'B012345')
+    assert found[0]['ports'] == [ports[2]] and found[0]['options'] == ['B40']
+
+
+def test_connect_refreshes_a_stale_address(listen, tmp_path):
+    stale, live = listen(_close), listen(_instrument)
+    inventory = discovery.Inventory(str(tmp_path / 'inventory.json'), targets=['127.0.0.1'],
+                                    ports=(live,), timeout=1)
+    inventory.records = [{'host': '127.0.0.1', 'port': stale, 'ports': [stale],
+                          'model': 'RSA507A', 'serial': 'B012345', 'options': []}]
+    inventory.updated = time.time()
+    inst = inventory.connect(model='RSA5', timeout=1)
+    try:
+        assert inst.instId.startswith('TEKTRONIX,RSA507A')
+        assert inventory.records[0]['ports'] == [live]
+    finally:
+        inst.disconnect()
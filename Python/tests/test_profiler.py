@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiler import Profiler, profile_instrument
+
+
+class FakeResource:
+    """PyVISA-like resource whose query() calls write() and read()."""
+
+    def write(self, message):
+        return len(message)
+
+    def read(self):
+        return '1'
+
+    def query(self, message):
+        self.write(message)
+        return self.read()
+
+
+def profiled():
+    prof = Profiler(traceMemory=False)
+    inst = profile_instrument(FakeResource(), prof, name='fake')
+    with prof.span('ACQUIRE'):
+        inst.query('*opc?')
+    return prof, {s.name: s for s in prof.spans}
+
+
+def test_nested_calls_are_counted_once():
+    prof, spans = profiled()
+    query = spans['query']
+    assert (query.bytesSent, query.bytesReceived) == (5, 1)
+    assert (spans['write'].bytesSent, spans['read'].bytesReceived) == (5, 1)
+    phase = spans['ACQUIRE']
+    assert (phase.bytesSent, phase.bytesReceived) == (5, 1)
+
+
+def test_spans_nest():
+    prof, spans = profiled()
+    phase, query = spans['ACQUIRE'], spans['query']
+    for inner, outer in [(spans['write'], query), (spans['read'], query), (query, phase)]:
+        assert outer.start <= inner.start <= inner.stop <= outer.stop
+    assert [s.name for s in prof.spans] == ['write', 'read', 'query', 'ACQUIRE']
+
+
+def test_chrome_trace_events():
+    prof, spans = profiled()
+    trace = json.loads(json.dumps(prof.chrome_trace()))
+    events = trace['traceEvents']
+    assert [e['name'] for e in events] == ['ACQUIRE', 'query', 'write', 'read']
+    for e in events:
+        assert e['ph'] == 'X'
+        assert e['pid'] == os.getpid() and e['tid'] == 0
+        assert e['ts'] >= 0 and e['dur'] >= 0
+    query = events[1]
+    assert query['cat'] == 'instrument'
+    assert query['args'] == {'instrument': 'fake', 'cmd': '*opc?', 'bytesSent': 5,
+                             'bytesReceived': 1}
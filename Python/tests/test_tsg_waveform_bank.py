@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tsg_waveform_bank import TSGWaveformBank
+
+
+class FakeTSG:
+    def __init__(self):
+        self.commands = []
+
+    def write(self, cmd):
+        self.commands.append(cmd)
+
+    def binblockwrite(self, cmd, data, check=True):
+        self.commands.append(cmd)
+
+
+class SlotBank(TSGWaveformBank):
+    writeCmd = 'wrtw {slot}, {length}, '
+
+
+def tone(freq, length=600):
+    return np.exp(2j * np.pi * freq * np.arange(length) / 6e6).astype(np.complex64)
+
+
+def test_reloading_a_stored_waveform_only_selects_it():
+    tsg = FakeTSG()
+    bank = SlotBank(tsg, slots=(0, 1))
+    a, b = tone(10e3), tone(20e3)
+    assert bank.load(a) == 0
+    assert bank.load(b) == 1
+    del tsg.commands[:]
+    assert bank.load(a) == 0
+    assert tsg.commands == ['wavf 0']
+    assert bank.stats['writes'] == 2 and bank.stats['hits'] == 1
+
+
+def test_overwritten_slot_is_rewritten():
+    tsg = FakeTSG()
+    bank = SlotBank(tsg, slots=(0, 1))
+    for freq in (10e3, 20e3, 30e3):
+        bank.load(tone(freq))
+    # 10 kHz was least recently used, so slot 0 now holds 30 kHz.
+    del tsg.commands[:]
+    assert bank.load(tone(10e3)) == 1
+    assert tsg.commands == ['wrtw 1, 19200, ', 'wavf 1']
+
+
+def test_several_slots_need_a_slot_in_the_write_command():
+    with pytest.raises(ValueError):
+        TSGWaveformBank(FakeTSG(), slots=(0, 1))
+    TSGWaveformBank(FakeTSG(), slots=(0,))
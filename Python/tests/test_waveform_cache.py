@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+from waveform_cache import WaveformCache, cache_key
+from waveform_synth import Tone, Pulse
+
+KEY_SCRIPT = ("from waveform_cache import cache_key; from waveform_synth import Tone, Pulse; "
+              "print(cache_key({'signal': Tone(1e9) * Pulse(10e-6, 100e-6), 'length': 1000}))")
+
+
+def test_signal_keys_are_stable_across_processes():
+    key = cache_key({'signal': Tone(1e9) * Pulse(10e-6, 100e-6), 'length': 1000})
+    other = subprocess.check_output([sys.executable, '-c', KEY_SCRIPT], cwd=HERE)
+    assert other.decode().strip() == key
+    assert key != cache_key({'signal': Tone(2e9) * Pulse(10e-6, 100e-6), 'length': 1000})
+
+
+def test_objects_without_parameters_are_rejected():
+    with pytest.raises(TypeError):
+        cache_key({'signal': object()})
+
+
+def test_get_counts_hits_and_misses(tmp_path):
+    cache = WaveformCache(str(tmp_path))
+    params = {'kind': 'ramp', 'length': 100}
+    assert cache.get(params) is None
+    cache.get_or_create(params, lambda: np.arange(100, dtype=np.float32))
+    assert np.array_equal(cache.get(params), np.arange(100))
+    assert cache.stats == {'hits': 1, 'misses': 2, 'evictions': 0}
@@ -0,0 +1,201 @@
+"""
+TSG Waveform Bank
+Updated: 10/26
+Manages user IQ waveforms on the TSG's vector modulator.
+Float I/Q data is packed into the TSG's big-endian, interleaved int16
+format in one pass (scaling, rounding, saturating, and byte swapping
+straight into the transmit buffer), so nothing is byte-swapped again
+on send.
+The bank remembers which waveform content is loaded in which slot by
+hash. Loading a waveform that's already in a slot just selects it
+with wavf instead of sending the data again.
+See TSG/tsg_iq_data_sender.py for the single-waveform version.
+Python 3.6.4 64-bit
+NumPy 1.13.1
+"""
+
+import hashlib
+import numpy as np
+
+
+# Big-endian int16, interleaved I, Q.
+IQ_DTYPE = np.dtype('>i2')
+FULL_SCALE = 32767
+
+
+class TSGError(Exception):
+    """TSG Waveform Bank Exception class"""
+    pass
+
+
+def pack_iq(i, q=None, scale=1.0, out=None, chunkSize=1 << 20):
+    """Packs float I/Q into a big-endian interleaved int16 buffer.
+
+    i is complex (I + jQ) if q is None, otherwise i and q are real
+    arrays. Values are multiplied by scale * 32767, rounded, and
+    saturated to the int16 range. Work is done in chunkSize pieces so
+    temporary memory stays small. Returns out, shaped (numSamples, 2)."""
+    if q is None:
+        iq = np.asarray(i)
+        if not np.iscomplexobj(iq):
+            raise TSGError('Pass complex IQ, or separate I and Q arrays.')
+        # complex64/128 is already interleaved I, Q in memory.
+        floats = iq.view(iq.real.dtype).reshape(-1, 2) if iq.flags.c_contiguous else \
+            np.stack((iq.real, iq.imag), axis=-1)
+    else:
+        i, q = np.asarray(i), np.asarray(q)
+        if i.shape != q.shape:
+            raise TSGError('I and Q must be the same length.')
+        floats = None
+    numSamples = len(i) if q is not None else len(iq)
+    if out is None:
+        out = np.empty((numSamples, 2), dtype=IQ_DTYPE)
+    elif out.dtype != IQ_DTYPE or out.shape != (numSamples, 2):
+        raise TSGError(f'out must be {IQ_DTYPE} with shape {(numSamples, 2)}.')
+
+    gain = scale * FULL_SCALE
+    work = np.empty((min(chunkSize, numSamples), 2), dtype=np.float64)
+    for start in range(0, numSamples, chunkSize):
+        stop = min(start + chunkSize, numSamples)
+        w = work[:stop - start]
+        if floats is not None:
+            w[:] = floats[start:stop]
+        else:
+            w[:, 0] = i[start:stop]
+            w[:, 1] = q[start:stop]
+        w *= gain
+        np.rint(w, out=w)
+        np.clip(w, -FULL_SCALE - 1, FULL_SCALE, out=w)
+        # Converts to int16 and swaps to big-endian in the same copy.
+        out[start:stop] = w
+    return out
+
+
+def iq_hash(packed):
+    """Content hash of a packed waveform."""
+    return hashlib.sha1(memoryview(np.ascontiguousarray(packed)).cast('B')).hexdigest()
+
+
+class TSGWaveformBank:
+    # Command templates, as in tsg_iq_data_sender.py: the user waveform is
+    # written with 'wrtw 2, {length}, ' ({length} is 16 x number of int16
+    # values) and selected with 'wavf {slot}'. That write doesn't name a
+    # slot, so it only supports a single slot; to use several, override
+    # writeCmd with a {slot} field that targets the location written.
+    writeCmd = 'wrtw 2, {length}, '
+    selectCmd = 'wavf {slot}'
+
+    def __init__(self, tsg, slots=(0,)):
+        """Waveform bank on a connected TSG.
+
+        tsg is a SocketInstrument or PyVISA resource. slots are the
+        waveform locations the bank may write; when they're all in use
+        the least recently used one is overwritten. More than one slot
+        needs a writeCmd with a {slot} field."""
+        if len(slots) > 1 and '{slot}' not in self.writeCmd:
+            raise ValueError(f'writeCmd {self.writeCmd!r} does not name a slot, '
+                             'so only one slot can be used.')
+        self.tsg = tsg
+        self.slots = list(slots)
+        self.contents = {}
+        self.lastUsed = {}
+        self.active = None
+        self._clock = 0
+        self.stats = {'writes': 0, 'switches': 0, 'hits': 0, 'bytesSent': 0}
+
+    def _send(self, slot, packed):
+        cmd = self.writeCmd.format(slot=slot, length=packed.size * 16)
+        data = packed.reshape(-1).view(np.uint8)
+        if hasattr(self.tsg, 'binblockwrite'):
+            self.tsg.binblockwrite(cmd, data, check=False)
+        else:
+            # Bytes are already big-endian; send them as-is.
+            self.tsg.write_binary_values(cmd, data, datatype='B')
+        self.stats['writes'] += 1
+        self.stats['bytesSent'] += data.nbytes
+
+    def _choose_slot(self):
+        free = [s for s in self.slots if s not in self.contents]
+        if free:
+            return free[0]
+        return min(self.slots, key=lambda s: self.lastUsed.get(s, -1))
+
+    def find(self, digest):
+        """Returns the slot holding the waveform with this hash, or None."""
+        for slot, d in self.contents.items():
+            if d == digest:
+                return slot
+        return None
+
+    def load(self, i, q=None, scale=1.0):
+        """Makes the waveform the active TSG waveform and returns its slot.
+
+        Float input is packed with pack_iq(); an already packed
+        (numSamples, 2) big-endian int16 array is used as is. Data is
+        only sent if no slot holds the same content."""
+        packed = i if q is None and getattr(i, 'dtype', None) == IQ_DTYPE \
+            else pack_iq(i, q, scale)
+        digest = iq_hash(packed)
+        slot = self.find(digest)
+        if slot is None:
+            slot = self._choose_slot()
+            self._send(slot, packed)
+            self.contents[slot] = digest
+            # Writing the active slot changes what is playing; reselect it.
+            if slot == self.active:
+                self.active = None
+        else:
+            self.stats['hits'] += 1
+        if slot != self.active:
+            self.tsg.write(self.selectCmd.format(slot=slot))
+            self.active = slot
+            self.stats['switches'] += 1
+        self._clock += 1
+        self.lastUsed[slot] = self._clock
+        return slot
+
+    def forget(self, slot=None):
+        """Forgets slot contents (all slots if slot is None), e.g. after *rst."""
+        if slot is None:
+            self.contents.clear()
+            self.lastUsed.clear()
+            self.active = None
+        else:
+            self.contents.pop(slot, None)
+            self.lastUsed.pop(slot, None)
+            if slot == self.active:
+                self.active = None
+
+
+def main():
+    import visa
+
+    rm = visa.ResourceManager()
+    tsg = rm.open_resource('TCPIP0::192.168.1.12::INSTR')
+    tsg.write('*RST')
+    print('Connected to {}'.format(tsg.query('*idn?')))
+
+    sampleRate = 6e6
+    recordLength = 600
+    t = np.arange(recordLength) / sampleRate
+
+    tsg.write('ampr 0')
+    tsg.write('freq 1 GHz')
+    tsg.write('type 2')
+    tsg.write('styp 1')
+    tsg.write('qfnc 11')
+    tsg.write('symr {}'.format(sampleRate))
+
+    bank = TSGWaveformBank(tsg)
+    # Reloading a waveform that is already in the slot doesn't resend it.
+    for freq in (10e3, 10e3, 20e3, 20e3):
+        bank.load(np.exp(2j * np.pi * freq * t).astype(np.complex64), scale=0.9)
+    print(bank.stats)
+
+    tsg.write('modl 1')
+    tsg.write('enbr 1')
+    tsg.close()
+
+
+if __name__ == '__main__':
+    main()
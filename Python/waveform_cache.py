@@ -0,0 +1,212 @@
+"""
+Waveform Cache
+Updated: 10/26
+Host-side cache of generated AWG/TSG waveforms and marker data.
+Each array is stored as a .npy file named by a hash of the parameters
+that generated it and is returned as a read-only memory map, so
+uploads (SocketInstrument.wfm_writer, binblockwrite) send straight
+from the page cache without copying the data into the process.
+Entries are written to a temporary file and renamed into place, so
+several processes can share a cache directory and never see a partly
+written entry. The cache is kept under maxBytes by deleting the least
+recently used entries.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+class CacheError(Exception):
+    """Waveform Cache Exception class"""
+    pass
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'cache_params'):
+        return {type(value).__name__: value.cache_params()}
+    # repr() of most objects includes their address, which would change the key every run.
+    raise TypeError(f'Cannot build a cache key from {type(value).__name__}; '
+                    'give it a cache_params() method or pass its parameters.')
+
+
+def cache_key(params):
+    """Hash of the generation parameters.
+
+    params is a JSON-able dict. NumPy arrays are hashed by content and
+    other objects (e.g. waveform_synth signals) by their cache_params()
+    dict; anything else raises TypeError."""
+    text = json.dumps(params, sort_keys=True, default=_default)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class WaveformCache:
+    suffix = '.npy'
+
+    def __init__(self, directory, maxBytes=8 << 30):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        os.makedirs(directory, exist_ok=True)
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _open(self, fileName):
+        data = np.load(fileName, mmap_mode='r')
+        # Use time is the file's mtime; atime is often disabled.
+        try:
+            os.utime(fileName)
+        except OSError:
+            pass
+        return data
+
+    def get(self, params):
+        """Returns the cached array for params as a read-only memory map, or None."""
+        fileName = self.path(cache_key(params))
+        try:
+            data = self._open(fileName)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return data
+
+    def put(self, params, data=None, shape=None, dtype=np.float32, fill=None):
+        """Stores an array for params and returns it as a read-only memory map.
+
+        Either pass data, or shape and dtype plus fill(out), which writes
+        into a writable memory map of that shape. With fill the array is
+        never in RAM, e.g. fill=lambda out: waveform_synth.to_array(sig,
+        len(out), fs, out=out) for waveforms larger than memory."""
+        key = cache_key(params)
+        fileName = self.path(key)
+        tmpName = os.path.join(self.directory, f'{key}.{os.getpid()}.{uuid.uuid4().hex}.tmp')
+        try:
+            if data is not None:
+                with open(tmpName, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(data), allow_pickle=False)
+            elif shape is not None and fill is not None:
+                out = open_memmap(tmpName, mode='w+', dtype=dtype, shape=shape)
+                fill(out)
+                out.flush()
+                del out
+            else:
+                raise CacheError('put() needs data, or shape and fill.')
+            os.replace(tmpName, fileName)
+        finally:
+            if os.path.exists(tmpName):
+                os.remove(tmpName)
+        self.evict(keep=fileName)
+        return self._open(fileName)
+
+    def get_or_create(self, params, generate=None, shape=None, dtype=np.float32, fill=None):
+        """Returns the cached array for params, generating it on a miss.
+
+        generate() returns the array, or use shape, dtype, and fill as
+        in put(). If two processes miss at the same time both generate
+        and the last one to finish wins; the contents are the same."""
+        data = self.get(params)
+        if data is not None:
+            return data
+        if generate is not None:
+            return self.put(params, generate())
+        return self.put(params, shape=shape, dtype=dtype, fill=fill)
+
+    def entries(self):
+        """Returns [(mtime, size, fileName)] of all entries, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            fileName = os.path.join(self.directory, name)
+            try:
+                st = os.stat(fileName)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fileName))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, maxBytes=None, keep=None):
+        """Deletes least recently used entries until the cache fits in maxBytes.
+
+        The entry keep (a file name) is never deleted."""
+        maxBytes = self.maxBytes if maxBytes is None else maxBytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, fileName in entries:
+            if total <= maxBytes:
+                break
+            if fileName == keep:
+                continue
+            try:
+                os.remove(fileName)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Memory-mapped by another process on Windows; try the next one.
+                continue
+            total -= size
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        self.evict(0)
+
+
+def upload_waveform(awg, cache, name, params, generate=None, shape=None, fill=None):
+    """Creates waveform name on the AWG from the cache (generating it if needed).
+
+    The float32 data is sent to the AWG straight from the memory map."""
+    data = cache.get_or_create(params, generate, shape, np.float32, fill)
+    awg.write(f'wlist:waveform:new "{name}", {len(data)}')
+    awg.wfm_writer(name, data)
+    return data
+
+
+def upload_markers(awg, cache, name, params, generate=None, shape=None, fill=None):
+    """Sends cached uint8 marker data for waveform name."""
+    data = cache.get_or_create(params, generate, shape, np.uint8, fill)
+    awg.binblockwrite(f'wlist:waveform:marker:data "{name}", 0, {len(data)}, ', data)
+    return data
+
+
+def main():
+    from socket_instrument import SocketInstrument
+    from waveform_synth import Tone, Pulse, to_array
+    from awg_markers import MarkerPattern
+
+    sampleRate = 25e9
+    length = 500000000
+    cache = WaveformCache('wfm_cache', maxBytes=20 << 30)
+    wfmParams = {'kind': 'pulsed tone', 'freq': 1e9, 'width': 10e-6, 'period': 100e-6,
+                 'sampleRate': sampleRate, 'length': length}
+    signal = Tone(wfmParams['freq']) * Pulse(wfmParams['width'], wfmParams['period'])
+    bits = [0, 1, 1, 0, 1, 0, 0, 1]
+    markerParams = {'kind': 'markers', 'bits': bits, 'sampPerSym': 2500, 'length': length}
+
+    awg = SocketInstrument('192.168.1.12', port=4001, timeout=60)
+    print(awg.instId)
+    awg.write('wlist:waveform:delete all')
+    upload_waveform(awg, cache, 'pulsed', wfmParams, shape=(length,),
+                    fill=lambda out: to_array(signal, length, sampleRate, out=out))
+    upload_markers(awg, cache, 'pulsed', markerParams, shape=(length,),
+                   fill=MarkerPattern.from_levels(2500, bits).fill)
+    print(cache.stats)
+    print(awg.query('system:error:all?'))
+    awg.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Lazy Waveform Synthesis
+Updated: 10/26
+Describes AWG waveforms as lazy signal objects (tones, multitones,
+chirps, pulses, noise, and their sums, products, and scalings) that
+are only evaluated chunk by chunk, so a waveform filling the AWG70k's
+full memory can be generated and uploaded in bounded RAM.
+Every signal is a function of the absolute sample index, so chunks
+are phase continuous and the output for any chunk size is equal to
+within float32 rounding.
+Arithmetic is done in float64 per chunk and stored as float32, the
+AWG's native format.
+Python 3.6.3 64-bit
+NumPy 1.13.3
+"""
+
+import abc
+import numpy as np
+
+
+class SynthError(Exception):
+    """Waveform Synthesis Exception class"""
+    pass
+
+
+def _as_signal(x):
+    return x if isinstance(x, Signal) else Constant(x)
+
+
+class Signal(abc.ABC):
+    """Abstract base class. Subclasses implement render(start, out, sampleRate)."""
+
+    @abc.abstractmethod
+    def render(self, start, out, sampleRate):
+        """Writes samples start to start + len(out) into float64 array out."""
+
+    def cache_params(self):
+        """Parameters that define the signal, e.g. for waveform_cache keys."""
+        return dict(vars(self))
+
+    def __add__(self, other):
+        return Sum(self, _as_signal(other))
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        return Product(self, _as_signal(other))
+
+    __rmul__ = __mul__
+
+    def __sub__(self, other):
+        return Sum(self, Product(_as_signal(other), Constant(-1)))
+
+    def __neg__(self):
+        return Product(self, Constant(-1))
+
+
+def _cycles(start, length, cyclesPerSample, phase=0.0):
+    """Phase in cycles of samples start to start + length.
+
+    The integer part of start * cyclesPerSample is removed before
+    building the ramp, so precision doesn't degrade deep into long
+    waveforms."""
+    first = (start * cyclesPerSample + phase) % 1.0
+    return first + np.arange(length, dtype=np.float64) * cyclesPerSample
+
+
+class Constant(Signal):
+    def __init__(self, value):
+        self.value = float(value)
+
+    def render(self, start, out, sampleRate):
+        out[:] = self.value
+        return out
+
+
+class Tone(Signal):
+    def __init__(self, freq, amplitude=1.0, phase=0.0):
+        """Sine wave; phase is in degrees."""
+        self.freq = freq
+        self.amplitude = amplitude
+        self.phase = phase
+
+    def render(self, start, out, sampleRate):
+        cycles = _cycles(start, len(out), self.freq / sampleRate, self.phase / 360)
+        np.sin(2 * np.pi * cycles, out=out)
+        out *= self.amplitude
+        return out
+
+
+class Multitone(Signal):
+    def __init__(self, freqs, amplitudes=None, phases=None):
+        """Sum of tones. amplitudes default to 1 / number of tones and
+        phases (degrees) to the Newman phases for a low crest factor."""
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        numTones = len(self.freqs)
+        if amplitudes is None:
+            amplitudes = np.full(numTones, 1 / numTones)
+        if phases is None:
+            k = np.arange(numTones)
+            phases = 180 * k ** 2 / numTones
+        self.tones = [Tone(f, a, p) for f, a, p in zip(self.freqs, amplitudes, phases)]
+
+    def render(self, start, out, sampleRate):
+        out[:] = 0
+        scratch = np.empty_like(out)
+        for tone in self.tones:
+            out += tone.render(start, scratch, sampleRate)
+        return out
+
+
+class Chirp(Signal):
+    def __init__(self, startFreq, stopFreq, duration, amplitude=1.0, phase=0.0):
+        """Linear frequency sweep from startFreq to stopFreq over duration
+        seconds, repeating every duration."""
+        self.startFreq = startFreq
+        self.stopFreq = stopFreq
+        self.duration = duration
+        self.amplitude = amplitude
+        self.phase = phase
+
+    def render(self, start, out, sampleRate):
+        period = self.duration * sampleRate
+        n = np.arange(start, start + len(out), dtype=np.float64) % period
+        rate = (self.stopFreq - self.startFreq) / self.duration
+        t = n / sampleRate
+        cycles = (self.startFreq * t + rate / 2 * t * t + self.phase / 360) % 1.0
+        np.sin(2 * np.pi * cycles, out=out)
+        out *= self.amplitude
+        return out
+
+
+class Pulse(Signal):
+    def __init__(self, width, period, delay=0.0, high=1.0, low=0.0):
+        """Rectangular pulse train; width, period, and delay in seconds."""
+        if not 0 < width <= period:
+            raise SynthError('Pulse width must be positive and no longer than the period.')
+        self.width = width
+        self.period = period
+        self.delay = delay
+        self.high = high
+        self.low = low
+
+    def render(self, start, out, sampleRate):
+        t = (np.arange(start, start + len(out), dtype=np.float64) / sampleRate
+             - self.delay) % self.period
+        out[:] = np.where(t < self.width, self.high, self.low)
+        return out
+
+
+class Noise(Signal):
+    # Noise is generated in fixed blocks seeded by (seed, block number),
+    # so it doesn't depend on how the waveform is chunked.
+    blockSize = 1 << 16
+
+    def __init__(self, rms=0.1, seed=0):
+        """Gaussian white noise."""
+        self.rms = rms
+        self.seed = seed
+
+    def render(self, start, out, sampleRate):
+        stop = start + len(out)
+        firstBlock = start // self.blockSize
+        lastBlock = (stop - 1) // self.blockSize
+        for block in range(firstBlock, lastBlock + 1):
+            blockStart = block * self.blockSize
+            values = np.random.RandomState([self.seed, block]).standard_normal(self.blockSize)
+            lo = max(start, blockStart)
+            hi = min(stop, blockStart + self.blockSize)
+            out[lo - start:hi - start] = values[lo - blockStart:hi - blockStart]
+        out *= self.rms
+        return out
+
+
+class Sum(Signal):
+    def __init__(self, *signals):
+        self.signals = [_as_signal(s) for s in signals]
+
+    def render(self, start, out, sampleRate):
+        self.signals[0].render(start, out, sampleRate)
+        scratch = np.empty_like(out)
+        for s in self.signals[1:]:
+            out += s.render(start, scratch, sampleRate)
+        return out
+
+
+class Product(Signal):
+    def __init__(self, *signals):
+        self.signals = [_as_signal(s) for s in signals]
+
+    def render(self, start, out, sampleRate):
+        self.signals[0].render(start, out, sampleRate)
+        scratch = np.empty_like(out)
+        for s in self.signals[1:]:
+            out *= s.render(start, scratch, sampleRate)
+        return out
+
+
+def synthesize(signal, length, sampleRate, chunkSize=1 << 22, clip=True):
+    """Yields the waveform as float32 chunks of at most chunkSize samples.
+
+    The same output buffer is reused for every chunk, so consume (e.g.
+    upload) each chunk before asking for the next. With clip, samples
+    are limited to the AWG's -1 to 1 range."""
+    length = int(length)
+    work = np.empty(min(chunkSize, length), dtype=np.float64)
+    chunk = np.empty(len(work), dtype=np.float32)
+    for start in range(0, length, chunkSize):
+        size = min(chunkSize, length - start)
+        signal.render(start, work[:size], sampleRate)
+        if clip:
+            np.clip(work[:size], -1, 1, out=work[:size])
+        chunk[:size] = work[:size]
+        yield chunk[:size]
+
+
+def to_array(signal, length, sampleRate, chunkSize=1 << 22, clip=True, out=None):
+    """Evaluates signal into a float32 array, or into out (e.g. a memory map)."""
+    if out is None:
+        out = np.empty(int(length), dtype=np.float32)
+    start = 0
+    for chunk in synthesize(signal, length, sampleRate, chunkSize, clip):
+        out[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    return out
+
+
+def upload(awg, name, signal, length, sampleRate, chunkSize=1 << 22, debug=False):
+    """Creates waveform name on the AWG and streams signal into it.
+
+    awg is a connected SocketInstrument. Host memory use is bounded by
+    chunkSize regardless of length."""
+    length = int(length)
+    awg.write(f'wlist:waveform:new "{name}", {length}')
+    return awg.wfm_stream_writer(name, synthesize(signal, length, sampleRate, chunkSize),
+                                 debug)
+
+
+def main():
+    from socket_instrument import SocketInstrument
+
+    sampleRate = 25e9
+    length = 2e9
+    # 1 GHz carrier with 10 us pulses every 100 us plus a little noise,
+    # and a 100 us chirp, each generated and sent in 4 MSample chunks.
+    pulsed = Tone(1e9, 0.8) * Pulse(10e-6, 100e-6) + Noise(0.01)
+    chirp = Chirp(500e6, 1.5e9, 100e-6, 0.9)
+
+    awg = SocketInstrument('192.168.1.12', port=4001, timeout=60)
+    print(awg.instId)
+    awg.write('wlist:waveform:delete all')
+    awg.write(f'clock:srate {sampleRate}')
+    for name, signal in (('pulsed', pulsed), ('chirp', chirp)):
+        print(name, upload(awg, name, signal, length, sampleRate), 'samples')
+
+    awg.write('source1:casset:waveform "pulsed"')
+    awg.write('awgcontrol:run:immediate')
+    awg.query('*opc?')
+    awg.write('output1 on')
+    print(awg.query('system:error:all?'))
+    awg.disconnect()
+
+
+if __name__ == '__main__':
+    main()